@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import http.client
+import socket
+import subprocess
+import sys
+import threading
+from uuid import uuid4
+
+from botocore.awsrequest import AWSResponse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_USER = 'bench-1-1'
+BENCH_PASSWORD = 'bench'
+
+def configure_env(db_path, db_uri=None):
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = db_uri or f'sqlite:///{os.path.abspath(db_path)}'
+    os.environ.setdefault('FLASK_JWT_SECRET_KEY', 'benchmark-secret-key-not-for-production')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ.setdefault('S3_BUCKET_NAME', 'td.bucket')
+    os.environ.setdefault('UPDATE_SCHEDULE_QUEUE', 'update-schedule')
+    os.environ.setdefault('VIDEO_CREATION_QUEUE', 'video-creation')
+    os.environ.setdefault('VIDEO_PROCESSING_QUEUE', 'video-processing')
+    os.environ['DEMO_ENVIRONMENT'] = '0'
+    os.environ.setdefault('FLASK_RATE_LIMIT_ENABLED', 'false')
+
+def seed(locations=2, cameras_per_location=2, entries_per_location=200, **kwargs):
+    """One benchmark user whose locations are always open, so /entry is accepted."""
+    from sqlalchemy import select
+    from databases import db, Video
+    from databases.generator import generate_data, ALWAYS_OPEN
+
+    generate_data(locations_per_user=locations, cameras_per_location=cameras_per_location,
+                  entries_per_location=entries_per_location, user_prefix='bench',
+                  password=BENCH_PASSWORD, schedule=ALWAYS_OPEN, **kwargs)
+
+    return db.session.execute(select(Video.id).limit(1000)).scalars().all()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def prepare_database(db_path):
+    configure_env(db_path)
+    from server import create_app, register_blueprint
+    from databases import db
+
+    app = register_blueprint(create_app())
+    with app.app_context():
+        db.create_all()
+        video_ids = seed()
+        db.session.remove()
+    return app, video_ids
+
+def start_gunicorn(port, db_path, env):
+    env = os.environ | {'BENCH_DB_PATH': db_path, 'GUNICORN_BIND': f'127.0.0.1:{port}'} | env
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn_config.py',
+         '--access-logfile', '/dev/null', 'benchmarks.wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_server('127.0.0.1', port):
+        server.terminate()
+        raise RuntimeError(f'gunicorn did not start with {env}')
+    return server
+
+def _stash_aws_params(params, context, **kwargs):
+    context['stub_params'] = params
+
+def _stub_aws_call(model, context, **kwargs):
+    params = context.get('stub_params', {})
+    if model.name == 'GetQueueUrl':
+        parsed = {'QueueUrl': f"https://sqs.ap-southeast-2.amazonaws.com/000000000000/{params['QueueName']}"}
+    elif model.name == 'SendMessage':
+        parsed = {'MessageId': str(uuid4())}
+    elif model.name == 'SendMessageBatch':
+        parsed = {'Successful': [{'Id': e['Id'], 'MessageId': str(uuid4())} for e in params['Entries']],
+                  'Failed': []}
+    else:
+        parsed = {}
+    return AWSResponse(None, 200, {}, None), parsed | {'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+def install_aws_stubs(service_names=('s3', 'sqs')):
+    """Answer every AWS API call with a canned response instead of the network.
+    Presigned URLs are signed locally and keep working unchanged."""
+    from clients import get_client
+
+    for service_name in service_names:
+        events = get_client(service_name).meta.events
+        events.register('before-parameter-build', _stash_aws_params)
+        events.register_first('before-call', _stub_aws_call)
+
+def create_token(app, identity=BENCH_USER, is_api=False):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        return create_access_token(identity=identity,
+                                   additional_claims={'is_admin': True, 'is_api': is_api})
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0,
+    }
+    for pct in (50, 90, 99, 100):
+        value = percentile(latencies, pct)
+        summary[f"p{pct}_ms"] = value * 1000 if value is not None else None
+
+    return summary
+
+def wait_for_server(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def run_load(host, port, paths, headers, concurrency, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local_latencies, local_errors, n = [], 0, offset
+        while time.monotonic() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                res = conn.getresponse()
+                res.read()
+                if res.status >= 400:
+                    local_errors += 1
+                local_latencies.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    return summarize(latencies, elapsed) | {"errors": sum(errors)}
+
+def write_results(results, output):
+    data = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, 'w') as f:
+            f.write(data)
+    else:
+        print(data)
@@ -0,0 +1,59 @@
+"""Diff two benchmarks/endpoints.py result files.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Exits with 1 when any endpoint's p50 or p99 got slower by more than
+--threshold percent.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p99_ms', 'throughput', 'mean_queries')
+# Lower is better for everything but throughput.
+HIGHER_IS_BETTER = {'throughput'}
+GATED = ('p50_ms', 'p99_ms')
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    print(f"{'endpoint':<20}" + ''.join(f'{metric:>26}' for metric in METRICS))
+
+    regressions = []
+    for endpoint, result in after['results'].items():
+        previous = before['results'].get(endpoint)
+        if previous is None:
+            continue
+        row = f'{endpoint:<20}'
+        for metric in METRICS:
+            pct = change(previous.get(metric), result.get(metric))
+            cell = f"{previous.get(metric) or 0:.1f} -> {result.get(metric) or 0:.1f}"
+            if pct is not None:
+                cell += f' ({pct:+.0f}%)'
+                worse = -pct if metric in HIGHER_IS_BETTER else pct
+                if metric in GATED and worse > args.threshold:
+                    regressions.append(f'{endpoint} {metric} {pct:+.1f}%')
+            row += f'{cell:>26}'
+        print(row)
+
+    if regressions:
+        print('\nRegressions over threshold:\n  ' + '\n  '.join(regressions))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
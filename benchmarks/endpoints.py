@@ -0,0 +1,165 @@
+"""Latency percentiles and throughput of the hot endpoints.
+
+Runs the app in-process against a seeded SQLite file (or --db-uri for a MySQL
+stand-in) with every AWS call stubbed, and writes one JSON document that
+benchmarks/compare.py can diff between commits.
+
+    python -m benchmarks.endpoints --entries-per-location 100000 --output before.json
+"""
+import argparse
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import ROOT, configure_env, seed, install_aws_stubs, create_token, summarize, write_results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def server_timing(header):
+    # db;dur=1.2;desc="3 queries", total;dur=4.0
+    timing = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        for field in fields[1:]:
+            key, _, value = field.partition('=')
+            if key == 'dur':
+                timing[f'{fields[0]}_ms'] = float(value)
+            elif key == 'desc' and fields[0] == 'db':
+                timing['queries'] = int(value.strip('"').split()[0])
+    return timing
+
+def build_cases(app, args):
+    from sqlalchemy import select, update
+    from passlib.hash import sha256_crypt
+    from databases import db, Event, Location, User, UploadOptionEnum
+
+    web = {"Authorization": f"Bearer {create_token(app)}"}
+    api_token = create_token(app, is_api=True)
+    api = {"Authorization": f"Bearer {api_token}"}
+
+    with app.app_context():
+        db.session.execute(update(User).values(api_key=sha256_crypt.hash(api_token, rounds=1000)))
+        db.session.execute(update(Location).where(Location.id == 2).values(upload_method=UploadOptionEnum.RTSP))
+        db.session.commit()
+        unreviewed = db.session.execute(
+            select(Event.id).where(Event.location_id == 1, Event.action_id.is_(None)).limit(200)).scalars().all()
+        db.session.remove()
+
+    # cycle through pages that exist; most events are reviewed, so the
+    # unreviewed listing has far fewer pages than there are entries
+    def pages(listing):
+        res = app.test_client().get(f'/{listing}/1/1', headers=web)
+        return max(1, min(args.pages, res.json["page_info"]["pages"] if res.status_code == 200 else 1))
+    unreviewed_pages, history_pages = pages("unreviewed-events"), pages("history-events")
+    counter = iter(range(10 ** 9))
+
+    return [
+        ("unreviewed-events", "GET", lambda n: f'/unreviewed-events/1/{n % unreviewed_pages + 1}', web, None),
+        ("history-events", "GET", lambda n: f'/history-events/1/{n % history_pages + 1}', web, None),
+        ("saved-events", "GET", lambda n: '/saved-events/1/1', web, None),
+        ("review-queue", "GET", lambda n: '/review-queue', web, None),
+        ("event-feed", "GET", lambda n: '/events?status=all', web, None),
+        ("adjacent-events", "GET", lambda n: f'/adjacent-events/{unreviewed[n % len(unreviewed)]}', web, None),
+        ("current-stats", "GET", lambda n: '/current-stats', web, None),
+        ("video", "GET", lambda n: f'/video/{app.config["BENCH_VIDEO_IDS"][n % len(app.config["BENCH_VIDEO_IDS"])]}', web, None),
+        ("entry", "POST", lambda n: '/entry', api,
+         lambda n: {"location_id": 1, "member_id": f'bench-{next(counter)}'}),
+        ("entry-rtsp", "POST", lambda n: '/entry', api,
+         lambda n: {"location_id": 2, "member_id": f'bench-{next(counter)}'}),
+    ]
+
+def run_case(client, case, iterations, warmup):
+    name, method, path, headers, body = case
+    latencies, errors, timings = [], 0, []
+    for n in range(warmup + iterations):
+        start = time.perf_counter()
+        res = client.open(path(n), method=method, headers=headers, json=body(n) if body else None)
+        elapsed = time.perf_counter() - start
+        if n < warmup:
+            continue
+        latencies.append(elapsed)
+        errors += res.status_code >= 400
+        timings.append(server_timing(res.headers.get('Server-Timing')))
+
+    result = summarize(latencies, sum(latencies)) | {"errors": errors}
+    for key in ('db_ms', 'queries'):
+        values = [t[key] for t in timings if key in t]
+        result[f'mean_{key}'] = sum(values) / len(values) if values else None
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db-uri', help='Use this database instead of a temporary SQLite file')
+    parser.add_argument('--locations', type=int, default=4)
+    parser.add_argument('--cameras-per-location', type=int, default=2)
+    parser.add_argument('--entries-per-location', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--only', help='Comma separated endpoint names')
+    parser.add_argument('--write-buffer', action='store_true', help='Buffer /entry writes and commit them in groups')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_env(os.path.join(tmp_dir, 'bench.db'), args.db_uri)
+        os.environ['FLASK_SERVER_TIMING'] = 'true'
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tmp_dir)
+        if args.write_buffer:
+            os.environ['FLASK_ENTRY_WRITE_BUFFER'] = 'true'
+            os.environ['FLASK_ENTRY_BUFFER_DIR'] = os.path.join(tmp_dir, 'entry_buffer')
+
+        from server import create_app, register_blueprint
+        from databases import db
+
+        app = register_blueprint(create_app())
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            app.config["BENCH_VIDEO_IDS"] = seed(locations=args.locations,
+                                                 cameras_per_location=args.cameras_per_location,
+                                                 entries_per_location=args.entries_per_location)
+            seed_seconds = time.perf_counter() - start
+            db.session.remove()
+        install_aws_stubs()
+
+        cases = build_cases(app, args)
+        if args.only:
+            cases = [case for case in cases if case[0] in args.only.split(',')]
+
+        client = app.test_client()
+        results = {case[0]: run_case(client, case, args.iterations, args.warmup) for case in cases}
+
+        from utils.write_buffer import stop_buffer
+        # commit what is still buffered while the database is still there
+        stop_buffer()
+
+        with app.app_context():
+            dialect = db.engine.dialect.name
+
+    write_results({
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": dialect,
+            "locations": args.locations,
+            "cameras_per_location": args.cameras_per_location,
+            "entries_per_location": args.entries_per_location,
+            "iterations": args.iterations,
+            "seed_seconds": seed_seconds,
+            "write_buffer": args.write_buffer,
+        },
+        "results": results,
+    }, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Encoding cost of a 1000-event EventSchema payload with each JSON provider.
+
+Seeds a SQLite file, dumps 1000 events once with EventSchema and then times
+app.json.dumps() and app.json.response() for every available provider.
+
+    python -m benchmarks.json_encoding --events 1000 --output json.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import BENCH_USER, configure_env, seed, write_results
+
+def time_call(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(timings) * 1000, "min_ms": min(timings) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_env(os.path.join(tmp_dir, 'bench.db'))
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tmp_dir)
+
+        from flask import g
+        from server import create_app, register_blueprint
+        from databases import db, User, Event
+        from databases.schemas import EventSchema
+        from utils.json_provider import JSON_PROVIDERS, orjson
+
+        app = register_blueprint(create_app())
+        with app.app_context():
+            db.create_all()
+            seed(locations=1, entries_per_location=args.events, members_per_location=10)
+
+        with app.test_request_context():
+            g._jwt_extended_jwt = {}
+            g._jwt_extended_jwt_user = {"loaded_user": db.session.get(User, BENCH_USER)}
+            events = db.session.execute(db.select(Event).limit(args.events)).unique().scalars().all()
+            payload = {"events": EventSchema(many=True).dump(events)}
+
+            results = {"events": len(payload["events"]), "providers": {}}
+            for name, provider_class in JSON_PROVIDERS.items():
+                if name == "orjson" and orjson is None:
+                    continue
+                provider = provider_class(app)
+                results["providers"][name] = {
+                    "bytes": len(provider.response(payload).get_data()),
+                    "dumps": time_call(lambda: provider.dumps(payload), args.iterations),
+                    "response": time_call(lambda: provider.response(payload), args.iterations),
+                }
+            db.session.remove()
+
+    write_results(results, args.output)
+
+if __name__ == '__main__':
+    main()
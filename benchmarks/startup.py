@@ -0,0 +1,67 @@
+"""Cold start time of a worker: importing app.py in a fresh interpreter.
+
+    python -m benchmarks.startup --runs 10 --output startup.json
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import configure_env, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_APP = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+def time_import(env):
+    res = subprocess.run([sys.executable, '-c', IMPORT_APP], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(res.stdout.strip().splitlines()[-1])
+
+def slowest_imports(env, top):
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    # Children are printed before their parent, so collect the second level
+    # imports until the top level `app` line closes them.
+    modules = []
+    for line in res.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        depth, module = len(match.group(3)), match.group(4)
+        if depth == 1:
+            if module == 'app':
+                break
+            modules = []
+        elif depth == 3:
+            modules.append({"module": module, "cumulative_ms": int(match.group(2)) / 1000})
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_env(os.path.join(tmp_dir, 'bench.db'))
+        env = os.environ | {'PROMETHEUS_MULTIPROC_DIR': tmp_dir}
+
+        timings = sorted(time_import(env) for _ in range(args.runs))
+        results = {
+            "runs": args.runs,
+            "median_ms": statistics.median(timings) * 1000,
+            "min_ms": timings[0] * 1000,
+            "max_ms": timings[-1] * 1000,
+            "slowest_imports": slowest_imports(env, args.top),
+        }
+
+    write_results(results, args.output)
+
+if __name__ == '__main__':
+    main()
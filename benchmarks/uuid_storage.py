@@ -0,0 +1,153 @@
+"""Index size and join speed of String(36) keys against 16-byte BinaryUUID keys.
+
+Seeds a SQLite file, copies it into a second file whose Event/Entry/Video
+keys are String(36) as they used to be, converts a copy of that with
+`flask convert-uuid-keys` (timed), then compares the two layouts: pages used
+by each table and index (dbstat), and the Event/Entry/Video joins the API
+runs, with each side's own bind and result conversion included.
+
+    python -m benchmarks.uuid_storage --entries 20000 --output uuid.json
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import configure_env, seed, write_results
+
+def string_tables():
+    from sqlalchemy import MetaData, String
+    from databases import db
+    from databases.uuid_keys import UUID_COLUMNS
+
+    metadata = MetaData()
+    for table in db.metadata.tables.values():
+        table.to_metadata(metadata)
+    for table, columns in UUID_COLUMNS:
+        for column in columns:
+            metadata.tables[table.name].c[column].type = String(36)
+    return metadata
+
+def copy_database(source, target, metadata, batch_size=10000):
+    from sqlalchemy import select
+    from databases import db
+
+    metadata.create_all(target)
+    with source.connect() as reader, target.begin() as writer:
+        for table in db.metadata.sorted_tables:
+            result = reader.execution_options(yield_per=batch_size).execute(select(table))
+            for rows in result.mappings().partitions():
+                writer.execute(metadata.tables[table.name].insert(), [dict(row) for row in rows])
+
+def object_sizes(engine):
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT m.tbl_name, s.name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+            "WHERE m.tbl_name IN ('event', 'entry', 'video') GROUP BY s.name ORDER BY m.tbl_name, s.name")).all()
+    sizes = {name: size for _, name, size in rows}
+    sizes["total_tables"] = sum(size for table, name, size in rows if name == table)
+    sizes["total_indexes"] = sum(size for table, name, size in rows if name != table)
+    return sizes
+
+def time_query(engine, statement, iterations):
+    timings = []
+    with engine.connect() as connection:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            connection.execute(statement).all()
+            timings.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(timings) * 1000, "min_ms": min(timings) * 1000}
+
+def join_timings(engine, event, entry, video, event_ids, video_ids, iterations):
+    from sqlalchemy import func, select
+
+    return {
+        # every video of a location, as the event listings join them
+        "location_join": time_query(engine, select(func.count())
+                                    .select_from(video)
+                                    .join(entry, video.c.entry_id == entry.c.id)
+                                    .join(event, entry.c.event_id == event.c.id)
+                                    .where(event.c.location_id == 1), iterations),
+        # a page of events with their entries and videos by id
+        "events_by_id": time_query(engine, select(event.c.id, entry.c.id, video.c.id)
+                                   .join(entry, entry.c.event_id == event.c.id)
+                                   .join(video, video.c.entry_id == entry.c.id)
+                                   .where(event.c.id.in_(event_ids)), iterations),
+        # the owners of a batch of videos, as /video-statuses looks them up
+        "video_owners": time_query(engine, select(video.c.id, entry.c.id, event.c.id, event.c.location_id)
+                                   .join(entry, video.c.entry_id == entry.c.id)
+                                   .join(event, entry.c.event_id == event.c.id)
+                                   .where(video.c.id.in_(video_ids)), iterations),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=20000, help="Entries per location (two locations)")
+    parser.add_argument('--lookups', type=int, default=500, help="Ids per events_by_id / video_owners query")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_env(os.path.join(tmp_dir, 'seed.db'))
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tmp_dir)
+
+        from sqlalchemy import create_engine, select, text
+        from server import create_app
+        from databases import db, Event, Entry, Video
+        from databases.uuid_keys import convert_uuid_keys
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            seed(entries_per_location=args.entries, members_per_location=args.entries, seed=args.seed)
+            event_ids = db.session.execute(select(Event.id)).scalars().all()
+            video_ids = db.session.execute(select(Video.id)).scalars().all()
+            db.session.remove()
+
+            strings_path, binary_path = os.path.join(tmp_dir, 'strings.db'), os.path.join(tmp_dir, 'binary.db')
+            metadata = string_tables()
+            copy_database(db.engine, create_engine(f'sqlite:///{strings_path}'), metadata)
+        shutil.copy(strings_path, binary_path)
+
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{binary_path}'
+        app = create_app()
+        with app.app_context():
+            start = time.perf_counter()
+            convert_uuid_keys()
+            migration_seconds = time.perf_counter() - start
+            db.engine.dispose()
+
+        rng = random.Random(args.seed)
+        event_ids = rng.sample(event_ids, min(args.lookups, len(event_ids)))
+        video_ids = rng.sample(video_ids, min(args.lookups, len(video_ids)))
+        layouts = {
+            "string": (strings_path, [metadata.tables[name] for name in ('event', 'entry', 'video')]),
+            "binary": (binary_path, [Event.__table__, Entry.__table__, Video.__table__]),
+        }
+
+        results = {"events": len(event_ids), "entries_per_location": args.entries,
+                   "migration_seconds": migration_seconds, "layouts": {}}
+        for name, (path, tables) in layouts.items():
+            engine = create_engine(f'sqlite:///{path}')
+            with engine.connect() as connection:
+                # the rebuild leaves free pages behind; compare packed files
+                connection.execute(text("VACUUM"))
+                connection.execute(text("ANALYZE"))
+            results["layouts"][name] = {
+                "file_bytes": os.path.getsize(path),
+                "bytes": object_sizes(engine),
+                "joins": join_timings(engine, *tables, event_ids, video_ids, args.iterations),
+            }
+            engine.dispose()
+
+    write_results(results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Throughput per core of the gunicorn app under sync, gthread and gevent workers.
+
+    python -m benchmarks.worker_modes --workers 2 --io-delay-ms 20 --output worker_modes.json
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+
+from benchmarks.common import prepare_database, free_port, start_gunicorn, create_token, run_load, write_results
+
+def run_mode(mode, args, db_path, paths, headers, tmp_dir):
+    port = free_port()
+    threads = args.threads if mode == 'gthread' else 1
+    prom_dir = os.path.join(tmp_dir, f'prometheus-{mode}')
+    os.makedirs(prom_dir, exist_ok=True)
+    server = start_gunicorn(port, db_path, {
+        'BENCH_IO_DELAY_MS': str(args.io_delay_ms),
+        'GUNICORN_WORKER_CLASS': mode,
+        'GUNICORN_WORKERS': str(args.workers),
+        'GUNICORN_THREADS': str(threads),
+        'PROMETHEUS_MULTIPROC_DIR': prom_dir,
+    })
+    try:
+        result = run_load('127.0.0.1', port, paths, headers, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    cores = min(args.workers, os.cpu_count() or 1)
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "threads": threads,
+        "concurrency": args.concurrency,
+        "io_delay_ms": args.io_delay_ms,
+    } | result | {"throughput_per_core": result["throughput"] / cores}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--io-delay-ms', type=float, default=20)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app, video_ids = prepare_database(db_path)
+        headers = {"Authorization": f"Bearer {create_token(app)}"}
+        paths = ['/locations', '/unreviewed-events/1/1'] + [f'/video/{id}' for id in video_ids[:50]]
+
+        results = []
+        for mode in args.modes.split(','):
+            if mode == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print('gevent is not installed, skipping', file=sys.stderr)
+                continue
+            results.append(run_mode(mode, args, db_path, paths, headers, tmp_dir))
+
+    write_results(results, args.output)
+
+if __name__ == '__main__':
+    main()
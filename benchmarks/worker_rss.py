@@ -0,0 +1,75 @@
+"""Memory per gunicorn worker with and without preload_app.
+
+RSS counts shared pages in full for every worker, so PSS (shared pages split
+between the processes mapping them) and USS (pages private to the worker)
+are reported as well. Linux only, reads /proc.
+
+    python -m benchmarks.worker_rss --workers 4 --output worker_rss.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import prepare_database, free_port, start_gunicorn, create_token, run_load, write_results
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+def memory_kb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+def measure(preload, args, db_path, paths, headers, tmp_dir):
+    port = free_port()
+    prom_dir = os.path.join(tmp_dir, f'prometheus-{preload}')
+    os.makedirs(prom_dir, exist_ok=True)
+    server = start_gunicorn(port, db_path, {
+        'GUNICORN_PRELOAD': '1' if preload else '0',
+        'GUNICORN_WORKERS': str(args.workers),
+        'PROMETHEUS_MULTIPROC_DIR': prom_dir,
+    })
+    try:
+        # Let every worker serve traffic so lazily built clients and pools exist.
+        run_load('127.0.0.1', port, paths, headers, args.workers * 2, args.warmup)
+        time.sleep(0.5)
+        workers = [memory_kb(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {"preload_app": preload, "workers": len(workers)} | {
+        f"{key}_mb_per_worker": statistics.mean(w[key] for w in workers) / 1024
+        for key in ("rss", "pss", "uss")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app, video_ids = prepare_database(db_path)
+        headers = {"Authorization": f"Bearer {create_token(app)}"}
+        paths = ['/locations', '/unreviewed-events/1/1'] + [f'/video/{id}' for id in video_ids[:20]]
+
+        results = [measure(preload, args, db_path, paths, headers, tmp_dir) for preload in (False, True)]
+
+    write_results(results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import os
+import time
+
+from benchmarks.common import configure_env
+configure_env(os.environ['BENCH_DB_PATH'])
+
+from server import create_app, register_blueprint
+
+app = create_app()
+app = register_blueprint(app)
+
+# Emulates the MySQL/AWS round trip a production request blocks on, which is
+# what threaded and gevent workers are able to overlap.
+io_delay = float(os.getenv('BENCH_IO_DELAY_MS', '0')) / 1000
+if io_delay:
+    @app.before_request
+    def emulate_io_wait():
+        time.sleep(io_delay)
@@ -1,9 +1,69 @@
 import os
+import threading
 
 from dotenv import load_dotenv
 import boto3
+import botocore.session
+from botocore.config import Config
+
+from utils.metrics import instrument_aws_session
 if os.path.exists('./.env'):
     load_dotenv()
 
-s3_client = boto3.client('s3')
-sqs_client = boto3.client('sqs')
+# boto3 sessions are not thread-safe but the clients they create are, so each
+# process builds its clients once from a private session under a lock and then
+# shares them between request threads/greenlets.
+_lock = threading.Lock()
+_session = None
+_clients = {}
+# Service models loaded in a preloading master, shared copy-on-write by workers.
+_loader = None
+
+def _client_config():
+    return Config(max_pool_connections=int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '25')))
+
+def _new_session():
+    botocore_session = botocore.session.get_session()
+    instrument_aws_session(botocore_session)
+    if _loader is not None:
+        botocore_session.register_component('data_loader', _loader)
+    return boto3.session.Session(botocore_session=botocore_session)
+
+def get_client(service_name):
+    global _session
+
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(service_name)
+        if client is None:
+            if _session is None:
+                _session = _new_session()
+            client = _session.client(service_name, config=_client_config())
+            _clients[service_name] = client
+
+    return client
+
+def get_s3_client():
+    return get_client('s3')
+
+def get_sqs_client():
+    return get_client('sqs')
+
+def warm_clients(service_names=('s3', 'sqs')):
+    """Load service models before forking so workers inherit them."""
+    global _loader
+
+    for service_name in service_names:
+        get_client(service_name)
+    _loader = _session._session.get_component('data_loader')
+
+def reset_clients():
+    """Drop clients inherited over fork(); their connection pools are shared sockets."""
+    global _lock, _session
+
+    _lock = threading.Lock()
+    _session = None
+    _clients.clear()
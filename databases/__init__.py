@@ -1,2 +1,3 @@
 from .models import *
-from .utils import *
\ No newline at end of file
+from .utils import *
+from .versioning import bump_config_version
\ No newline at end of file
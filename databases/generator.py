@@ -0,0 +1,209 @@
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from passlib.hash import sha256_crypt
+from sqlalchemy import text
+
+from .models import db, Organization, User, Location, Camera, Action, Event, Entry, Video, HighRiskMember, \
+    UploadOptionEnum
+from utils.status_codes import EntryStatusCode, VideoStatusCode
+from utils.event import event_priority
+
+DAY_TYPES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun', 'pub')
+ALWAYS_OPEN = {day: [{"start_hour": 0, "start_minute": 0, "duration": 24}] for day in DAY_TYPES}
+SCHEDULES = (
+    ALWAYS_OPEN,
+    {day: [{"start_hour": 5, "start_minute": 0, "duration": 18}] for day in DAY_TYPES},
+    {day: ([{"start_hour": 6, "start_minute": 0, "duration": 16}] if day not in ('sat', 'sun', 'pub')
+           else [{"start_hour": 8, "start_minute": 0, "duration": 12}]) for day in DAY_TYPES},
+)
+# Swipes per hour of day, busiest before and after work.
+HOURLY_WEIGHTS = (1, 1, 1, 1, 2, 6, 14, 18, 12, 8, 7, 8, 9, 7, 6, 7, 10, 16, 17, 12, 8, 5, 3, 2)
+ACTIONS = (("tailgating", True), ("false alarm", False), ("staff", False), ("contractor", False))
+
+def _entered_at_times(rng, count, now, days):
+    hours = rng.choices(range(24), weights=HOURLY_WEIGHTS, k=count)
+    times = []
+    for hour in hours:
+        day = now - timedelta(days=rng.randrange(days))
+        entered_at = day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+        # Later today has not happened yet; wrap it to the oldest day instead.
+        if entered_at > now:
+            entered_at -= timedelta(days=days)
+        times.append(entered_at)
+    times.sort(reverse=True)
+    return times
+
+def _uuid(rng):
+    # Several times faster than uuid4().
+    value = rng.getrandbits(128) & ~(0xf000 << 64) | (0x4000 << 64)
+    value = value & ~(0xc000 << 48) | (0x8000 << 48)
+    hex = f'{value:032x}'
+    return f'{hex[:8]}-{hex[8:12]}-{hex[12:16]}-{hex[16:20]}-{hex[20:]}'
+
+class BulkInserter:
+    """executemany() straight to the driver with rows as tuples in `columns`
+    order. Only each column's bind processor runs per value, skipping the
+    per-row parameter dictionaries SQLAlchemy otherwise builds."""
+
+    def __init__(self, table, columns):
+        dialect = db.engine.dialect
+        compiled = table.insert().compile(dialect=dialect, column_keys=columns)
+        order = [columns.index(key) for key in compiled.positiontup]
+        processors = [table.c[columns[i]].type._cached_bind_processor(dialect) for i in order]
+        self.statement = str(compiled)
+        self.converters = list(zip(order, processors))
+        self.rows = []
+
+    def append(self, row):
+        self.rows.append(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def flush(self):
+        if not self.rows:
+            return
+        params = [tuple(process(row[i]) if process else row[i] for i, process in self.converters)
+                  for row in self.rows]
+        db.session.connection().exec_driver_sql(self.statement, params)
+        self.rows.clear()
+
+def _flush(inserters):
+    for inserter in inserters:
+        inserter.flush()
+    db.session.commit()
+
+def generate_data(organizations=1, users_per_organization=1, locations_per_user=2, cameras_per_location=2,
+                  entries_per_location=1000, days=30, members_per_location=5000, high_risk_per_location=5,
+                  unreviewed_ratio=0.2,
+                  merged_ratio=0.03, user_prefix='user', password='password', schedule=None,
+                  batch_size=20000, seed=0, progress=None):
+    """Bulk load synthetic tenants for scale testing.
+
+    Every entry gets one event (a `merged_ratio` share of events get a second
+    entry a few seconds later, as in a tailgating burst) and one video per
+    camera. Entry times are spread over the last `days` days following a
+    daily traffic curve, member ids are long-tailed, entries from the last
+    hour are still being processed, and `unreviewed_ratio` of the rest await
+    review. `high_risk_per_location` of each location's members are on the
+    user's high-risk list and their entries are tagged. Users are named `{user_prefix}-{organization}-{user}`,
+    with the organization's random suffix appended when an earlier run took the name.
+
+    `seed` makes the data reproducible. Keys come from an unseeded generator of
+    their own, so running it again adds to the database instead of colliding.
+    """
+    rng = random.Random(seed)
+    ids = random.Random()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    hashed_password = sha256_crypt.hash(password)
+    counts = dict.fromkeys(("organizations", "users", "locations", "cameras", "events", "entries", "videos"), 0)
+
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text("PRAGMA synchronous = OFF"))
+        db.session.execute(text("PRAGMA journal_mode = MEMORY"))
+
+    events = BulkInserter(Event.__table__, ["id", "location_id", "action_id", "reviewed_at",
+                                            "is_saved", "is_merged", "comment", "is_high_risk",
+                                            "priority", "queued_at"])
+    entries = BulkInserter(Entry.__table__, ["id", "event_id", "member_id", "entered_at", "status",
+                                             "is_high_risk"])
+    videos = BulkInserter(Video.__table__, ["id", "camera_id", "entry_id", "status", "uploaded_at"])
+    inserters = (events, entries, videos)
+
+    for o in range(1, organizations + 1):
+        suffix = uuid4().hex[:8]
+        organization = Organization(name=f'{user_prefix}-organization-{o}-{suffix}',
+                                    email=f'{user_prefix}-{o}-{suffix}@example.com',
+                                    phone=f'{suffix}-{o}', address=f'{o} {suffix} Street',
+                                    created_at=now)
+        db.session.add(organization)
+        db.session.flush()
+        counts["organizations"] += 1
+
+        for u in range(1, users_per_organization + 1):
+            user_id = f'{user_prefix}-{o}-{u}'
+            if db.session.get(User, user_id) is not None:
+                user_id = f'{user_id}-{suffix}'
+            db.session.add(User(id=user_id, name=user_id, password=hashed_password,
+                                organization_id=organization.id, timezone='Pacific/Auckland'))
+            actions = [Action(user_id=user_id, name=name, is_tailgating=is_tailgating)
+                       for name, is_tailgating in ACTIONS]
+            db.session.add_all(actions)
+            db.session.flush()
+            action_ids = [action.id for action in actions]
+            counts["users"] += 1
+
+            for n in range(1, locations_per_user + 1):
+                location = Location(user_id=user_id, name=f'location-{n}',
+                                    upload_method=UploadOptionEnum.UserUpload,
+                                    operational_hours=schedule or rng.choice(SCHEDULES))
+                db.session.add(location)
+                db.session.flush()
+                cameras = [Camera(location_id=location.id, name=f'camera-{c}', display_order=c,
+                                  x1=0.1, y1=0.1, x2=0.9, y2=0.1, x3=0.9, y3=0.9, x4=0.1, y4=0.9,
+                                  nx=0.0, ny=1.0, threshold=0.5, minimum_time=1.0, offset_amount=0)
+                           for c in range(cameras_per_location)]
+                db.session.add_all(cameras)
+                db.session.flush()
+                camera_ids = [camera.id for camera in cameras]
+                high_risk = {f'{location.id}-{member:06d}'
+                             for member in rng.sample(range(members_per_location), high_risk_per_location)}
+                db.session.add_all([HighRiskMember(user_id=user_id, member_id=member_id, created_at=now)
+                                    for member_id in sorted(high_risk)])
+                db.session.commit()
+                counts["locations"] += 1
+                counts["cameras"] += len(camera_ids)
+
+                for entered_at in _entered_at_times(rng, entries_per_location, now, days):
+                    event_id = _uuid(ids)
+                    in_process = now - entered_at < timedelta(hours=1)
+                    reviewed = not in_process and rng.random() >= unreviewed_ratio
+                    merged = rng.random() < merged_ratio
+                    entry_status = EntryStatusCode.PROCESS_READY if in_process else EntryStatusCode.REVIEW_READY
+                    event_high_risk = False
+                    for offset in ((0, 2) if merged else (0,)):
+                        entry_id = _uuid(ids)
+                        member = int(rng.paretovariate(1.1)) % members_per_location
+                        member_id = f'{location.id}-{member:06d}'
+                        event_high_risk |= member_id in high_risk
+                        entries.append((entry_id, event_id, member_id, entered_at + timedelta(seconds=offset),
+                                        entry_status, member_id in high_risk))
+                        uploaded_at = entered_at + timedelta(seconds=30)
+                        for camera_id in camera_ids:
+                            if in_process:
+                                status = rng.choice((VideoStatusCode.CREATED, VideoStatusCode.PROCESS_READY))
+                            elif rng.random() < 0.005:
+                                status = VideoStatusCode.UPLOAD_FAILED
+                            else:
+                                status = VideoStatusCode.REVIEW_READY
+                            videos.append((_uuid(ids), camera_id, entry_id, status, uploaded_at))
+
+                    events.append((
+                        event_id,
+                        location.id,
+                        rng.choice(action_ids) if reviewed else None,
+                        entered_at + timedelta(minutes=rng.randrange(5, 600)) if reviewed else None,
+                        reviewed and rng.random() < 0.02,
+                        merged,
+                        "",
+                        event_high_risk,
+                        event_priority(event_high_risk, merged),
+                        entered_at,
+                    ))
+
+                    if len(videos) >= batch_size:
+                        counts["events"] += len(events)
+                        counts["entries"] += len(entries)
+                        counts["videos"] += len(videos)
+                        _flush(inserters)
+                        if progress:
+                            progress(counts)
+
+    counts["events"] += len(events)
+    counts["entries"] += len(entries)
+    counts["videos"] += len(videos)
+    _flush(inserters)
+
+    return counts
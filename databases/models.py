@@ -5,6 +5,7 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
 
 from utils.status_codes import EntryStatusCode, VideoStatusCode
+from .types import BinaryUUID
 
 convention = {
     "ix": 'ix_%(column_0_label)s',
@@ -35,6 +36,8 @@ class User(db.Model):
     timezone = db.Column(db.String(40), default='Pacific/Auckland')
     review_high_risk_members = db.Column(db.Boolean, default=False)
     organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False)
+    # bumped whenever the user's locations, cameras, actions or high-risk members change
+    config_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
 class Organization(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
@@ -93,15 +96,23 @@ class Action(db.Model):
 
 
 class HighRiskMember(db.Model):
+    # at most one active and one deleted row per member; re-adding a member
+    # reactivates its deleted row instead of inserting another
+    __table_args__ = (db.UniqueConstraint('user_id', 'member_id', 'is_deleted', name='_user_member_deleted_uc'),)
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.String(36), db.ForeignKey(User.id), nullable=False)
     member_id = db.Column(db.String(36), nullable=False)
-    is_deleted = db.Column(db.Boolean, default=False)
+    is_deleted = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False)
 
 
 class Event(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=str(uuid4()), nullable=False, unique=True)
+    # the review queue and the event feed read each location's events from
+    # these indexes in order, so taking the next few never sorts the backlog
+    __table_args__ = (db.Index('ix_event_review_queue', 'location_id', 'action_id', 'deleted_at',
+                               db.desc('priority'), 'queued_at'),
+                      db.Index('ix_event_feed', 'location_id', 'deleted_at', 'queued_at', 'id'))
+    id = db.Column(BinaryUUID, primary_key=True, default=lambda: str(uuid4()), nullable=False, unique=True)
     location_id = db.Column(db.Integer, db.ForeignKey(Location.id), nullable=False)
     processed_at = db.Column(db.DateTime)
     reviewed_at = db.Column(db.DateTime)
@@ -110,6 +121,11 @@ class Event(db.Model):
     action_id = db.Column(db.Integer, db.ForeignKey(Action.id), index=True)
     is_saved = db.Column(db.Boolean, default=False)
     comment = db.Column(db.String(256), default="")
+    is_high_risk = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+    priority = db.Column(db.SmallInteger, default=0, server_default='0', nullable=False)
+    queued_at = db.Column(db.DateTime)
+    claimed_by = db.Column(db.String(64))
+    claim_expires_at = db.Column(db.DateTime)
 
     entries = db.relationship("Entry", back_populates="event", innerjoin=True, lazy="joined")
     location = db.relationship("Location", innerjoin=True, lazy="joined")
@@ -120,11 +136,12 @@ class Event(db.Model):
         return min(entry.entered_at for entry in self.entries)
 
 class Entry(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=str(uuid4()), nullable=False, unique=True)
-    event_id = db.Column(db.String(36), db.ForeignKey(Event.id), index=True, nullable=False)
+    id = db.Column(BinaryUUID, primary_key=True, default=lambda: str(uuid4()), nullable=False, unique=True)
+    event_id = db.Column(BinaryUUID, db.ForeignKey(Event.id), index=True, nullable=False)
     member_id = db.Column(db.String(36), index=True)
     member_meta = db.Column(db.JSON)
     entered_at = db.Column(db.DateTime)
+    is_high_risk = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
     status = db.Column(db.Enum(EntryStatusCode, values_callable=lambda c: [e.value for e in c]),
                        default=EntryStatusCode.CREATED, index=True, nullable=False)
 
@@ -133,9 +150,9 @@ class Entry(db.Model):
     
 
 class Video(db.Model):
-    id = db.Column(db.String(36), primary_key=True, default=str(uuid4()), nullable=False, unique=True)
+    id = db.Column(BinaryUUID, primary_key=True, default=lambda: str(uuid4()), nullable=False, unique=True)
     camera_id = db.Column(db.Integer, db.ForeignKey(Camera.id), nullable=False)
-    entry_id = db.Column(db.String(36), db.ForeignKey(Entry.id), index=True)
+    entry_id = db.Column(BinaryUUID, db.ForeignKey(Entry.id), index=True)
     status = db.Column(db.Enum(VideoStatusCode, values_callable=lambda c: [e.value for e in c]),
                        default=VideoStatusCode.CREATED, index=True, nullable=False)
     uploaded_at = db.Column(db.DateTime)
@@ -144,4 +161,34 @@ class Video(db.Model):
     
     def set_status(self, new_status):
         self.status = new_status
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+
+class ChangeEvent(db.Model):
+    """Append-only log behind the /changes feed; id is the sequence clients resume from."""
+    __table_args__ = (db.Index('ix_change_event_user_id_id', 'user_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey(User.id), nullable=False)
+    kind = db.Column(db.String(32), nullable=False)
+    location_id = db.Column(db.Integer)
+    event_id = db.Column(db.String(36))
+    entry_id = db.Column(db.String(36))
+    video_id = db.Column(db.String(36))
+    action_id = db.Column(db.Integer)
+    status = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+class IdempotencyRecord(db.Model):
+    """The response to a write sent with an Idempotency-Key, replayed to retries until expires_at.
+
+    status_code and body are NULL while the first request is still running.
+    """
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='_user_idempotency_key_uc'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey(User.id), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    fingerprint = db.Column(db.String(32), nullable=False)
+    status_code = db.Column(db.SmallInteger, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, index=True, nullable=False)
\ No newline at end of file
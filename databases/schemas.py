@@ -2,12 +2,12 @@ import json
 
 from marshmallow import Schema, validates, ValidationError
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
-from marshmallow.fields import Nested, Field, Integer, String, DateTime, Url, Boolean, List
-from sqlalchemy import select
+from marshmallow.fields import Nested, Field, Integer, String, DateTime, Url, Boolean, List, Dict
 from flask_jwt_extended import current_user
 
-from .models import Action, Camera, Location, Video, Entry, Event, db, HighRiskMember, User
+from .models import Action, Camera, Location, Video, Entry, Event, db, HighRiskMember, User, ChangeEvent
 from utils.hours import WeekSchedule, InvalidScheduleException, convert_from_UTC
+from utils.location import get_location_snapshot
 
 class JSONField(Field):
     def _serialize(self, value, attr, obj, **kwargs):
@@ -77,6 +77,8 @@ class EventSchema(SQLAlchemyAutoSchema):
     processed_at = CustomDateTime(attribute="processed_at")
     reviewed_at = CustomDateTime(attribute="reviewed_at")
     deleted_at = CustomDateTime(attribute="deleted_at")
+    queued_at = CustomDateTime(attribute="queued_at")
+    claim_expires_at = CustomDateTime(attribute="claim_expires_at")
 
 class PageInfoSchema(Schema):
     total = Integer()
@@ -101,14 +103,15 @@ class EntryWebhookInputDataSchema(Schema):
 
     @validates('location_id')
     def check_location_exists(self, data, **kwargs):
-        location = db.session.execute(
-            select(Location).where(Location.user_id==current_user.id, Location.id==data)).scalar_one_or_none()
+        # the snapshot is cached, so the handler's own lookup is free
+        location = get_location_snapshot(data)
         
         if not location:
             raise ValidationError(f"Location {data} not found for user {current_user.id}")
 
 class VideoPresignedUrlSchema(Schema):
     presigned_url = Url()
+    fields = Dict(keys=String(), values=String())
     video_id = String(required=True)
 
 class EntryWebhookResponseSchema(Schema):
@@ -135,6 +138,12 @@ class HighRiskMemberSchema(SQLAlchemyAutoSchema):
 
     created_at = CustomDateTime(attribute="created_at")
 
+class ChangeEventSchema(SQLAlchemyAutoSchema):
+    class Meta:
+        model = ChangeEvent
+
+    created_at = CustomDateTime(attribute="created_at")
+
 class UserSettingSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = User
@@ -0,0 +1,170 @@
+from zoneinfo import ZoneInfo
+
+from flask import current_app, request
+from flask_jwt_extended import current_user
+
+from .models import UploadOptionEnum
+from .schemas import EventSchema, EntrySchema, VideoSchema, LocationSchema, EventWithPageInfoSchema
+from utils.hours import WeekSchedule, InvalidScheduleException
+from utils.status_codes import EntryStatusCode, VideoStatusCode
+
+# Hand-written equivalents of the hottest schemas in databases/schemas.py.
+# They read attributes directly instead of walking marshmallow fields, so any
+# change to those schemas must be mirrored here; tests/unit/test_serializers.py
+# compares both outputs.
+
+UTC = ZoneInfo('UTC')
+
+# marshmallow's Enum field dumps the member name
+ENUM_NAMES = {member: member.name
+              for enum in (EntryStatusCode, VideoStatusCode, UploadOptionEnum)
+              for member in enum}
+
+def compiled_serializers_enabled():
+    # COMPILED_SERIALIZERS is either a bool or a list of endpoints that should
+    # use the compiled path, e.g. FLASK_COMPILED_SERIALIZERS='["event.get_event_with_id"]'
+    setting = current_app.config.get("COMPILED_SERIALIZERS", True)
+    if isinstance(setting, bool):
+        return setting
+    return request.endpoint in setting
+
+class DateTimeFormatter:
+    """Same output as CustomDateTime, resolving the user's timezone once per dump."""
+
+    def __init__(self):
+        self.tz = None
+        self.cache = {}
+
+    def __call__(self, value):
+        if value is None:
+            return None
+
+        formatted = self.cache.get(value)
+        if formatted is None:
+            if self.tz is None:
+                self.tz = ZoneInfo(current_user.timezone)
+            formatted = value.replace(tzinfo=UTC).astimezone(self.tz).replace(tzinfo=None).isoformat()
+            self.cache[value] = formatted
+        return formatted
+
+def serialize_schedule(value):
+    try:
+        return WeekSchedule(value or {}).to_dict()
+    except InvalidScheduleException:
+        return {}
+
+def serialize_video(video, format_datetime):
+    return {
+        "uploaded_at": format_datetime(video.uploaded_at),
+        "id": video.id,
+        "status": ENUM_NAMES.get(video.status),
+    }
+
+def serialize_entry(entry, format_datetime):
+    return {
+        "videos": [serialize_video(video, format_datetime) for video in entry.videos],
+        "entered_at": format_datetime(entry.entered_at),
+        "id": entry.id,
+        "member_id": entry.member_id,
+        "member_meta": entry.member_meta,
+        "is_high_risk": entry.is_high_risk,
+        "status": ENUM_NAMES.get(entry.status),
+    }
+
+def serialize_action(action):
+    if action is None:
+        return None
+    return {
+        "id": action.id,
+        "name": action.name,
+        "is_tailgating": action.is_tailgating,
+        "is_enabled": action.is_enabled,
+        "is_deleted": action.is_deleted,
+    }
+
+def serialize_event(event, format_datetime):
+    entries = event.entries
+    location = event.location
+    return {
+        "entries": [serialize_entry(entry, format_datetime) for entry in entries],
+        "location": {"id": location.id, "name": location.name} if location is not None else None,
+        "action": serialize_action(event.action),
+        "entered_at": format_datetime(min(entry.entered_at for entry in entries)),
+        "processed_at": format_datetime(event.processed_at),
+        "reviewed_at": format_datetime(event.reviewed_at),
+        "deleted_at": format_datetime(event.deleted_at),
+        "queued_at": format_datetime(event.queued_at),
+        "claim_expires_at": format_datetime(event.claim_expires_at),
+        "id": event.id,
+        "is_merged": event.is_merged,
+        "is_saved": event.is_saved,
+        "comment": event.comment,
+        "is_high_risk": event.is_high_risk,
+        "priority": event.priority,
+        "claimed_by": event.claimed_by,
+    }
+
+def serialize_location(location, format_datetime=None):
+    return {
+        "cameras": [{"id": camera.id, "name": camera.name} for camera in location.cameras],
+        "operational_hours": serialize_schedule(location.operational_hours),
+        "id": location.id,
+        "name": location.name,
+        "upload_method": ENUM_NAMES.get(location.upload_method),
+        "custom_upload_method": location.custom_upload_method,
+        "video_retention_days": location.video_retention_days,
+        "stream_retention_hours": location.stream_retention_hours,
+        "review_high_risk_members": location.review_high_risk_members,
+    }
+
+def serialize_event_page(res, format_datetime):
+    page_info = res["page_info"]
+    return {
+        "events": [serialize_event(event, format_datetime) for event in res["events"]],
+        "page_info": {
+            "total": page_info["total"],
+            "page": page_info["page"],
+            "pages": page_info["pages"],
+            "per_page": page_info["per_page"],
+            "iter_pages": list(page_info["iter_pages"]),
+        },
+    }
+
+class CompiledSerializer:
+    """Drop-in for Schema(many=...).dump() that falls back to the schema when disabled."""
+
+    schema = None
+    serialize = None
+
+    def __init__(self, many=False):
+        self.many = many
+
+    def dump(self, obj):
+        if not compiled_serializers_enabled():
+            return self.schema(many=self.many).dump(obj)
+
+        format_datetime = DateTimeFormatter()
+        serialize = type(self).serialize
+        if self.many:
+            return [serialize(item, format_datetime) for item in obj]
+        return serialize(obj, format_datetime)
+
+class VideoSerializer(CompiledSerializer):
+    schema = VideoSchema
+    serialize = serialize_video
+
+class EntrySerializer(CompiledSerializer):
+    schema = EntrySchema
+    serialize = serialize_entry
+
+class EventSerializer(CompiledSerializer):
+    schema = EventSchema
+    serialize = serialize_event
+
+class LocationSerializer(CompiledSerializer):
+    schema = LocationSchema
+    serialize = serialize_location
+
+class EventWithPageInfoSerializer(CompiledSerializer):
+    schema = EventWithPageInfoSchema
+    serialize = serialize_event_page
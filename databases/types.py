@@ -0,0 +1,70 @@
+from uuid import UUID
+
+from sqlalchemy import BINARY, LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+class BinaryUUID(TypeDecorator):
+    """A UUID stored in 16 bytes and read back as its canonical string.
+
+    BINARY(16) on MySQL, the native uuid type on PostgreSQL and a BLOB on
+    SQLite, instead of the 36 characters of String(36). Lowercase hex sorts
+    like the bytes, so ORDER BY and keyset cursors on these keys are unchanged.
+    """
+    impl = BINARY(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(LargeBinary(16))
+        return dialect.type_descriptor(BINARY(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "postgresql":
+            return str(value if isinstance(value, UUID) else UUID(value))
+        return uuid_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return uuid_string(value)
+
+    # pymysql and sqlite3 take and return plain bytes, so outside PostgreSQL
+    # the conversions run on their own instead of chained with BINARY's
+    def bind_processor(self, dialect):
+        if dialect.name == "postgresql":
+            return super().bind_processor(dialect)
+        return lambda value: None if value is None else uuid_bytes(value)
+
+    def result_processor(self, dialect, coltype):
+        if dialect.name == "postgresql":
+            return super().result_processor(dialect, coltype)
+        return lambda value: None if value is None else uuid_string(value)
+
+# Every key of every Event/Entry/Video row read or written goes through these,
+# so the canonical form is packed and unpacked without building UUID objects.
+
+def uuid_bytes(value):
+    """The 16 bytes of a UUID or UUID string; ValueError when value isn't one."""
+    if isinstance(value, UUID):
+        return value.bytes
+    if len(value) == 36 and value[8] == value[13] == value[18] == value[23] == "-":
+        packed = bytes.fromhex(value.replace("-", ""))
+        if len(packed) == 16:
+            return packed
+    return UUID(value).bytes
+
+def uuid_string(value):
+    digits = value.hex()
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+def normalize_uuid(value):
+    """The canonical form of a UUID string, or None when value isn't one."""
+    try:
+        return str(UUID(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,120 @@
+from uuid import UUID
+
+from sqlalchemy import MetaData, String, inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from .models import db, Event, Entry, Video
+
+# One-off conversion of databases created while the Event/Entry/Video keys
+# were String(36) to the BinaryUUID columns in models.py. Parents first, so
+# foreign keys are rebuilt against converted keys.
+UUID_COLUMNS = ((Event.__table__, ("id",)), (Entry.__table__, ("id", "event_id")), (Video.__table__, ("id", "entry_id")))
+
+def string_uuid_columns():
+    """(table, column) pairs still declared as strings in the database."""
+    inspector = inspect(db.engine)
+    pending = []
+    for table, columns in UUID_COLUMNS:
+        types = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        pending.extend((table.name, column) for column in columns if isinstance(types[column], String))
+    return pending
+
+def _convert_mysql(connection):
+    inspector = inspect(connection)
+    foreign_keys = [(table.name, foreign_key) for table, _ in UUID_COLUMNS
+                    for foreign_key in inspector.get_foreign_keys(table.name)
+                    if foreign_key["referred_table"] in ("event", "entry")]
+
+    connection.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+    for table, foreign_key in foreign_keys:
+        connection.execute(text(f"ALTER TABLE `{table}` DROP FOREIGN KEY `{foreign_key['name']}`"))
+    for table, columns in UUID_COLUMNS:
+        for name in columns:
+            null = "NULL" if table.c[name].nullable else "NOT NULL"
+            # the text goes through VARBINARY so it can be overwritten with its own bytes
+            connection.execute(text(f"ALTER TABLE `{table.name}` MODIFY `{name}` VARBINARY(36) {null}"))
+            connection.execute(text(f"UPDATE `{table.name}` SET `{name}` = UNHEX(REPLACE(`{name}`, '-', ''))"))
+            connection.execute(text(f"ALTER TABLE `{table.name}` MODIFY `{name}` BINARY(16) {null}"))
+    for table, foreign_key in foreign_keys:
+        columns = ", ".join(f"`{column}`" for column in foreign_key["constrained_columns"])
+        referred = ", ".join(f"`{column}`" for column in foreign_key["referred_columns"])
+        connection.execute(text(f"ALTER TABLE `{table}` ADD CONSTRAINT `{foreign_key['name']}` "
+                                f"FOREIGN KEY ({columns}) REFERENCES `{foreign_key['referred_table']}` ({referred})"))
+    connection.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+
+def _convert_postgresql(connection):
+    # ALTER ... TYPE rebuilds the column's indexes, but a foreign key can't
+    # join a uuid to a varchar halfway through, so they are dropped around it.
+    # PostgreSQL DDL is transactional, so it all rolls back on a bad key.
+    inspector = inspect(connection)
+    foreign_keys = [(table.name, foreign_key) for table, _ in UUID_COLUMNS
+                    for foreign_key in inspector.get_foreign_keys(table.name)
+                    if foreign_key["referred_table"] in ("event", "entry")]
+
+    for table, foreign_key in foreign_keys:
+        connection.execute(text(f'ALTER TABLE "{table}" DROP CONSTRAINT "{foreign_key["name"]}"'))
+    for table, columns in UUID_COLUMNS:
+        for name in columns:
+            connection.execute(text(f'ALTER TABLE "{table.name}" ALTER COLUMN "{name}" TYPE uuid USING "{name}"::uuid'))
+    for table, foreign_key in foreign_keys:
+        columns = ", ".join(f'"{column}"' for column in foreign_key["constrained_columns"])
+        referred = ", ".join(f'"{column}"' for column in foreign_key["referred_columns"])
+        connection.execute(text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{foreign_key["name"]}" '
+                                f'FOREIGN KEY ({columns}) REFERENCES "{foreign_key["referred_table"]}" ({referred})'))
+
+def _convert_sqlite(connection):
+    # SQLite can't change a column's type, so each table is rebuilt from the
+    # model and its rows copied across with the keys packed to 16 bytes
+    metadata = MetaData()
+    for table in db.metadata.tables.values():
+        table.to_metadata(metadata)
+
+    inspector = inspect(connection)
+    statements = []
+    for table, columns in UUID_COLUMNS:
+        statements.extend(f'DROP INDEX "{index["name"]}"' for index in inspector.get_indexes(table.name))
+        staging = table.to_metadata(metadata, name=f"{table.name}_binary")
+        statements.append(str(CreateTable(staging).compile(connection)))
+        names = [column["name"] for column in inspector.get_columns(table.name) if column["name"] in table.c]
+        selected = ", ".join(f'uuid_bytes("{name}")' if name in columns else f'"{name}"' for name in names)
+        names = ", ".join(f'"{name}"' for name in names)
+        statements.append(f'INSERT INTO "{staging.name}" ({names}) SELECT {selected} FROM "{table.name}"')
+        statements.append(f'DROP TABLE "{table.name}"')
+        statements.append(f'ALTER TABLE "{staging.name}" RENAME TO "{table.name}"')
+        statements.extend(str(CreateIndex(index).compile(connection)) for index in table.indexes)
+
+    driver = connection.connection.driver_connection
+    driver.create_function("uuid_bytes", 1, lambda value: value if value is None else UUID(value).bytes,
+                           deterministic=True)
+    # pysqlite runs DDL outside of transactions; one script keeps the rebuild all or nothing
+    try:
+        driver.executescript("BEGIN;\n" + ";\n".join(statements) + ";\nCOMMIT;")
+    except Exception:
+        if driver.in_transaction:
+            driver.rollback()
+        raise
+
+def convert_uuid_keys():
+    """Store existing Event/Entry/Video keys as 16-byte UUIDs; returns the columns converted.
+
+    Rewrites every row of the three tables, so run it once, with the app
+    stopped and after a backup. Keys that aren't UUIDs make it fail.
+    """
+    pending = string_uuid_columns()
+    if not pending:
+        return []
+
+    dialect = db.engine.dialect.name
+    if dialect == "mysql":
+        convert = _convert_mysql
+    elif dialect == "postgresql":
+        convert = _convert_postgresql
+    elif dialect == "sqlite":
+        convert = _convert_sqlite
+    else:
+        raise NotImplementedError(f"Converting UUID keys isn't supported on {dialect}")
+
+    db.session.remove()
+    with db.engine.begin() as connection:
+        convert(connection)
+    return pending
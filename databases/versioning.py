@@ -0,0 +1,71 @@
+from flask import g, has_request_context
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+
+from .models import User, Location, Camera, Action, HighRiskMember
+
+# User.config_version changes whenever anything behind the config endpoints
+# (/locations, /actions, /high-risk-members, /schedule/<id>) changes, so those
+# endpoints can answer If-None-Match from the already loaded current_user
+# without querying or serializing anything.
+VERSIONED_MODELS = (Location, Camera, Action, HighRiskMember)
+
+def _owner_id(session, obj):
+    if isinstance(obj, Camera):
+        with session.no_autoflush:
+            location = session.get(Location, obj.location_id)
+        return location.user_id if location else None
+    return obj.user_id
+
+def _count_bump(session, user_id):
+    # in-process caches built on config_version advance their own copy of it
+    # by this much on commit instead of reloading (see utils/watchlist.py)
+    bumps = session.info.setdefault("config_bumps", {})
+    bumps[user_id] = bumps.get(user_id, 0) + 1
+
+def bump_config_version(session, user_id):
+    user = session.get(User, user_id)
+    if user is not None:
+        user.config_version = User.config_version + 1
+        _count_bump(session, user_id)
+
+@event.listens_for(Session, "before_flush")
+def bump_config_versions_on_flush(session, flush_context, instances):
+    user_ids = set()
+    for obj in session.new | session.deleted:
+        if isinstance(obj, VERSIONED_MODELS):
+            user_ids.add(_owner_id(session, obj))
+
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj, include_collections=False):
+            user_ids.add(_owner_id(session, obj))
+        # the timezone changes every datetime in those responses
+        elif isinstance(obj, User) and inspect(obj).attrs.timezone.history.has_changes():
+            user_ids.add(obj.id)
+
+    user_ids.discard(None)
+    for user_id in user_ids:
+        bump_config_version(session, user_id)
+
+@event.listens_for(Session, "do_orm_execute")
+def bump_config_version_on_bulk_write(orm_execute_state):
+    # INSERT/UPDATE/DELETE statements bypass the unit of work. The routes that
+    # issue them always scope them to the requesting user, so bump that user.
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, VERSIONED_MODELS):
+        return
+    if not has_request_context() or g.get("_jwt_extended_jwt_user") is None:
+        return
+
+    user = g._jwt_extended_jwt_user["loaded_user"]
+    if user is not None:
+        orm_execute_state.session.execute(
+            update(User).where(User.id == user.id).values(config_version=User.config_version + 1))
+        _count_bump(orm_execute_state.session, user.id)
+
+@event.listens_for(Session, "after_transaction_end")
+def forget_config_bumps(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("config_bumps", None)
@@ -1,7 +1,75 @@
+import gc
+import multiprocessing
+import os
+
+# sync | gthread | gevent
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+# Import the app once in the master and fork workers from it so they share
+# its memory copy-on-write instead of each importing boto3, SQLAlchemy and
+# the routes on their own.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# With a preloaded app the master imports ssl/socket/threading users before
+# gunicorn's gevent worker gets a chance to patch them.
+if preload_app and worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+# prometheus_client picks its value class when it is first imported, so the
+# multiprocess directory has to be in the environment before that happens in
+# the master or every forked worker silently falls back to per-process values.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
 from prometheus_client import multiprocess
 
+def when_ready(server):
+    if server.cfg.preload_app:
+        from clients import warm_clients
+        warm_clients()
+
+def pre_fork(server, worker):
+    # Keep the collector from touching (and so copying) every object the
+    # master imported the first time it runs in a worker.
+    gc.freeze()
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+
+    # Connections and sockets opened in the master must not be shared. The
+    # engine keeps its configuration but starts with an empty pool, and the
+    # boto3 clients are rebuilt on first use from the already loaded models.
+    # Prometheus values notice the new pid on their first write and switch
+    # to this worker's own files.
+    from clients import reset_clients
+    from databases import db
+
+    with worker.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    reset_clients()
+
+def post_worker_init(worker):
+    # with ENTRY_WRITE_BUFFER, replay the entries a dead worker left behind
+    # now instead of on this worker's first buffered /entry
+    from utils.write_buffer import start_buffer
+
+    start_buffer(worker.app.wsgi())
+
 def child_exit(server, worker):
     multiprocess.mark_process_dead(worker.pid)
 
+bind = os.getenv('GUNICORN_BIND', ':5000')
+
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+# Only used by gthread; a value above 1 with the sync class makes gunicorn
+# switch to gthread on its own.
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+# Only used by gevent: the number of concurrent greenlets per worker.
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
 accesslog = "-"
 accesslog_format = '%(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(h)s'
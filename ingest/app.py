@@ -0,0 +1,7 @@
+from utils.env import set_env_vars
+set_env_vars()
+
+from server import create_app
+from ingest.server import create_ingest_app
+
+app = create_ingest_app(create_app())
@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import g
+from flask_jwt_extended import decode_token
+from jwt import ExpiredSignatureError, PyJWTError
+from passlib.hash import sha256_crypt
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from databases import User, IdempotencyRecord
+from databases.schemas import EntryWebhookResponseSchema
+from utils.changes import change_event
+from utils.entry import parse_input_data, check_operational, duplicate_entry_query, build_entry, recording_windows
+from utils.hours import convert_to_UTC
+from utils.idempotency import MAX_KEY_LENGTH, IDEMPOTENCY_TTL, PENDING_TTL, pending_record, fill_record, release_record
+from utils.location import get_location_snapshot_async
+from utils.member import high_risk_member_query
+from utils.merge import merge_into_open_event_async, remember_entry
+from utils.ratelimit import take_token, DEFAULT_LIMITS
+from utils.status_codes import EntryStatusCode
+from utils.upload import user_upload, rtsp_upload
+
+VERIFIED_KEYS_SIZE = 10000
+
+# (stored API key hash, token digest) pairs that sha256_crypt already
+# verified. A reset API key changes the stored hash, so revoked tokens miss.
+_verified_keys = OrderedDict()
+_verified_lock = threading.Lock()
+
+class Rejected(Exception):
+    def __init__(self, status_code, msg, headers=None):
+        super().__init__(msg)
+        self.status_code = status_code
+        self.msg = msg
+        self.headers = headers or {}
+
+async def _verify_api_key(token, api_key):
+    key = (api_key, hashlib.blake2b(token.encode(), digest_size=16).digest())
+    with _verified_lock:
+        if key in _verified_keys:
+            _verified_keys.move_to_end(key)
+            return True
+
+    # tens of milliseconds of hashing; keep it off the event loop
+    if not await asyncio.to_thread(sha256_crypt.verify, token, api_key):
+        return False
+
+    with _verified_lock:
+        _verified_keys[key] = True
+        while len(_verified_keys) > VERIFIED_KEYS_SIZE:
+            _verified_keys.popitem(last=False)
+    return True
+
+async def authenticate(session, app, authorization):
+    """The API user behind the Authorization header, checked the way error_handler(web=False) does."""
+    parts = (authorization or "").split(" ")
+    if len(parts) != 2:
+        raise Rejected(401, "Missing Authorization Header")
+    token = parts[1]
+
+    try:
+        claims = decode_token(token)
+    except ExpiredSignatureError:
+        raise Rejected(401, "Token has expired")
+    except PyJWTError:
+        raise Rejected(422, "Invalid token")
+    if claims.get("type") != "access":
+        raise Rejected(422, "Only non-refresh tokens are allowed")
+    if not claims.get("is_api"):
+        app.logger.warning('This endpoint is not intended for web use')
+        raise Rejected(401, "This endpoint is not intended for web use")
+
+    if app.config.get("RATE_LIMIT_ENABLED", True):
+        rate, burst = DEFAULT_LIMITS["api"]
+        wait = take_token(f"api:{claims['sub']}", float(app.config.get("RATE_LIMIT_API_RATE", rate)),
+                          float(app.config.get("RATE_LIMIT_API_BURST", burst)))
+        if wait:
+            raise Rejected(429, "Too many requests", {"Retry-After": str(max(1, round(wait)))})
+
+    user = await session.get(User, claims["sub"])
+    if user is None:
+        raise Rejected(401, f"Error loading the user {claims['sub']}")
+    if not user.api_key or not await _verify_api_key(token, user.api_key):
+        app.logger.warning('Using revoked API key')
+        raise Rejected(401, "Your API Key has been revoked. Use the latest key to access the API or reset your key")
+
+    return user, claims
+
+async def _stored_response(session, user_id, key):
+    record = (await session.execute(
+        select(IdempotencyRecord).where(
+            IdempotencyRecord.user_id == user_id,
+            IdempotencyRecord.key == key))).scalar_one_or_none()
+    if record is None:
+        return None
+    if record.expires_at.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+        await session.delete(record)
+        await session.flush()
+        return None
+    # a NULL body is a request that is still running
+    return record.fingerprint, record.status_code, record.body
+
+async def _claim(session, app, user_id, key, fingerprint):
+    # committed before any work, so a retry on any worker finds the key taken
+    record = pending_record(user_id, key, fingerprint, app.config.get("IDEMPOTENCY_PENDING_TTL", PENDING_TTL))
+    session.add(record)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        return None
+    return record.id
+
+def _replay(stored, fingerprint):
+    if stored[0] != fingerprint:
+        raise Rejected(422, "Idempotency-Key was already used for a different request")
+    if stored[2] is None:
+        raise Rejected(409, "A request with this Idempotency-Key is in progress", {"Retry-After": "1"})
+    return stored[1], stored[2], {"Idempotent-Replayed": "true"}
+
+async def ingest_entry(session, app, headers, body):
+    """/entry for the asyncio ingestion service. Returns (status code, JSON body, headers).
+
+    Runs the same checks and writes the same rows as server/routes/entry.py,
+    with every database round trip awaited on `session`. The Flask app is only
+    used for its config, logger and the helpers that read current_user.
+    """
+    with app.app_context():
+        user, claims = await authenticate(session, app, headers.get("Authorization"))
+        g._jwt_extended_jwt = claims
+        g._jwt_extended_jwt_user = {"loaded_user": user}
+
+        if os.environ.get("DEMO_ENVIRONMENT") == "1":
+            return 200, app.json.dumps({"msg": "This operation is not allowed in a demo environment"}), {}
+
+        key = headers.get("Idempotency-Key")
+        if not key:
+            return await _create_entry(session, app, user, body, None)
+        if len(key) > MAX_KEY_LENGTH:
+            raise Rejected(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        fingerprint = hashlib.blake2b(body, digest_size=16).hexdigest()
+        stored = await _stored_response(session, user.id, key)
+        if stored is None:
+            record_id = await _claim(session, app, user.id, key, fingerprint)
+            if record_id is None:
+                stored = await _stored_response(session, user.id, key) or (fingerprint, None, None)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        try:
+            return await _create_entry(session, app, user, body, record_id)
+        except BaseException:
+            await session.rollback()
+            await _release(session, record_id)
+            raise
+
+async def _release(session, record_id):
+    # nothing was written, so a retry may run again
+    if record_id is not None:
+        await session.execute(release_record(record_id))
+        await session.commit()
+
+async def _create_entry(session, app, user, body, record_id):
+    try:
+        payload = app.json.loads(body)
+    except ValueError:
+        raise Rejected(400, "Malformed request")
+
+    # loaded here so the schema's location check is a cache hit rather
+    # than a query on the synchronous session
+    try:
+        await get_location_snapshot_async(session, user, payload["location_id"])
+    except (TypeError, ValueError, KeyError):
+        pass
+    data = parse_input_data(payload)
+    if not data:
+        raise Rejected(400, "Invalid JSON body")
+
+    location = await get_location_snapshot_async(session, user, data["location_id"])
+    if 'entered_at' in data:
+        current_time = convert_to_UTC(data['entered_at'], user.timezone)
+    else:
+        current_time = datetime.now(timezone.utc)
+
+    if not check_operational(location, current_time):
+        app.logger.info(f"Location {location.name} is not operational")
+        await _release(session, record_id)
+        return 200, app.json.dumps({"msg": f"Location {location.name} is not operational"}), {}
+
+    if (await session.execute(duplicate_entry_query(data['member_id'], current_time))).first():
+        app.logger.info(f"Duplicate entry detected in {location.name} for {data['member_id']}")
+        await _release(session, record_id)
+        return 201, app.json.dumps({"msg": "Duplicate entry attempts"}), {}
+
+    is_high_risk = (await session.execute(high_risk_member_query(user.id, data["member_id"]))).first() is not None
+    if is_high_risk:
+        app.logger.info(f"High risk member {data['member_id']} entered {location.name}")
+
+    merged_into = await merge_into_open_event_async(session, location.id, current_time, is_high_risk)
+    event, entry, videos = build_entry(location, data, current_time, is_high_risk, merged_into)
+    event_id, started_at = merged_into or (event.id, current_time)
+    session.add_all(([event] if event else []) + [entry] + videos)
+    session.add(change_event("entry_created", user.id, location_id=location.id, event_id=event_id,
+                             entry_id=entry.id, status=EntryStatusCode.CREATED))
+
+    # boto3 clients are thread-safe; presigning is local but the first call
+    # may still load credentials
+    if location.upload_method.value == "UserUpload":
+        uploads = await asyncio.to_thread(user_upload, videos)
+    elif location.upload_method.value == "RTSP":
+        await asyncio.to_thread(rtsp_upload, videos, *recording_windows(location, current_time))
+        uploads = [{"video_id": video.id} for video in videos]
+    else:
+        raise Rejected(400, f"Invalid upload method for location {location.name}")
+
+    response = app.json.dumps(EntryWebhookResponseSchema().dump({"entry_id": entry.id, "videos": uploads}))
+    if record_id is not None:
+        await session.execute(fill_record(record_id, 201, response, app.config.get("IDEMPOTENCY_TTL", IDEMPOTENCY_TTL)))
+
+    await session.commit()
+    remember_entry(location.id, current_time, event_id, started_at)
+
+    return 201, response, {}
@@ -0,0 +1,77 @@
+import time
+import traceback
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from ingest.entry import ingest_entry, Rejected
+from utils.metrics import REQUEST_LATENCY
+
+# An asyncio process for /entry, run next to the gunicorn app (start-ingest.sh).
+# A gunicorn worker is blocked for the whole of every MySQL and AWS round trip
+# of a webhook; here those are awaited, so one process keeps thousands of
+# webhooks in flight and only holds a connection while it queries.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def async_database_uri(uri):
+    url = make_url(uri)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+def create_ingest_app(flask_app):
+    """The ASGI app, configured from the same FLASK_ settings as create_app()."""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        engine = create_async_engine(async_database_uri(flask_app.config["SQLALCHEMY_DATABASE_URI"]),
+                                     **flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+        app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        yield
+        await engine.dispose()
+
+    def json_response(status_code, body, headers=None):
+        return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
+    def error(status_code, msg, headers=None):
+        with flask_app.app_context():
+            return json_response(status_code, flask_app.json.dumps({"msg": msg}), headers)
+
+    async def entry_webhook(request):
+        started_at = time.perf_counter()
+        body = await request.body()
+        async with request.app.state.sessions() as session:
+            try:
+                response = json_response(*await ingest_entry(session, flask_app, request.headers, body))
+            except Rejected as e:
+                await session.rollback()
+                response = error(e.status_code, e.msg, e.headers)
+            except PoolTimeoutError:
+                await session.rollback()
+                response = error(503, "Service is overloaded, retry shortly", {"Retry-After": "1"})
+            except Exception:
+                await session.rollback()
+                flask_app.logger.warning(f'location: ingest_entry\n{traceback.format_exc()}')
+                response = error(400, "Method unsuccessful")
+
+        REQUEST_LATENCY.labels('ingest.entry_webhook', 'POST', str(response.status_code)) \
+            .observe(time.perf_counter() - started_at)
+        return response
+
+    async def healthz(request):
+        return json_response(200, '{"status": "ok"}')
+
+    return Starlette(routes=[
+        Route("/entry", entry_webhook, methods=["POST"]),
+        Route("/healthz", healthz, methods=["GET"]),
+    ], lifespan=lifespan)
@@ -7,8 +7,16 @@ from sqlalchemy import select
 from flask_jwt_extended import JWTManager
 
 from server.routes import *
+from server.commands import init_db, generate_data_command, prune_changes_command, remerge_events_command, \
+    prune_idempotency_keys_command, recover_entry_buffer_command, convert_uuid_keys_command
 from databases import db, User
 from utils.misc import configure_logging
+from utils.env import get_engine_options
+from utils.metrics import init_metrics
+from utils.json_provider import get_json_provider_class
+from utils.http import init_compression
+from utils.ratelimit import init_load_shedding
+from utils.write_buffer import init_write_buffer
 
 def create_app():
     app = Flask(__name__)
@@ -28,8 +36,15 @@ def create_app():
     app.config["JWT_COOKIE_SAMESITE"] = "Strict"
     app.config["JWT_COOKIE_SECURE"] = os.environ.get("DEMO_ENVIRONMENT", "0") == "1"
     app.config.from_prefixed_env()
+    app.json = get_json_provider_class(app.config.get("JSON_PROVIDER"))(app)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS",
+                          get_engine_options(app.config.get("SQLALCHEMY_DATABASE_URI")))
     db.init_app(app)
     jwt.init_app(app)
+    init_metrics(app)
+    init_compression(app)
+    init_load_shedding(app)
+    init_write_buffer(app)
     configure_logging()
     
     return app
@@ -46,7 +61,14 @@ def register_blueprint(app):
         app.register_blueprint(event)
         app.register_blueprint(entry)
         app.register_blueprint(high_risk_member)
-        db.create_all()
-        
+        app.register_blueprint(change)
+
+    app.cli.add_command(init_db)
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(prune_changes_command)
+    app.cli.add_command(remerge_events_command)
+    app.cli.add_command(prune_idempotency_keys_command)
+    app.cli.add_command(recover_entry_buffer_command)
+    app.cli.add_command(convert_uuid_keys_command)
 
     return app
\ No newline at end of file
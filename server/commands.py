@@ -0,0 +1,104 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app as app
+from flask.cli import with_appcontext
+
+from sqlalchemy import select
+
+from databases import db, Location
+from databases.generator import generate_data
+from databases.uuid_keys import convert_uuid_keys
+from utils.changes import prune_changes
+from utils.merge import remerge_location
+from utils.idempotency import prune_idempotency_records
+from utils.write_buffer import recover_buffers
+
+@click.command("init-db")
+@with_appcontext
+def init_db():
+    """Create any missing tables. Run once per deploy, not per worker."""
+    db.create_all()
+    app.logger.info("Database schema is up to date")
+
+@click.command("generate-data")
+@click.option("--organizations", default=1, show_default=True)
+@click.option("--users-per-organization", default=1, show_default=True)
+@click.option("--locations-per-user", default=2, show_default=True)
+@click.option("--cameras-per-location", default=2, show_default=True)
+@click.option("--entries-per-location", default=1000, show_default=True)
+@click.option("--days", default=30, show_default=True, help="Spread entries over this many days")
+@click.option("--members-per-location", default=5000, show_default=True)
+@click.option("--high-risk-per-location", default=5, show_default=True)
+@click.option("--unreviewed-ratio", default=0.2, show_default=True)
+@click.option("--user-prefix", default="user", show_default=True)
+@click.option("--password", default="password", show_default=True)
+@click.option("--batch-size", default=20000, show_default=True, help="Videos per INSERT batch")
+@click.option("--seed", default=0, show_default=True)
+@with_appcontext
+def generate_data_command(**kwargs):
+    """Bulk insert synthetic organizations, users, locations and events."""
+    start = time.perf_counter()
+
+    def progress(counts):
+        rows = counts["events"] + counts["entries"] + counts["videos"]
+        click.echo(f'{rows} rows in {time.perf_counter() - start:.0f}s', err=True)
+
+    counts = generate_data(progress=progress, **kwargs)
+    elapsed = time.perf_counter() - start
+    rows = counts["events"] + counts["entries"] + counts["videos"]
+    click.echo(", ".join(f"{count} {name}" for name, count in counts.items()))
+    click.echo(f"Inserted {rows} event/entry/video rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+
+@click.command("prune-changes")
+@click.option("--days", default=7, show_default=True, help="Keep this many days of the change feed")
+@with_appcontext
+def prune_changes_command(days):
+    """Delete change feed rows older than --days. Clients further behind are told to reset."""
+    deleted = prune_changes(datetime.now(timezone.utc) - timedelta(days=days))
+    click.echo(f"Deleted {deleted} changes")
+
+@click.command("prune-idempotency-keys")
+@with_appcontext
+def prune_idempotency_keys_command():
+    """Delete stored responses whose Idempotency-Key has expired."""
+    deleted = prune_idempotency_records(datetime.now(timezone.utc))
+    click.echo(f"Deleted {deleted} expired idempotency keys")
+
+@click.command("recover-entry-buffer")
+@with_appcontext
+def recover_entry_buffer_command():
+    """Commit entries left in the write buffer by workers that stopped before flushing them."""
+    recovered = recover_buffers()
+    click.echo(f"Recovered {recovered} buffered entries")
+
+@click.command("convert-uuid-keys")
+@with_appcontext
+def convert_uuid_keys_command():
+    """Convert Event/Entry/Video keys stored as 36-character strings to 16-byte UUIDs. Stop the app first."""
+    converted = convert_uuid_keys()
+    if not converted:
+        click.echo("UUID keys are already binary")
+        return
+    click.echo(f"Converted {', '.join(f'{table}.{column}' for table, column in converted)}")
+
+@click.command("remerge-events")
+@click.option("--location-id", "location_ids", type=int, multiple=True, help="Only these locations (repeatable)")
+@click.option("--days", type=int, default=None, help="Only events queued in the last --days days")
+@click.option("--dry-run", is_flag=True, help="Report what would be merged without writing")
+@with_appcontext
+def remerge_events_command(location_ids, days, dry_run):
+    """Merge historical bursts of unreviewed entries into one event each, as /entry does for new ones."""
+    if not location_ids:
+        location_ids = db.session.execute(select(Location.id).order_by(Location.id)).scalars().all()
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+
+    total_merged = total_removed = 0
+    for location_id in location_ids:
+        merged, removed = remerge_location(location_id, since, dry_run)
+        total_merged += merged
+        total_removed += removed
+        if merged:
+            click.echo(f"Location {location_id}: {merged} bursts, {removed} events removed")
+    click.echo(f"{'Would merge' if dry_run else 'Merged'} {total_merged} bursts, removing {total_removed} events")
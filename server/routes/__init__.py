@@ -6,4 +6,5 @@ from .video import video
 from .schedule import schedule
 from .event import event
 from .entry import entry
-from .high_risk_member import high_risk_member
\ No newline at end of file
+from .high_risk_member import high_risk_member
+from .change import change
\ No newline at end of file
@@ -1,20 +1,22 @@
-import datetime
-
 from flask import Blueprint, request, Response, jsonify
 from flask import current_app as app
 from flask_jwt_extended import current_user
 from sqlalchemy import select, update, func
 
 from databases import db, Action, Event
-from databases.schemas import ActionSchema, EventSchema
+from databases.schemas import ActionSchema
+from databases.serializers import EventSerializer
 from utils.auth import error_handler
+from utils.http import conditional, config_etag
 from utils.action import check_action_exists, retrieve_action, retrieve_actions
-from utils.event import retrieve_event
+from utils.event import retrieve_event, review_event, get_reviewer
+from utils.changes import record_change
 
 action = Blueprint("action", "__name__")
 
 @action.get("/actions")
 @error_handler()
+@conditional(config_etag)
 def get_actions() -> Response:
     all_actions = retrieve_actions()
     all_actions = ActionSchema(many=True).dump(all_actions)
@@ -45,7 +47,7 @@ def create_action() -> Response:
     return jsonify(action), 201
 
     
-@action.post("/action-to-event/<event_id>/<action_id>")
+@action.post("/action-to-event/<uuid:event_id>/<action_id>")
 @error_handler()
 def apply_action_to_event(event_id, action_id):
     body = request.json
@@ -62,20 +64,23 @@ def apply_action_to_event(event_id, action_id):
 
     action = retrieve_action(action_id)
     
-    if action:
-        event.action_id = action_id
-        event.reviewed_at = datetime.datetime.now(datetime.timezone.utc)
-        event.comment = comment
-        db.session.commit()
-
-        app.logger.info(f'Action id {action_id} applied to event id {event_id} | user id: {current_user.id}')
-
-        res = EventSchema().dump(event)
-        return jsonify(res), 201
-    else:
+    if not action:
         app.logger.info(f'Action id {action_id} not found | user id: {current_user.id}')
         return jsonify({"msg": f"Action id {action_id} not found"}), 404
 
+    if not review_event(event.id, action.id, comment, get_reviewer(body)):
+        app.logger.info(f'Event id {event_id} is reviewed or claimed by another reviewer | user id: {current_user.id}')
+        return jsonify({"msg": f'Event id {event_id} is already reviewed or claimed by another reviewer'}), 409
+
+    record_change("event_reviewed", current_user.id, location_id=event.location_id,
+                  event_id=event.id, action_id=action.id)
+    db.session.commit()
+
+    app.logger.info(f'Action id {action_id} applied to event id {event_id} | user id: {current_user.id}')
+
+    res = EventSerializer().dump(event)
+    return jsonify(res), 201
+
 @action.delete("/action/<action_id>")
 @error_handler()
 def delete_action(action_id):
@@ -102,6 +107,18 @@ def delete_action(action_id):
 @error_handler()
 def update_action():
     data = request.json
+
+    deleted_action_ids = [action["id"] for action in data["actions"]
+                          if action.get("id") is not None and action["is_deleted"]]
+    if deleted_action_ids:
+        action_id_in_use = db.session.execute(
+            select(Event.action_id).where(
+                Event.action_id.in_(deleted_action_ids),
+                Event.deleted_at.is_(None)).limit(1)).scalar_one_or_none()
+        if action_id_in_use is not None:
+            app.logger.info(f'Action id {action_id_in_use} has associated events | user id: {current_user.id}')
+            return jsonify({"msg": f"Action has associated events"}), 400
+
     for action in data["actions"]:
         if action.get("id") is None:
             if "id" in action:
@@ -110,15 +127,6 @@ def update_action():
             action = Action(**action)
             db.session.add(action)
         else:
-            if action["is_deleted"]:
-                action_events = db.session.execute(
-                    select(Event).where(
-                        Event.action_id == action["id"],
-                        Event.deleted_at.is_(None))).unique().scalars().all()
-                if action_events:
-                    app.logger.info(f'Action id {action["id"]} has associated events | user id: {current_user.id}')
-                    return jsonify({"msg": f"Action has associated events"}), 400
-
             query = update(Action).where(
                 Action.user_id == current_user.id,
                 Action.id == action["id"]).values(**action)
@@ -0,0 +1,77 @@
+import time
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask import current_app as app
+from flask_jwt_extended import current_user
+
+from utils.auth import error_handler
+from utils.changes import latest_sequence, missed_changes, wait_for_changes, max_wait
+
+change = Blueprint("change", "__name__")
+
+def _parse_since(value):
+    if value is None or value == "":
+        return None
+    since = int(value)
+    if since < 0:
+        raise ValueError(since)
+    return since
+
+@change.get("/changes")
+@error_handler()
+def get_changes() -> Response:
+    """Long-poll: returns as soon as there are changes after `since`, or after `timeout` seconds."""
+    try:
+        since = _parse_since(request.args.get("since"))
+        timeout = min(float(request.args.get("timeout", 25)), max_wait(app.config.get("CHANGE_FEED_MAX_WAIT", 55)))
+    except ValueError:
+        return jsonify({"msg": "since must be a sequence number and timeout a number of seconds"}), 400
+
+    user_id = current_user.id
+    if since is None:
+        return jsonify({"changes": [], "last_seq": latest_sequence(user_id), "reset": False}), 200
+
+    reset = missed_changes(since)
+    changes = wait_for_changes(user_id, since, max(timeout, 0))
+    last_seq = changes[-1]["id"] if changes else since
+
+    return jsonify({"changes": changes, "last_seq": last_seq, "reset": reset}), 200
+
+@change.get("/changes/stream")
+@error_handler(api=False)
+def stream_changes() -> Response:
+    """Server-Sent Events; EventSource resumes from the Last-Event-ID it last saw."""
+    try:
+        since = _parse_since(request.headers.get("Last-Event-ID") or request.args.get("since"))
+    except ValueError:
+        return jsonify({"msg": "since must be a sequence number"}), 400
+
+    user_id = current_user.id
+    if since is None:
+        since = latest_sequence(user_id)
+    reset = missed_changes(since)
+
+    stream_seconds = max_wait(app.config.get("CHANGE_FEED_STREAM_SECONDS", 300))
+    keepalive_seconds = app.config.get("CHANGE_FEED_KEEPALIVE_SECONDS", 15)
+
+    def events(since):
+        yield "retry: 3000\n\n"
+        if reset:
+            yield f"id: {since}\nevent: reset\ndata: {{}}\n\n"
+
+        # Streams are closed after a while so workers are recycled; the
+        # browser reconnects on its own.
+        deadline = time.monotonic() + stream_seconds
+        while time.monotonic() < deadline:
+            changes = wait_for_changes(user_id, since, min(keepalive_seconds, deadline - time.monotonic()))
+            if not changes:
+                yield ": keep-alive\n\n"
+                continue
+            for change in changes:
+                since = change["id"]
+                yield f"id: {since}\nevent: change\ndata: {app.json.dumps(change)}\n\n"
+
+    response = Response(stream_with_context(events(since)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -1,5 +1,3 @@
-import json
-from uuid import uuid4
 from datetime import datetime, timedelta, timezone
 import os
 
@@ -8,25 +6,27 @@ from flask import current_app as app
 from flask_jwt_extended import current_user
 from sqlalchemy import select
 
-from databases import db, Video, Location, Entry, Event
+from databases import db, Entry
 from databases.schemas import EntryWebhookResponseSchema
 from utils.auth import error_handler
 from utils.upload import *
 from utils.hours import convert_to_UTC
-from utils.metrics import timeit, fail_counter
 from utils.status_codes import EntryStatusCode, VideoStatusCode
-from utils.entry import parse_input_data, check_operational
+from utils.entry import parse_input_data, check_operational, duplicate_entry_query, build_entry, \
+    recording_windows, DUPLICATE_THRESHOLD
+from utils.merge import merge_into_open_event, remember_entry
+from utils.idempotency import idempotent, remember_response
+from utils.location import get_location_snapshot
+from utils.changes import record_change, record_entry_change
+from utils.watchlist import is_high_risk_member
+from utils import write_buffer
 
 
-DUPLICATE_THRESHOLD = 5.0
-PRECEDE_THRESHOLD = 5.0
-VIDEO_LENGTH = 10.0
 entry = Blueprint("entry", "__name__")
 
 @entry.post("/entry")
 @error_handler(web=False)
-@timeit
-@fail_counter
+@idempotent()
 def entry_webhook() -> Response:
     if os.environ.get("DEMO_ENVIRONMENT") == "1":
         return jsonify({
@@ -38,9 +38,7 @@ def entry_webhook() -> Response:
     if not data:
         return jsonify({"msg": "Invalid JSON body"}), 400
     
-    location = db.session.execute(
-        select(Location).where(Location.id == data["location_id"], Location.user_id == current_user.id)
-    ).scalar_one_or_none()
+    location = get_location_snapshot(data["location_id"])
     
     if 'entered_at' in data:
         entered_at = data['entered_at']
@@ -54,46 +52,34 @@ def entry_webhook() -> Response:
         app.logger.info(f"Location {location.name} is not operational")
         return jsonify({"msg": f"Location {location.name} is not operational"}), 200
     
-    duplicates = db.session.execute(
-        select(Entry).where(
-            Entry.member_id==data['member_id'],
-            Entry.entered_at<=current_time,
-            Entry.entered_at>=current_time-timedelta(seconds=DUPLICATE_THRESHOLD)
-        )
-    ).first()
+    buffered = write_buffer.enabled() and write_buffer.accepting()
+
+    duplicates = db.session.execute(duplicate_entry_query(data['member_id'], current_time)).first() \
+        or (buffered and write_buffer.pending_duplicate(
+            data['member_id'], current_time-timedelta(seconds=DUPLICATE_THRESHOLD), current_time))
     
     if duplicates:
         app.logger.info(f"Duplicate entry detected in {location.name} for {data['member_id']}")
         return jsonify({"msg": "Duplicate entry attempts"}), 201
 
-    event = Event(
-        id=str(uuid4()),
-        location_id=location.id,
-    )
+    is_high_risk = is_high_risk_member(data["member_id"])
+    if is_high_risk:
+        app.logger.info(f"High risk member {data['member_id']} entered {location.name}")
 
-    entry = Entry(
-        id=str(uuid4()),
-        event_id=event.id,
-        member_id=data["member_id"],
-        person_meta=json.dumps(data.get("person_meta", {})),
-        entered_at=current_time
-    )
+    merged_into = merge_into_open_event(location.id, current_time, is_high_risk, deferred=buffered)
+    event, entry, videos = build_entry(location, data, current_time, is_high_risk, merged_into)
+    if merged_into:
+        event_id, started_at = merged_into
+        app.logger.debug(f"Entry merged into event {event_id} in {location.name}")
+    else:
+        db.session.add(event)
+        event_id, started_at = event.id, current_time
 
-    db.session.add(event)
     db.session.add(entry)
+    db.session.add_all(videos)
 
-    videos = []
-
-    for camera in location.cameras:
-        vid = Video(
-            id=str(uuid4()),
-            camera_id=camera.id,
-            entry_id=entry.id,
-            status=VideoStatusCode.CREATED
-        )
-
-        db.session.add(vid)
-        videos.append(vid)
+    record_change("entry_created", current_user.id, location_id=location.id, event_id=event_id,
+                  entry_id=entry.id, status=EntryStatusCode.CREATED)
 
     if location.upload_method.value == "UserUpload":
         presigned_urls = user_upload(videos)
@@ -103,13 +89,15 @@ def entry_webhook() -> Response:
             "entry_id": entry.id,
             "videos": presigned_urls
         })
+
+        remember_response(response, 201)
+        commit_entry(entry.id, buffered, merged_into, is_high_risk)
+        remember_entry(location.id, current_time, event_id, started_at)
         
         return jsonify(response), 201
         
     elif location.upload_method.value == "RTSP":
-        streams = [camera.stream_url for camera in location.cameras]
-        start_timestamps = [current_time + timedelta(seconds=camera.offset_amount) for camera in location.cameras]
-        end_timestamps = [start_time + timedelta(seconds=VIDEO_LENGTH) for start_time in start_timestamps]
+        streams, start_timestamps, end_timestamps = recording_windows(location, current_time)
         
         app.logger.debug(f"RTSP upload started for {entry.id}")
 
@@ -120,7 +108,9 @@ def entry_webhook() -> Response:
             "videos": [{"video_id": vid.id} for vid in videos]
         })
 
-        db.session.commit()
+        remember_response(response, 201)
+        commit_entry(entry.id, buffered, merged_into, is_high_risk)
+        remember_entry(location.id, current_time, event_id, started_at)
 
         return jsonify(response), 201
     
@@ -131,7 +121,13 @@ def entry_webhook() -> Response:
         return jsonify({"msg": f"Invalid upload method for location {location.name}"}), 400
         
 
-@entry.post("/set-entry-status/<id>")
+def commit_entry(entry_id, buffered, merged_into, is_high_risk):
+    if buffered:
+        write_buffer.buffer_entry(entry_id, merge=(merged_into[0], is_high_risk) if merged_into else None)
+    else:
+        db.session.commit()
+
+@entry.post("/set-entry-status/<uuid:id>")
 @error_handler(admin=True)
 def set_entry_status(id):
     all_statuses = [status.name for status in VideoStatusCode]
@@ -152,6 +148,7 @@ def set_entry_status(id):
     status = EntryStatusCode[status]
     original_status = entry.status
     entry.status = status
+    record_entry_change(entry)
     db.session.commit()
 
     return jsonify({
@@ -1,20 +1,28 @@
+from datetime import datetime, timedelta, timezone
+
 from flask import Blueprint, request, Response, jsonify
 from flask import current_app as app
 from flask_jwt_extended import current_user
 from werkzeug.exceptions import NotFound
 
 from utils.auth import error_handler
-from utils.metrics import timeit
-from utils.event import retrieve_event
+from utils.http import conditional
+from utils.location import get_location_snapshot
+from utils.event import retrieve_event, retrieve_review_queue, retrieve_event_feed, decode_cursor, \
+    claim_events, release_events, get_reviewer
 from databases import db, query_events, get_page_info, Event, parse_time_range, query_adjacent_events
-from databases.schemas import EventSchema, EventWithPageInfoSchema
+from databases.serializers import EventSerializer, EventWithPageInfoSerializer
 
 event = Blueprint("event", "__name__")
 PER_PAGE = 10
+MAX_QUEUE_SIZE = 100
+FEED_STATUSES = ("unreviewed", "history", "saved", "all")
+MAX_LEASE_SECONDS = 3600
 
 
 @event.get("/unreviewed-events/<location_id>")
 @error_handler()
+@conditional()
 def get_all_unreviewed_events(location_id) -> Response:
     member_id = request.args.get("memberId", None)
     time_range = parse_time_range(request.args.get('time', None))
@@ -22,13 +30,90 @@ def get_all_unreviewed_events(location_id) -> Response:
     query = query_events(location_id, member_id, time_range, None)
         
     events = db.session.execute(query).unique().scalars()
-    events = EventSchema(many=True).dump(events)
+    events = EventSerializer(many=True).dump(events)
+
+    return jsonify({"events": events})
+
+@event.get("/review-queue")
+@error_handler()
+@conditional()
+def get_review_queue() -> Response:
+    limit = request.args.get("limit", PER_PAGE, type=int)
+    location_ids = request.args.getlist("locationId", type=int)
+
+    if not 0 < limit <= MAX_QUEUE_SIZE:
+        return jsonify({"msg": f"limit must be between 1 and {MAX_QUEUE_SIZE}"}), 400
+
+    events = retrieve_review_queue(limit, location_ids)
+    events = EventSerializer(many=True).dump(events)
 
     return jsonify({"events": events})
 
+@event.post("/claim-events/<int:location_id>")
+@error_handler()
+def claim_unreviewed_events(location_id) -> Response:
+    data = request.get_json(silent=True) or {}
+    limit = data.get("limit", PER_PAGE)
+    lease_seconds = data.get("lease_seconds", app.config.get("REVIEW_LEASE_SECONDS", 300))
+
+    if not isinstance(limit, int) or not 0 < limit <= MAX_QUEUE_SIZE:
+        return jsonify({"msg": f"limit must be between 1 and {MAX_QUEUE_SIZE}"}), 400
+    if not isinstance(lease_seconds, int) or not 0 < lease_seconds <= MAX_LEASE_SECONDS:
+        return jsonify({"msg": f"lease_seconds must be between 1 and {MAX_LEASE_SECONDS}"}), 400
+
+    if not get_location_snapshot(location_id):
+        app.logger.info(f'Location id {location_id} not found | user id: {current_user.id}')
+        return jsonify({"msg": "Location not found"}), 404
+
+    reviewer = get_reviewer(data)
+    events = claim_events(location_id, reviewer, limit, lease_seconds)
+    app.logger.debug(f'{len(events)} events in location {location_id} claimed by {reviewer} | user id: {current_user.id}')
+
+    events = EventSerializer(many=True).dump(events)
+    return jsonify({"events": events, "reviewer": reviewer}), 200
+
+@event.post("/release-events")
+@error_handler()
+def release_claimed_events() -> Response:
+    data = request.get_json()
+    event_ids = data.get("event_ids")
+
+    if not isinstance(event_ids, list) or len(event_ids) > MAX_QUEUE_SIZE:
+        return jsonify({"msg": f"event_ids must be a list of at most {MAX_QUEUE_SIZE} ids"}), 400
+
+    released = release_events(event_ids, get_reviewer(data))
+    return jsonify({"released": released}), 200
+
+@event.get("/events")
+@error_handler()
+@conditional()
+def get_event_feed() -> Response:
+    limit = request.args.get("limit", PER_PAGE, type=int)
+    location_ids = request.args.getlist("locationId", type=int)
+    status = request.args.get("status", "unreviewed")
+    time_range = parse_time_range(request.args.get('time', None))
+
+    if not 0 < limit <= MAX_QUEUE_SIZE:
+        return jsonify({"msg": f"limit must be between 1 and {MAX_QUEUE_SIZE}"}), 400
+    if status not in FEED_STATUSES:
+        return jsonify({"msg": f"status must be one of {', '.join(FEED_STATUSES)}"}), 400
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            cursor = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"msg": "Invalid cursor"}), 400
+
+    start_time = datetime.now(timezone.utc) - timedelta(seconds=time_range) if time_range else None
+    events, next_cursor = retrieve_event_feed(limit, location_ids, status, start_time, cursor)
+    events = EventSerializer(many=True).dump(events)
+
+    return jsonify({"events": events, "next_cursor": next_cursor})
+
 @event.get("/unreviewed-events/<location_id>/<int:page>")
-@timeit
 @error_handler()
+@conditional()
 def get_unreviewed_events(location_id, page) -> Response:
     member_id = request.args.get("memberId", None)
     time_range = parse_time_range(request.args.get('time', None))
@@ -44,11 +129,12 @@ def get_unreviewed_events(location_id, page) -> Response:
     page_info = get_page_info(unreviewed_paginate)
     res = {"events": events} | {"page_info": page_info}
 
-    res = EventWithPageInfoSchema().dump(res)
+    res = EventWithPageInfoSerializer().dump(res)
     return jsonify(res)
 
 @event.get("/history-events/<location_id>")
 @error_handler()
+@conditional()
 def get_all_history_events(location_id) -> Response:
     action_ids = request.args.getlist("actionId", None)
     member_id = request.args.get("memberId", None)
@@ -57,13 +143,13 @@ def get_all_history_events(location_id) -> Response:
     query = query_events(location_id, member_id, time_range, action_ids, True)
     
     events = db.session.execute(query).unique().scalars()
-    events = EventSchema(many=True).dump(events)
+    events = EventSerializer(many=True).dump(events)
     
     return jsonify({"events": events})
 
 @event.get("/history-events/<location_id>/<int:page>")
-@timeit
 @error_handler()
+@conditional()
 def get_history_events(location_id, page) -> Response:
     action_ids = request.args.getlist("actionId", None)
     member_id = request.args.get("memberId", None)
@@ -79,12 +165,12 @@ def get_history_events(location_id, page) -> Response:
     events = history_paginate.items
     page_info = get_page_info(history_paginate)
     res = {"events": events} | {"page_info": page_info}
-    res = EventWithPageInfoSchema().dump(res)
+    res = EventWithPageInfoSerializer().dump(res)
 
     return jsonify(res)
         
     
-@event.get("/adjacent-events/<id>")
+@event.get("/adjacent-events/<uuid:id>")
 @error_handler(api=False)
 def get_adjacent_events(id):
     action_id = request.args.get("actionId", None)
@@ -115,33 +201,36 @@ def get_adjacent_events(id):
         
     return jsonify({"next_event": next_event, "previous_event": previous_event})
 
-@event.get("/event/<id>")
+@event.get("/event/<uuid:id>")
 @error_handler()
+@conditional()
 def get_event_with_id(id) -> Response:
     event = retrieve_event(id)
     
     if not event:
         return jsonify({"msg": "Event not found"}), 404
 
-    event = EventSchema().dump(event)
+    event = EventSerializer().dump(event)
     
     return jsonify(event)
 
 
 @event.get("/saved-events/<location_id>")
 @error_handler()
+@conditional()
 def get_all_saved_events(location_id) -> Response:
     member_id = request.args.get("memberId", None)
     time_range = parse_time_range(request.args.get('time', None))
 
     query = query_events(location_id, member_id, time_range, None, saved=True)
     events = db.session.execute(query).unique().scalars()
-    events = EventSchema(many=True).dump(events)
+    events = EventSerializer(many=True).dump(events)
     
     return jsonify({"events": events})
 
 @event.get("/saved-events/<location_id>/<int:page>")
 @error_handler()
+@conditional()
 def get_saved_events(location_id, page) -> Response:
     member_id = request.args.get("memberId", None)
     time_range = parse_time_range(request.args.get('time', None))
@@ -156,11 +245,11 @@ def get_saved_events(location_id, page) -> Response:
     events = saved_paginate.items
     page_info = get_page_info(saved_paginate)
     res = {"events": events} | {"page_info": page_info}
-    res = EventWithPageInfoSchema().dump(res)
+    res = EventWithPageInfoSerializer().dump(res)
     
     return jsonify(res)
 
-@event.put("/event-save-status/<id>")
+@event.put("/event-save-status/<uuid:id>")
 @error_handler()
 def update_event_save_status(id):
     save = request.json.get("save")
@@ -173,6 +262,6 @@ def update_event_save_status(id):
     
     event.is_saved = save
     db.session.commit()
-    event = EventSchema().dump(event)
+    event = EventSerializer().dump(event)
     
     return jsonify(event)
\ No newline at end of file
@@ -3,18 +3,24 @@ import datetime
 from flask import Blueprint, request, Response, jsonify
 from flask import current_app as app
 from flask_jwt_extended import current_user
-from sqlalchemy import select, update, func
+from sqlalchemy import select, func
 from sqlalchemy.exc import OperationalError
 
 from databases import db, HighRiskMember
 from databases.schemas import HighRiskMemberSchema
 from utils.auth import error_handler
-from utils.member import check_high_risk_member_exists, retrieve_high_risk_member, retrieve_high_risk_members
+from utils.http import conditional, config_etag
+from utils.member import check_high_risk_member_exists, retrieve_high_risk_member, retrieve_high_risk_members, \
+    reactivate_high_risk_member, soft_delete_high_risk_member, add_high_risk_member, parse_member_ids, \
+    import_high_risk_members
+
+MAX_IMPORT_SIZE = 100000
 
 high_risk_member = Blueprint("high_risk_member", "__name__")
 
 @high_risk_member.get("/high-risk-members")
 @error_handler()
+@conditional(config_etag)
 def get_high_risk_members() -> Response:
     high_risk_members = retrieve_high_risk_members()
     
@@ -29,6 +35,12 @@ def create_high_risk_member(member_id) -> Response:
         app.logger.info(f'High risk member id {member_id} already exists | user id: {current_user.id}')
         return jsonify({"msg": "High risk member already exists"}), 400    
     
+    deleted_member = reactivate_high_risk_member(member_id)
+    if deleted_member:
+        db.session.commit()
+        app.logger.info(f'High risk member id {member_id} reactivated | user id: {current_user.id}')
+        return jsonify(HighRiskMemberSchema().dump(deleted_member)), 201
+
     db.session.add(HighRiskMember(
         user_id=current_user.id,
         member_id=member_id,
@@ -62,11 +74,7 @@ def delete_high_risk_member(member_id) -> Response:
         app.logger.info(f'High risk member id {member_id} not found | user id: {current_user.id}')
         return jsonify({"msg": "High risk member not found"}), 404
     
-    db.session.execute(
-        update(HighRiskMember)
-        .where(HighRiskMember.id == high_risk_member.id)
-        .values(is_deleted=True)
-    )
+    soft_delete_high_risk_member(high_risk_member)
     db.session.commit()
 
     return jsonify({"msg": "High risk member deleted successfully"}), 200
@@ -75,25 +83,52 @@ def delete_high_risk_member(member_id) -> Response:
 @error_handler()
 def update_high_risk_members() -> Response:
     data = request.json
-    
+
+    # same rules as creating, deleting and importing members one by one, so
+    # the unique (user, member, is_deleted) rows never collide
     for member in data["members"]:
         if member.get("id") is None:
-            if "id" in member:
-                del member["id"]
-            member["user_id"] = current_user.id
-            member["created_at"] = datetime.datetime.now(datetime.timezone.utc)
-            db.session.add(HighRiskMember(**member))
-        else:
-            member["created_at"] = datetime.datetime.fromisoformat(member["created_at"])
-            db.session.execute(
-                update(HighRiskMember)
-                .where(HighRiskMember.id == member["id"])
-                .values(**member)
-            )
+            if not member.get("is_deleted"):
+                add_high_risk_member(member["member_id"])
+            continue
+
+        existing = db.session.execute(
+            select(HighRiskMember).where(HighRiskMember.id == member["id"],
+                                         HighRiskMember.user_id == current_user.id)
+        ).scalar_one_or_none()
+        if existing is None:
+            continue
+        was_deleted, member_id = existing.is_deleted, member.get("member_id", existing.member_id)
+        is_deleted = member.get("is_deleted", was_deleted)
+        renamed = member_id != existing.member_id
+        if not was_deleted and (is_deleted or renamed):
+            soft_delete_high_risk_member(existing)
+        if not is_deleted and (was_deleted or renamed):
+            add_high_risk_member(member_id)
     db.session.commit()
 
     return get_high_risk_members()
 
+@high_risk_member.post("/high-risk-members/import")
+@error_handler()
+def import_high_risk_member_list() -> Response:
+    try:
+        member_ids = parse_member_ids(request)
+    except (ValueError, UnicodeDecodeError) as e:
+        app.logger.info(f'Invalid high risk member import: {e} | user id: {current_user.id}')
+        return jsonify({"msg": str(e)}), 400
+
+    if len(member_ids) > MAX_IMPORT_SIZE:
+        return jsonify({"msg": f"At most {MAX_IMPORT_SIZE} member ids can be imported at once"}), 400
+
+    mode = request.args.get("mode", "replace")
+    if mode not in ("replace", "merge"):
+        return jsonify({"msg": "mode must be replace or merge"}), 400
+
+    summary = import_high_risk_members(member_ids, replace=mode == "replace")
+    app.logger.info(f'Imported {len(member_ids)} high risk members ({mode}) | user id: {current_user.id}')
+    return jsonify(summary), 200
+
 @high_risk_member.get("/high-risk-member/<member_id>")
 @error_handler()
 def get_high_risk_member(member_id) -> Response:
@@ -3,25 +3,29 @@ from flask import current_app as app
 from flask_jwt_extended import current_user
 
 from utils.auth import error_handler
+from utils.http import conditional, config_etag
 from utils.stats import get_total_unreviewed_events_per_location, get_total_entries_per_location,\
     get_total_number_in_process_per_location, merge_stats
 from databases import db
 from databases.schemas import LocationSchema, StatsSchema, UpdateLocationSettingInputSchema
+from databases.serializers import LocationSerializer
 from utils.location import retrieve_location_id, retrieve_location, retrieve_locations
 
 location = Blueprint("location", "__name__")
 
 @location.get("/locations")
 @error_handler()
+@conditional(config_etag)
 def get_locations() -> Response:
     locations = retrieve_locations()
     
-    locations = LocationSchema(many=True).dump(locations)
+    locations = LocationSerializer(many=True).dump(locations)
 
     return jsonify({"locations": locations}), 200
 
 @location.get("/location/<location_id>")
 @error_handler()
+@conditional(config_etag)
 def get_location(location_id) -> Response:
     location = retrieve_location(location_id)
 
@@ -29,7 +33,7 @@ def get_location(location_id) -> Response:
         app.logger.info(f'Location id {location_id} not found | user id: {current_user.id}')
         return jsonify({"msg": f"Location {location_id} for user {current_user.id} not found"}), 404
 
-    return jsonify(LocationSchema().dump(location)), 200
+    return jsonify(LocationSerializer().dump(location)), 200
     
 @location.get("/location-id/<name>")
 @error_handler()
@@ -7,8 +7,9 @@ from sqlalchemy import select
 
 from databases import db, Location
 from databases.schemas import LocationSchema
-from clients import sqs_client
+from clients import get_sqs_client
 from utils.auth import error_handler
+from utils.http import conditional, config_etag
 from utils.hours import WeekSchedule, InvalidScheduleException
 from utils.location import retrieve_location
 
@@ -16,6 +17,7 @@ schedule = Blueprint("schedule", "__name__")
 
 @schedule.get('/schedule/<location_id>')
 @error_handler()
+@conditional(config_etag)
 def get_location_schedule(location_id):
     location = retrieve_location(location_id)
 
@@ -106,6 +108,7 @@ def modify_location_schedule(location_id):
         'new_schedule': new_schedule
     }
 
+    sqs_client = get_sqs_client()
     queue_url = sqs_client.get_queue_url(QueueName=os.getenv('UPDATE_SCHEDULE_QUEUE'))['QueueUrl']
     sqs_client.send_message(
         QueueUrl=queue_url,
@@ -6,18 +6,18 @@ from flask import current_app as app, request
 from flask_jwt_extended import current_user
 from sqlalchemy import select
 
-from clients import s3_client
+from clients import get_s3_client
 from utils.auth import error_handler
-from utils.metrics import timeit, fail_counter
-from utils.video import get_video, send_video_to_queue
+from utils.video import get_video, send_video_to_queue, set_video_statuses, confirm_uploads, send_videos_to_queue
 from utils.status_codes import VideoStatusCode, EntryStatusCode
+from utils.changes import record_video_change, record_entry_change
 from databases import db, Video, Camera, Location
+from databases.types import normalize_uuid
 
 video = Blueprint("video", "__name__")
+MAX_BATCH_SIZE = 500
         
-@video.get("/video/<id>")
-@timeit
-@fail_counter
+@video.get("/video/<uuid:id>")
 @error_handler()
 def generate_video_url(id):
     video = db.session.execute(
@@ -29,16 +29,16 @@ def generate_video_url(id):
         app.logger.info(f'Video id {id} not found | user id: {current_user.id}')
         return jsonify({"msg": "Video not found"}), 404
     try:
-        url = s3_client.generate_presigned_url('get_object',
-                                                Params={'Bucket':os.getenv('S3_BUCKET_NAME'),
-                                                        'Key':f'resized/hd/{video.id}.mp4'},
-                                                ExpiresIn=3600) 
+        url = get_s3_client().generate_presigned_url('get_object',
+                                                      Params={'Bucket':os.getenv('S3_BUCKET_NAME'),
+                                                              'Key':f'resized/hd/{video.id}.mp4'},
+                                                      ExpiresIn=3600) 
         return jsonify({"url": url})
     except Exception as e:
         app.logger.info(f'Send file failed with {video.id}: {e}')
         return jsonify({"msg": 'Video stream failed'}), 400
 
-@video.put("/video-status/<id>")
+@video.put("/video-status/<uuid:id>")
 @error_handler(admin=True)
 def set_video_status(id):
     all_statuses = [status.name for status in VideoStatusCode]
@@ -62,6 +62,7 @@ def set_video_status(id):
     if status == VideoStatusCode.PROCESS_READY:
         video.uploaded_at = datetime.now(timezone.utc)
     
+    record_video_change(video)
     db.session.commit()
 
     return jsonify({
@@ -70,7 +71,7 @@ def set_video_status(id):
         "new_status": status.name
     }), 201
 
-@video.post('/confirm-upload/<id>')
+@video.post('/confirm-upload/<uuid:id>')
 @error_handler(admin=True)
 def confirm_upload(id):
     video = get_video(id)
@@ -88,18 +89,71 @@ def confirm_upload(id):
             Video.id!=id,
             Video.status!=VideoStatusCode.PROCESS_READY)).unique().scalars().all()
     
+    record_video_change(video)
     if not other_videos:
         video.entry.status = EntryStatusCode.PROCESS_READY
+        record_entry_change(video.entry)
     
+    # read before commit, which expires the video
+    video_id, camera_id = video.id, video.camera_id
     db.session.commit()
 
-    camera = db.session.execute(
-        select(Camera).where(Camera.id==video.camera_id)).scalar_one_or_none()
-    send_video_to_queue(video, camera)
+    send_video_to_queue(video_id, camera_id)
 
     return jsonify({"msg": "Upload success"}), 201
 
-@video.get("/video-existence/<id>")
+@video.put("/video-statuses")
+@error_handler(admin=True)
+def set_video_statuses_in_bulk():
+    videos = request.get_json().get("videos") or []
+
+    if len(videos) > MAX_BATCH_SIZE:
+        return jsonify({"msg": f"At most {MAX_BATCH_SIZE} videos per request"}), 400
+
+    invalid_statuses = sorted({str(item.get("status")) for item in videos
+                               if item.get("status") not in VideoStatusCode.__members__})
+    if invalid_statuses:
+        app.logger.info(f"Invalid statuses {invalid_statuses} provided")
+        return jsonify({"msg": f"Invalid status {', '.join(invalid_statuses)} provided"}), 400
+
+    # ids are read back in canonical lowercase form
+    statuses = {normalize_uuid(item["id"]) or item["id"]: VideoStatusCode[item["status"]] for item in videos}
+    originals, missing = set_video_statuses(statuses)
+    db.session.commit()
+
+    return jsonify({
+        "videos": [{
+            "video_id": video_id,
+            "original_status": original[1].name,
+            "new_status": statuses[video_id].name
+        } for video_id, original in originals.items()],
+        "not_found": missing
+    }), 201
+
+@video.post('/confirm-uploads')
+@error_handler(admin=True)
+def confirm_uploads_in_bulk():
+    video_ids = list(dict.fromkeys(normalize_uuid(video_id) or video_id
+                                   for video_id in request.get_json().get("video_ids") or []))
+
+    if len(video_ids) > MAX_BATCH_SIZE:
+        return jsonify({"msg": f"At most {MAX_BATCH_SIZE} videos per request"}), 400
+
+    videos, missing, ready_entry_ids, messages = confirm_uploads(video_ids)
+    db.session.commit()
+
+    failed = send_videos_to_queue(messages)
+    if failed:
+        app.logger.warning(f"Processing messages failed for videos {failed}")
+
+    return jsonify({
+        "confirmed": list(videos),
+        "not_found": missing,
+        "ready_entries": ready_entry_ids,
+        "failed_messages": failed
+    }), 201
+
+@video.get("/video-existence/<uuid:id>")
 @error_handler(admin=True)
 def check_video_exist(id):
     video = db.session.execute(
@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# The asyncio /entry service (ingest/). Runs next to start.sh's gunicorn app,
+# which keeps serving everything else, and needs requirements-async.txt.
+if [ -z ${PROMETHEUS_MULTIPROC_DIR} ]; then
+    export PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus
+fi
+mkdir -p ${PROMETHEUS_MULTIPROC_DIR}
+
+echo "Starting the ingestion service (${INGEST_WORKERS:-1} workers)"
+uvicorn ingest.app:app --app-dir /var/www --host 0.0.0.0 --port ${INGEST_PORT:-5001} \
+    --workers ${INGEST_WORKERS:-1} --no-access-log
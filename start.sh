@@ -17,5 +17,21 @@ else
     echo "Created prometheus multiproc directory"
 fi
 
-echo "Starting gunicorn"
-gunicorn -b :5000 --pythonpath /var/www app:app --workers `nproc` --threads 1 --config=gunicorn_config.py
\ No newline at end of file
+if [ -n "${SECRETS_CACHE_DIR}" ] && [ -f "${SECRETS_CACHE_DIR}/secrets.json" ]; then
+    rm -f "${SECRETS_CACHE_DIR}/secrets.json"
+    echo "Removed cached secrets from the previous run"
+fi
+
+RATE_LIMIT_DIR="${FLASK_RATE_LIMIT_DIR:-${XDG_RUNTIME_DIR:-${TMPDIR:-/tmp}}/td_ratelimit-$(id -u)}"
+if [ -f "${RATE_LIMIT_DIR}/buckets.bin" ]; then
+    rm -f "${RATE_LIMIT_DIR}/buckets.bin"
+    echo "Removed rate limit buckets from the previous run"
+fi
+
+if [ "${INIT_DB:-1}" = "1" ]; then
+    echo "Creating missing database tables"
+    flask --app app init-db
+fi
+
+echo "Starting gunicorn (${GUNICORN_WORKER_CLASS:-sync} workers)"
+gunicorn --pythonpath /var/www app:app --config=gunicorn_config.py
\ No newline at end of file
@@ -1,16 +1,52 @@
-from server import create_app
+import os
+from datetime import datetime, timezone
+from uuid import NAMESPACE_OID, uuid5
+
+os.environ.setdefault("FLASK_SQLALCHEMY_DATABASE_URI", "sqlite://")
+os.environ.setdefault("FLASK_JWT_SECRET_KEY", "test-secret-key-for-the-test-suite")
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+os.environ.setdefault("FLASK_RATE_LIMIT_ENABLED", "false")
+
+from passlib.hash import sha256_crypt
 import pytest
 
+from server import create_app, register_blueprint
+from databases import db, User, Organization
+from utils import location
+from utils.camera import invalidate_cameras
+from utils.merge import forget_windows
+from utils.watchlist import invalidate_watchlists
+
 TEST_CREDENTIALS = {"id": "test", "password": "test"}
 
+def uid(name):
+    """A stable UUID for a readable test key such as "event-1"."""
+    return str(uuid5(NAMESPACE_OID, name))
+
 @pytest.fixture(scope='module')
 def test_client():
-    app, _ = create_app()
+    app = create_app()
+    app = register_blueprint(app)
     app.testing = True
-    with app.test_client() as testing_client:
-        with app.app_context():
+    # per-process caches keyed by ids and versions that every module's fresh database reuses
+    location._snapshots.clear()
+    invalidate_cameras()
+    invalidate_watchlists()
+    forget_windows()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Organization(id=1, name="test", email="test@example.com", phone="0",
+                                    address="test", created_at=datetime.now(timezone.utc)))
+        db.session.add(User(id=TEST_CREDENTIALS["id"], name=TEST_CREDENTIALS["id"],
+                            password=sha256_crypt.hash(TEST_CREDENTIALS["password"]),
+                            organization_id=1, is_admin=True, timezone="UTC"))
+        db.session.commit()
+        with app.test_client() as testing_client:
             yield testing_client
+        db.session.remove()
+        db.drop_all()
             
 def _create_header_token(test_client):
-    response = test_client.post('/login', json=TEST_CREDENTIALS)
-    return {"Authorization": f"Bearer {response.json['token']}"}  
+    test_client.post('/login', json=TEST_CREDENTIALS)
+    token = test_client.get_cookie('access_token_cookie').value
+    return {"Authorization": f"Bearer {token}"}
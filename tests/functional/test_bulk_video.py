@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from botocore.stub import Stubber, ANY
+import pytest
+
+from tests.conftest import test_client, _create_header_token, uid
+from clients import get_sqs_client
+from databases import db, Location, Camera, Event, Entry, Video
+from utils.status_codes import EntryStatusCode, VideoStatusCode
+
+@pytest.fixture(scope='module')
+def video_client(test_client):
+    with test_client.application.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Camera(id=1, location_id=1, name="door", x1=0, y1=0, x2=1, y2=0, x3=1, y3=1, x4=0, y4=1,
+                   nx=1, ny=0, threshold=0.5, minimum_time=1),
+            Camera(id=2, location_id=1, name="gate"),
+        ])
+        for name in ("a", "b"):
+            db.session.add(Event(id=uid(f"event-{name}"), location_id=1))
+            db.session.add(Entry(id=uid(f"entry-{name}"), event_id=uid(f"event-{name}"), member_id="m1",
+                                 entered_at=datetime(2024, 1, 1), status=EntryStatusCode.CREATED))
+            for camera_id in (1, 2):
+                db.session.add(Video(id=uid(f"video-{name}{camera_id}"), camera_id=camera_id,
+                                     entry_id=uid(f"entry-{name}"), status=VideoStatusCode.CREATED))
+        db.session.commit()
+    return test_client
+
+def test_confirm_uploads_marks_complete_entries(video_client, monkeypatch):
+    monkeypatch.setenv("VIDEO_PROCESSING_QUEUE", uid("video-processing"))
+    with Stubber(get_sqs_client()) as stubber:
+        stubber.add_response("get_queue_url", {"QueueUrl": "https://sqs/queue"}, {"QueueName": uid("video-processing")})
+        stubber.add_response("send_message_batch", {"Successful": [], "Failed": [
+            {"Id": "2", "SenderFault": False, "Code": "InternalError"}]},
+            {"QueueUrl": "https://sqs/queue", "Entries": ANY})
+
+        response = video_client.post('/confirm-uploads', headers=_create_header_token(video_client),
+                                     json={"video_ids": [uid("video-a1"), uid("video-a2"), uid("video-b1"), "missing"]})
+
+    assert response.status_code == 201
+    assert sorted(response.json["confirmed"]) == sorted([uid("video-a1"), uid("video-a2"), uid("video-b1")])
+    assert response.json["not_found"] == ["missing"]
+    assert response.json["ready_entries"] == [uid("entry-a")]
+    assert len(response.json["failed_messages"]) == 1
+
+    with video_client.application.app_context():
+        assert db.session.get(Entry, uid("entry-a")).status == EntryStatusCode.PROCESS_READY
+        assert db.session.get(Entry, uid("entry-b")).status == EntryStatusCode.CREATED
+        assert db.session.get(Video, uid("video-b1")).uploaded_at is not None
+
+def test_set_video_statuses(video_client):
+    headers = _create_header_token(video_client)
+    response = video_client.put('/video-statuses', headers=headers, json={"videos": [
+        {"id": uid("video-a1"), "status": "REVIEW_READY"},
+        {"id": uid("video-b2"), "status": "UPLOAD_FAILED"},
+        {"id": "missing", "status": "REVIEW_READY"}]})
+
+    assert response.status_code == 201
+    assert sorted(response.json["videos"], key=lambda v: v["video_id"]) == sorted([
+        {"video_id": uid("video-a1"), "original_status": "PROCESS_READY", "new_status": "REVIEW_READY"},
+        {"video_id": uid("video-b2"), "original_status": "CREATED", "new_status": "UPLOAD_FAILED"}],
+        key=lambda v: v["video_id"])
+    assert response.json["not_found"] == ["missing"]
+
+    response = video_client.put('/video-statuses', headers=headers, json={"videos": [
+        {"id": uid("video-a1"), "status": "BOGUS"}]})
+    assert response.status_code == 400
@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from tests.conftest import test_client, _create_header_token, uid
+from databases import db, Location, Camera, Action, Event, Entry, Video
+from utils.changes import change_event, max_wait, SYNC_MAX_WAIT
+from utils.status_codes import EntryStatusCode, VideoStatusCode
+
+@pytest.fixture(scope='module')
+def feed_client(test_client):
+    app = test_client.application
+    app.config["CHANGE_FEED_SETTLE_SECONDS"] = 0
+    app.config["CHANGE_FEED_STREAM_SECONDS"] = 0.2
+    with app.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Camera(id=1, location_id=1, name="door"),
+            Action(id=1, user_id="test", name="ok"),
+            Event(id=uid("event-1"), location_id=1),
+            Entry(id=uid("entry-1"), event_id=uid("event-1"), member_id="m1", entered_at=datetime(2024, 1, 1),
+                  status=EntryStatusCode.CREATED),
+            Video(id=uid("video-1"), camera_id=1, entry_id=uid("entry-1"), status=VideoStatusCode.CREATED),
+        ])
+        db.session.commit()
+    return test_client
+
+def test_change_feed_returns_deltas_after_since(feed_client):
+    headers = _create_header_token(feed_client)
+    response = feed_client.get('/changes', headers=headers)
+    assert response.json == {"changes": [], "last_seq": 0, "reset": False}
+
+    response = feed_client.put(f'/video-status/{uid("video-1")}', headers=headers, json={"status": "REVIEW_READY"})
+    assert response.status_code == 201
+    response = feed_client.post(f'/action-to-event/{uid("event-1")}/1', headers=headers, json={"comment": "ok"})
+    assert response.status_code == 201
+
+    response = feed_client.get('/changes?since=0&timeout=0', headers=headers)
+    changes = response.json["changes"]
+    assert [change["kind"] for change in changes] == ["video_status", "event_reviewed"]
+    assert changes[0]["video_id"] == uid("video-1")
+    assert changes[0]["status"] == "REVIEW_READY"
+    assert changes[1]["action_id"] == 1
+    assert response.json["last_seq"] == changes[1]["id"]
+
+    response = feed_client.get(f'/changes?since={changes[0]["id"]}&timeout=0', headers=headers)
+    assert [change["kind"] for change in response.json["changes"]] == ["event_reviewed"]
+
+    response = feed_client.get(f'/changes?since={changes[1]["id"]}&timeout=0.1', headers=headers)
+    assert response.json["changes"] == []
+    assert response.json["last_seq"] == changes[1]["id"]
+
+def test_change_stream_resumes_from_last_event_id(feed_client):
+    headers = _create_header_token(feed_client)
+    response = feed_client.post(f'/set-entry-status/{uid("entry-1")}', headers=headers, json={"status": "REVIEW_READY"})
+    assert response.status_code == 201
+
+    response = feed_client.get('/changes?since=0&timeout=0', headers=headers)
+    last_seq = response.json["last_seq"]
+
+    response = feed_client.get('/changes/stream', headers=headers | {"Last-Event-ID": str(last_seq - 1)})
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert f"id: {last_seq}\nevent: change\n" in body
+    assert f"id: {last_seq - 1}\n" not in body
+    assert '"entry_status"' in body
+
+def test_invalid_since_is_rejected(feed_client):
+    response = feed_client.get('/changes?since=abc', headers=_create_header_token(feed_client))
+    assert response.status_code == 400
+
+def test_changes_are_stamped_at_flush(feed_client):
+    with feed_client.application.app_context():
+        change = change_event("entry_created", "test", location_id=1)
+        db.session.add(change)
+        time.sleep(0.05)
+        before_flush = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.session.flush()
+        assert change.created_at.replace(tzinfo=None) >= before_flush
+        db.session.rollback()
+
+def test_sync_workers_cap_the_wait(feed_client, monkeypatch):
+    with feed_client.application.app_context():
+        monkeypatch.setenv("GUNICORN_WORKER_CLASS", "sync")
+        assert max_wait(55) == SYNC_MAX_WAIT
+        monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gevent")
+        assert max_wait(55) == 55
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from tests.conftest import test_client, _create_header_token, uid
+from databases import db, Location, Camera, Action, Event, Entry, Video
+
+@pytest.fixture(scope='module')
+def claim_client(test_client):
+    with test_client.application.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Camera(id=1, location_id=1, name="door"),
+            Action(id=1, user_id="test", name="ok"),
+        ])
+        for i in range(5):
+            queued_at = datetime(2024, 1, 1, 12, i)
+            db.session.add(Event(id=uid(f"event-{i}"), location_id=1, queued_at=queued_at))
+            db.session.add(Entry(id=uid(f"entry-{i}"), event_id=uid(f"event-{i}"), member_id="m1", entered_at=queued_at))
+            db.session.add(Video(id=uid(f"video-{i}"), camera_id=1, entry_id=uid(f"entry-{i}")))
+        db.session.commit()
+    return test_client
+
+def _claim(client, headers, session_id, limit):
+    response = client.post('/claim-events/1', headers=headers, json={"session_id": session_id, "limit": limit})
+    assert response.status_code == 200
+    assert response.json["reviewer"] == f"test/{session_id}"
+    return [event["id"] for event in response.json["events"]]
+
+def test_reviewers_get_disjoint_leases(claim_client):
+    headers = _create_header_token(claim_client)
+
+    assert _claim(claim_client, headers, "alice", 2) == [uid("event-0"), uid("event-1")]
+    assert _claim(claim_client, headers, "bob", 2) == [uid("event-2"), uid("event-3")]
+    # claiming again renews the reviewer's own leases
+    assert _claim(claim_client, headers, "alice", 2) == [uid("event-0"), uid("event-1")]
+
+    response = claim_client.post(f'/action-to-event/{uid("event-0")}/1', headers=headers,
+                                 json={"comment": "", "session_id": "bob"})
+    assert response.status_code == 409
+    response = claim_client.post(f'/action-to-event/{uid("event-0")}/1', headers=headers,
+                                 json={"comment": "", "session_id": "alice"})
+    assert response.status_code == 201
+    assert response.json["claimed_by"] is None
+
+    response = claim_client.post('/release-events', headers=headers,
+                                 json={"event_ids": [uid("event-1"), uid("event-2")], "session_id": "alice"})
+    assert response.json["released"] == 1
+    assert _claim(claim_client, headers, "carol", 5) == [uid("event-1"), uid("event-4")]
+
+def test_expired_leases_return_to_the_pool(claim_client):
+    headers = _create_header_token(claim_client)
+    with claim_client.application.app_context():
+        db.session.execute(update(Event).where(Event.claimed_by == "test/bob")
+                           .values(claim_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+
+    assert _claim(claim_client, headers, "dave", 5) == [uid("event-2"), uid("event-3")]
+
+def test_sessions_of_an_account_share_leases_without_a_session_id(claim_client):
+    headers = _create_header_token(claim_client)
+    claim_client.post('/release-events', headers=headers,
+                      json={"event_ids": [uid("event-1"), uid("event-4")], "session_id": "carol"})
+
+    response = claim_client.post('/claim-events/1', headers=headers, json={"limit": 1})
+    assert response.json["reviewer"] == "test"
+    assert [event["id"] for event in response.json["events"]] == [uid("event-1")]
+    # another login of the same account renews the lease instead of taking the next event
+    response = claim_client.post('/claim-events/1', headers=_create_header_token(claim_client), json={"limit": 1})
+    assert [event["id"] for event in response.json["events"]] == [uid("event-1")]
+
+def test_claim_rejects_bad_arguments(claim_client):
+    headers = _create_header_token(claim_client)
+    assert claim_client.post('/claim-events/1', headers=headers, json={"limit": 0}).status_code == 400
+    assert claim_client.post('/claim-events/1', headers=headers, json={"lease_seconds": 86400}).status_code == 400
+    assert claim_client.post('/claim-events/99', headers=headers, json={}).status_code == 404
+
+def test_reviewed_events_are_not_reviewed_again(claim_client):
+    headers = _create_header_token(claim_client)
+    # reviewed by alice in test_reviewers_get_disjoint_leases, which released her lease
+    response = claim_client.post(f'/action-to-event/{uid("event-0")}/1', headers=headers,
+                                 json={"comment": "again", "session_id": "bob"})
+    assert response.status_code == 409
+    with claim_client.application.app_context():
+        assert db.session.get(Event, uid("event-0")).comment == ""
@@ -0,0 +1,55 @@
+import gzip
+
+from tests.conftest import test_client, _create_header_token
+
+def test_config_endpoint_returns_304_until_changed(test_client):
+    headers = _create_header_token(test_client)
+    response = test_client.get('/actions', headers=headers)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert etag.startswith('W/"')
+
+    response = test_client.get('/actions', headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    response = test_client.put('/actions', headers=headers, json={"actions": [
+        {"id": None, "name": "checked", "is_tailgating": False, "is_enabled": True, "is_deleted": False}]})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+    response = test_client.get('/actions', headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [action["name"] for action in response.json["actions"]] == ["checked"]
+
+    action_id = response.json["actions"][0]["id"]
+    etag = response.headers["ETag"]
+    response = test_client.put('/actions', headers=headers, json={"actions": [
+        {"id": action_id, "name": "renamed", "is_tailgating": False, "is_enabled": True, "is_deleted": False}]})
+    assert response.status_code == 200
+
+    response = test_client.get('/actions', headers=headers | {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["actions"][0]["name"] == "renamed"
+
+def test_content_etag_on_event_listing(test_client):
+    headers = _create_header_token(test_client)
+    response = test_client.get('/unreviewed-events/1', headers=headers)
+    assert response.status_code == 200
+
+    response = test_client.get('/unreviewed-events/1', headers=headers | {"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+def test_large_responses_are_compressed(test_client):
+    headers = _create_header_token(test_client)
+    response = test_client.put('/high-risk-members', headers=headers, json={"members": [
+        {"id": None, "member_id": f"member-{i}"} for i in range(100)]})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") is None
+
+    response = test_client.get('/high-risk-members', headers=headers | {"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(gzip.decompress(response.data)) > 1024
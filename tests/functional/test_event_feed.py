@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import test_client, _create_header_token, uid
+from databases import db, Location, Camera, Action, Event, Entry, Video
+
+@pytest.fixture(scope='module')
+def feed_client(test_client):
+    with test_client.application.app_context():
+        db.session.add(Action(id=1, user_id="test", name="ok"))
+        for location_id in (1, 2, 3):
+            db.session.add(Location(id=location_id, user_id="test", name=f"site-{location_id}"))
+            db.session.add(Camera(id=location_id, location_id=location_id, name="door"))
+        # event -> (location, minute); a-1 and b-2 share a timestamp, so the larger id, a-1's, comes first
+        events = {"a-1": (1, 10), "b-2": (2, 10), "c-3": (3, 9), "d-1": (1, 8), "e-2": (2, 30),
+                  "f-3": (3, 20), "g-1": (1, 5), "reviewed": (2, 25)}
+        for event_id, (location_id, minute) in events.items():
+            queued_at = datetime(2024, 1, 1, 12, minute)
+            db.session.add(Event(id=uid(event_id), location_id=location_id, queued_at=queued_at,
+                                 action_id=1 if event_id == "reviewed" else None))
+            db.session.add(Entry(id=uid(f"entry-{event_id}"), event_id=uid(event_id), member_id="m1",
+                                 entered_at=queued_at))
+            db.session.add(Video(id=uid(f"video-{event_id}"), camera_id=location_id,
+                                 entry_id=uid(f"entry-{event_id}")))
+        assert uid("a-1") > uid("b-2")
+        db.session.commit()
+    return test_client
+
+names = {uid(name): name for name in ("a-1", "b-2", "c-3", "d-1", "e-2", "f-3", "g-1", "reviewed")}
+
+def _pages(client, headers, url):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert response.status_code == 200
+        ids.append([names[event["id"]] for event in response.json["events"]])
+        cursor = response.json["next_cursor"]
+        if not cursor:
+            return ids
+
+def test_feed_merges_locations_newest_first(feed_client):
+    headers = _create_header_token(feed_client)
+    assert _pages(feed_client, headers, '/events?limit=3') == [
+        ["e-2", "f-3", "a-1"], ["b-2", "c-3", "d-1"], ["g-1"]]
+    assert _pages(feed_client, headers, '/events?limit=4&status=all&locationId=2&locationId=3') == [
+        ["e-2", "reviewed", "f-3", "b-2"], ["c-3"]]
+    assert _pages(feed_client, headers, '/events?status=history') == [["reviewed"]]
+
+def test_feed_rejects_bad_arguments(feed_client):
+    headers = _create_header_token(feed_client)
+    assert feed_client.get('/events?cursor=nope', headers=headers).status_code == 400
+    assert feed_client.get('/events?status=pending', headers=headers).status_code == 400
+    assert feed_client.get('/events?limit=0', headers=headers).status_code == 400
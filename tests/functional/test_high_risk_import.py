@@ -0,0 +1,74 @@
+import io
+
+from sqlalchemy import select
+
+from tests.conftest import test_client, _create_header_token
+from databases import db, HighRiskMember
+
+def _members(client):
+    with client.application.app_context():
+        rows = db.session.execute(
+            select(HighRiskMember.member_id, HighRiskMember.is_deleted)
+            .where(HighRiskMember.user_id == "test")).all()
+    return sorted(member_id for member_id, is_deleted in rows if not is_deleted), len(rows)
+
+def test_import_diffs_against_existing_members(test_client):
+    headers = _create_header_token(test_client)
+
+    response = test_client.post('/high-risk-members/import', headers=headers,
+                                json=["m1", "m2", " m3 ", "m2", "", "x" * 40])
+    assert response.status_code == 200
+    assert response.json["inserted"] == 3
+    assert response.json["invalid"] == 2
+    assert _members(test_client) == (["m1", "m2", "m3"], 3)
+
+    csv_file = (io.BytesIO(b"\xef\xbb\xbfname,member_id\nA,m2\nB,m4\n"), "members.csv")
+    response = test_client.post('/high-risk-members/import', headers=headers,
+                                data={"file": csv_file}, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert (response.json["inserted"], response.json["deleted"], response.json["unchanged"]) == (1, 2, 1)
+    assert _members(test_client) == (["m2", "m4"], 4)
+
+    response = test_client.post('/high-risk-members/import?mode=merge', headers=headers,
+                                data="m1\nm5\n", content_type="text/csv")
+    assert (response.json["reactivated"], response.json["inserted"], response.json["deleted"]) == (1, 1, 0)
+    assert _members(test_client) == (["m1", "m2", "m4", "m5"], 5)
+
+    response = test_client.post('/high-risk-members/import', headers=headers, json={"member_ids": ["m4"]})
+    assert response.json["deleted"] == 3
+    assert _members(test_client) == (["m4"], 5)
+
+def test_single_create_reactivates_deleted_member(test_client):
+    headers = _create_header_token(test_client)
+    assert test_client.post('/high-risk-member/m1', headers=headers).status_code == 201
+    assert test_client.delete('/high-risk-member/m1', headers=headers).status_code == 200
+    assert test_client.post('/high-risk-member/m1', headers=headers).status_code == 201
+    assert "m1" in _members(test_client)[0]
+
+def test_bulk_update_follows_single_member_rules(test_client):
+    headers = _create_header_token(test_client)
+    test_client.post('/high-risk-members/import', headers=headers, json=[])
+    _, rows = _members(test_client)
+
+    def put(*members):
+        response = test_client.put('/high-risk-members', headers=headers, json={"members": list(members)})
+        assert response.status_code == 200
+        return {member["member_id"]: member["id"] for member in response.json["high_risk_members"]}
+
+    active = put({"member_id": "a"})
+    put({"id": active["a"], "member_id": "a", "is_deleted": True})
+    assert _members(test_client) == ([], rows + 1)
+    active = put({"member_id": "a"})
+    put({"id": active["a"], "member_id": "a", "is_deleted": True})
+    assert _members(test_client) == ([], rows + 1)
+
+    active = put({"member_id": "a"}, {"member_id": "a"}, {"member_id": "b"})
+    assert put({"member_id": "a"}, {"id": active["b"], "member_id": "c"}).keys() == {"a", "c"}
+    assert _members(test_client) == (["a", "c"], rows + 3)
+
+def test_import_rejects_bad_payload(test_client):
+    headers = _create_header_token(test_client)
+    response = test_client.post('/high-risk-members/import', headers=headers, json={"members": 1})
+    assert response.status_code == 400
+    response = test_client.post('/high-risk-members/import?mode=sync', headers=headers, json=[])
+    assert response.status_code == 400
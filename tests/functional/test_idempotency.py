@@ -0,0 +1,110 @@
+import hashlib
+import json
+import sys
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from passlib.hash import sha256_crypt
+import pytest
+from sqlalchemy import func, select, update
+
+from tests.conftest import test_client
+from databases import db, User, Location, Camera, Entry, IdempotencyRecord
+from databases.generator import ALWAYS_OPEN
+from utils import idempotency
+
+@pytest.fixture(scope='module')
+def api_headers(test_client):
+    app = test_client.application
+    with app.app_context():
+        token = create_access_token(identity="test", additional_claims={"is_api": True, "is_admin": True})
+        db.session.execute(update(User).where(User.id == "test").values(api_key=sha256_crypt.hash(token, rounds=1000)))
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front", operational_hours=ALWAYS_OPEN),
+            Camera(id=1, location_id=1, name="door"),
+        ])
+        db.session.commit()
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def uploads(monkeypatch):
+    calls = []
+    def user_upload(videos):
+        calls.append(videos)
+        return [{"video_id": video.id, "presigned_url": f"https://s3/{video.id}"} for video in videos]
+    # server.routes.entry is shadowed by the blueprint of the same name
+    monkeypatch.setattr(sys.modules["server.routes.entry"], "user_upload", user_upload)
+    return calls
+
+def _entries(client):
+    with client.application.app_context():
+        return db.session.execute(select(func.count(Entry.id))).scalar()
+
+def test_retry_replays_the_first_response(test_client, api_headers, uploads):
+    headers = api_headers | {"Idempotency-Key": "swipe-1"}
+    body = {"location_id": 1, "member_id": "m1"}
+
+    first = test_client.post('/entry', headers=headers, json=body)
+    assert first.status_code == 201
+    retry = test_client.post('/entry', headers=headers, json=body)
+    assert retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    # another worker only has the database
+    idempotency._responses.clear()
+    retry = test_client.post('/entry', headers=headers, json=body)
+    assert retry.json == first.json
+
+    assert len(uploads) == 1
+    assert _entries(test_client) == 1
+
+    other = test_client.post('/entry', headers=headers, json={"location_id": 1, "member_id": "m2"})
+    assert other.status_code == 422
+
+def test_expired_keys_can_be_reused(test_client, api_headers, uploads):
+    with test_client.application.app_context():
+        db.session.execute(update(IdempotencyRecord).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+    idempotency._responses.clear()
+
+    headers = api_headers | {"Idempotency-Key": "swipe-1"}
+    response = test_client.post('/entry', headers=headers, json={"location_id": 1, "member_id": "m3"})
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert _entries(test_client) == 2
+
+def test_key_claimed_by_another_worker_is_in_progress(test_client, api_headers, uploads):
+    body = json.dumps({"location_id": 1, "member_id": "m4"})
+    fingerprint = hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+    with test_client.application.app_context():
+        db.session.add(idempotency.pending_record("test", "swipe-2", fingerprint))
+        db.session.commit()
+
+    headers = api_headers | {"Idempotency-Key": "swipe-2"}
+    response = test_client.post('/entry', headers=headers, data=body, content_type="application/json")
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    other = test_client.post('/entry', headers=headers, json={"location_id": 1, "member_id": "m5"})
+    assert other.status_code == 422
+    assert not uploads
+
+    # the other worker answers
+    with test_client.application.app_context():
+        db.session.execute(update(IdempotencyRecord).where(IdempotencyRecord.key == "swipe-2")
+                           .values(status_code=201, body='{"entry_id": "e1"}'))
+        db.session.commit()
+    response = test_client.post('/entry', headers=headers, data=body, content_type="application/json")
+    assert response.status_code == 201
+    assert response.json == {"entry_id": "e1"}
+
+def test_failed_requests_release_their_key(test_client, api_headers, uploads):
+    headers = api_headers | {"Idempotency-Key": "swipe-3"}
+    response = test_client.post('/entry', headers=headers, json={"location_id": 1})
+    assert response.status_code == 400
+    with test_client.application.app_context():
+        assert db.session.execute(select(IdempotencyRecord).where(IdempotencyRecord.key == "swipe-3")).first() is None
+
+    response = test_client.post('/entry', headers=headers, json={"location_id": 1, "member_id": "m6"})
+    assert response.status_code == 201
+    assert len(uploads) == 1
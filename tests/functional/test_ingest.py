@@ -0,0 +1,105 @@
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+pytest.importorskip("aiosqlite")
+
+from flask_jwt_extended import create_access_token
+from passlib.hash import sha256_crypt
+from sqlalchemy import func, select
+from starlette.testclient import TestClient
+
+from tests.conftest import test_client
+from server import create_app
+from databases import db, Organization, User, Location, Camera, Event, Entry, Video, ChangeEvent
+from databases.generator import ALWAYS_OPEN
+from ingest.server import create_ingest_app, async_database_uri
+
+@pytest.fixture(scope='module')
+def ingest(test_client, tmp_path_factory):
+    # aiosqlite connects on its own thread, so the database has to be a file
+    path = tmp_path_factory.mktemp("ingest") / "ingest.db"
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("FLASK_SQLALCHEMY_DATABASE_URI", f"sqlite:///{path}")
+        flask_app = create_app()
+    with flask_app.app_context():
+        db.create_all()
+        token = create_access_token(identity="test", additional_claims={"is_api": True, "is_admin": True})
+        web_token = create_access_token(identity="test", additional_claims={"is_api": False, "is_admin": True})
+        db.session.add_all([
+            Organization(id=1, name="test", email="test@example.com", phone="0", address="test",
+                         created_at=datetime.now(timezone.utc)),
+            User(id="test", name="test", password="", organization_id=1, timezone="UTC",
+                 api_key=sha256_crypt.hash(token, rounds=1000)),
+            Location(id=1, user_id="test", name="front", operational_hours=ALWAYS_OPEN),
+            Camera(id=1, location_id=1, name="door"),
+            Camera(id=2, location_id=1, name="gate"),
+        ])
+        db.session.commit()
+
+    with TestClient(create_ingest_app(flask_app)) as client:
+        client.headers["Authorization"] = f"Bearer {token}"
+        client.flask_app, client.web_token = flask_app, web_token
+        yield client
+    with flask_app.app_context():
+        db.session.remove()
+
+@pytest.fixture(autouse=True)
+def uploads(monkeypatch):
+    calls = []
+    def user_upload(videos):
+        calls.append(videos)
+        return [{"video_id": video.id, "presigned_url": f"https://s3/{video.id}"} for video in videos]
+    monkeypatch.setattr(sys.modules["ingest.entry"], "user_upload", user_upload)
+    return calls
+
+def _count(client, column):
+    with client.flask_app.app_context():
+        return db.session.execute(select(func.count(column))).scalar()
+
+def test_async_driver_is_chosen_from_the_configured_uri():
+    assert async_database_uri("mysql+pymysql://u:p@db/td").drivername == "mysql+aiomysql"
+    assert async_database_uri("sqlite:///demo.db").drivername == "sqlite+aiosqlite"
+
+def test_entry_writes_the_same_rows_as_the_flask_route(ingest, uploads):
+    response = ingest.post('/entry', json={"location_id": 1, "member_id": "m1"})
+    assert response.status_code == 201
+    assert [video["presigned_url"] for video in response.json()["videos"]] == \
+        [f"https://s3/{video.id}" for video in uploads[0]]
+
+    with ingest.flask_app.app_context():
+        entry = db.session.get(Entry, response.json()["entry_id"])
+        assert entry.member_id == "m1"
+        assert db.session.get(Event, entry.event_id).location_id == 1
+    assert _count(ingest, Video.id) == 2
+    assert _count(ingest, ChangeEvent.id) == 1
+
+    # a second swipe of the same member is a duplicate; another member's joins the open event
+    assert ingest.post('/entry', json={"location_id": 1, "member_id": "m1"}).json() == \
+        {"msg": "Duplicate entry attempts"}
+    other = ingest.post('/entry', json={"location_id": 1, "member_id": "m2"})
+    with ingest.flask_app.app_context():
+        event = db.session.get(Event, db.session.get(Entry, other.json()["entry_id"]).event_id)
+        assert event.id == entry.event_id
+        assert event.is_merged
+
+def test_rejects_what_error_handler_rejects(ingest):
+    assert ingest.post('/entry', json={"location_id": 1, "member_id": "m3"},
+                       headers={"Authorization": f"Bearer {ingest.web_token}"}).status_code == 401
+    assert ingest.post('/entry', json={"location_id": 1, "member_id": "m3"},
+                       headers={"Authorization": "Bearer nonsense"}).status_code == 422
+    assert ingest.post('/entry', json={"location_id": 99, "member_id": "m3"}).status_code == 400
+
+def test_idempotency_key_replays(ingest, uploads):
+    headers = {"Idempotency-Key": "swipe-async"}
+    first = ingest.post('/entry', json={"location_id": 1, "member_id": "m4"}, headers=headers)
+    retry = ingest.post('/entry', json={"location_id": 1, "member_id": "m4"}, headers=headers)
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert len(uploads) == 1
+
+    assert ingest.post('/entry', json={"location_id": 1, "member_id": "m5"}, headers=headers).status_code == 422
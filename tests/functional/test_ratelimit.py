@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from tests.conftest import test_client, _create_header_token
+from utils import ratelimit
+
+@pytest.fixture
+def limited_client(test_client, tmp_path):
+    app = test_client.application
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_DIR=str(tmp_path),
+                      RATE_LIMIT_WEB_RATE=0.1, RATE_LIMIT_WEB_BURST=2)
+    yield test_client
+    for key in ("RATE_LIMIT_DIR", "RATE_LIMIT_WEB_RATE", "RATE_LIMIT_WEB_BURST"):
+        app.config.pop(key)
+    app.config["RATE_LIMIT_ENABLED"] = False
+
+def test_web_requests_are_throttled_per_identity(limited_client):
+    headers = _create_header_token(limited_client)
+    assert limited_client.get('/locations', headers=headers).status_code == 200
+    assert limited_client.get('/is-authenticated', headers=headers).status_code == 200
+
+    response = limited_client.get('/locations', headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # login and health checks aren't behind error_handler
+    assert limited_client.get('/healthz').status_code == 200
+
+def test_exhausted_pool_sheds_requests(test_client, monkeypatch):
+    headers = _create_header_token(test_client)
+    monkeypatch.setattr(ratelimit, "pool_exhausted", lambda: True)
+
+    response = test_client.get('/locations', headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert test_client.get('/healthz').status_code == 200
+
+def test_throttled_requests_skip_the_user_lookup(limited_client, monkeypatch):
+    headers = _create_header_token(limited_client)
+    for _ in range(2):
+        limited_client.get('/locations', headers=headers)
+
+    lookups = []
+    jwt = limited_client.application.extensions["flask-jwt-extended"]
+    monkeypatch.setattr(jwt, "_user_lookup_callback", lambda header, data: lookups.append(data))
+    assert limited_client.get('/locations', headers=headers).status_code == 429
+    assert not lookups
+
+def test_pool_timeout_in_the_user_lookup_is_shed(test_client, monkeypatch):
+    headers = _create_header_token(test_client)
+    def user_lookup(header, data):
+        raise PoolTimeoutError("QueuePool limit reached")
+    monkeypatch.setattr(test_client.application.extensions["flask-jwt-extended"], "_user_lookup_callback", user_lookup)
+
+    response = test_client.get('/locations', headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
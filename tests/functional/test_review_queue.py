@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import test_client, _create_header_token, uid
+from databases import db, Location, Camera, Action, Event, Entry, Video
+from utils.event import event_priority
+
+@pytest.fixture(scope='module')
+def queue_client(test_client):
+    with test_client.application.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Location(id=2, user_id="test", name="back"),
+            Camera(id=1, location_id=1, name="door"),
+            Camera(id=2, location_id=2, name="gate"),
+            Action(id=1, user_id="test", name="ok"),
+        ])
+        events = [
+            # id, location, high risk, merged, queued hour, reviewed, deleted
+            ("old", 1, False, False, 1, False, False),
+            ("new", 2, False, False, 5, False, False),
+            ("tailgate", 2, False, True, 6, False, False),
+            ("risky-new", 1, True, False, 7, False, False),
+            ("risky-old", 2, True, True, 2, False, False),
+            ("reviewed", 1, True, False, 0, True, False),
+            ("deleted", 2, True, False, 0, False, True),
+        ]
+        for event_id, location_id, high_risk, merged, hour, reviewed, deleted in events:
+            queued_at = datetime(2024, 1, 1, hour)
+            db.session.add(Event(id=uid(event_id), location_id=location_id, is_high_risk=high_risk, is_merged=merged,
+                                 priority=event_priority(high_risk, merged), queued_at=queued_at,
+                                 action_id=1 if reviewed else None, deleted_at=queued_at if deleted else None))
+            db.session.add(Entry(id=uid(f"entry-{event_id}"), event_id=uid(event_id), member_id="m1",
+                                 entered_at=queued_at))
+            db.session.add(Video(id=uid(f"video-{event_id}"), camera_id=location_id,
+                                 entry_id=uid(f"entry-{event_id}")))
+        db.session.commit()
+    return test_client
+
+def _ids(names):
+    return [uid(name) for name in names]
+
+def test_queue_orders_by_priority_then_age(queue_client):
+    headers = _create_header_token(queue_client)
+
+    response = queue_client.get('/review-queue', headers=headers)
+    assert response.status_code == 200
+    assert [event["id"] for event in response.json["events"]] == _ids(["risky-old", "risky-new", "tailgate", "old", "new"])
+
+    response = queue_client.get('/review-queue?limit=2', headers=headers)
+    assert [event["id"] for event in response.json["events"]] == _ids(["risky-old", "risky-new"])
+
+    response = queue_client.get('/review-queue?locationId=1', headers=headers)
+    assert [event["id"] for event in response.json["events"]] == _ids(["risky-new", "old"])
+
+def test_queue_rejects_bad_limit(queue_client):
+    headers = _create_header_token(queue_client)
+    assert queue_client.get('/review-queue?limit=0', headers=headers).status_code == 400
+    assert queue_client.get('/review-queue?limit=1000', headers=headers).status_code == 400
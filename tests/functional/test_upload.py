@@ -1 +1,20 @@
-from tests.conftest import test_client, TEST_CREDENTIALS, _create_header_token
\ No newline at end of file
+from tests.conftest import test_client, TEST_CREDENTIALS, _create_header_token
+
+from databases.schemas import EntryWebhookResponseSchema
+from utils import upload
+
+class _Video:
+    def __init__(self, id):
+        self.id = id
+
+class _S3:
+    def generate_presigned_post(self, Bucket, Key, ExpiresIn):
+        return {"url": f"https://{Bucket}.s3.amazonaws.com/", "fields": {"key": Key, "policy": "p"}}
+
+def test_user_upload_returns_presigned_posts(monkeypatch):
+    monkeypatch.setenv("S3_BUCKET_NAME", "videos")
+    monkeypatch.setattr(upload, "get_s3_client", lambda: _S3())
+
+    response = EntryWebhookResponseSchema().dump({"entry_id": "e1", "videos": upload.user_upload([_Video("v1")])})
+    assert response["videos"] == [{"presigned_url": "https://videos.s3.amazonaws.com/",
+                                   "fields": {"key": "/videos/v1.mp4", "policy": "p"}, "video_id": "v1"}]
@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from flask_jwt_extended import create_access_token
+from passlib.hash import sha256_crypt
+import pytest
+from sqlalchemy import func, select
+
+from tests.conftest import test_client, uid
+from server import create_app, register_blueprint
+from databases import db, Organization, User, Location, Camera, Event, Entry, Video, ChangeEvent, IdempotencyRecord
+from databases.generator import ALWAYS_OPEN
+from utils import idempotency, write_buffer
+
+@pytest.fixture(scope='module')
+def buffered_client(test_client, tmp_path_factory):
+    directory = tmp_path_factory.mktemp("entry_buffer")
+    # the flusher commits from its own thread, so it needs a connection of its
+    # own instead of the in-memory database's single shared one
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("FLASK_SQLALCHEMY_DATABASE_URI", f"sqlite:///{directory / 'entries.db'}")
+        app = register_blueprint(create_app())
+    app.config.update(ENTRY_WRITE_BUFFER=True, ENTRY_BUFFER_FSYNC=False, ENTRY_BUFFER_DIR=str(directory))
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(identity="test", additional_claims={"is_api": True, "is_admin": True})
+        db.session.add_all([
+            Organization(id=1, name="test", email="test@example.com", phone="0", address="test",
+                         created_at=datetime.now(timezone.utc)),
+            User(id="test", name="test", password="", organization_id=1, timezone="UTC",
+                 api_key=sha256_crypt.hash(token, rounds=1000)),
+            Location(id=1, user_id="test", name="front", operational_hours=ALWAYS_OPEN),
+            Camera(id=1, location_id=1, name="door"),
+        ])
+        db.session.commit()
+
+    with app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        yield client
+    write_buffer.stop_buffer()
+    with app.app_context():
+        db.session.remove()
+
+@pytest.fixture(autouse=True)
+def uploads(monkeypatch):
+    # server.routes.entry is shadowed by the blueprint of the same name
+    monkeypatch.setattr(sys.modules["server.routes.entry"], "user_upload",
+                        lambda videos: [{"video_id": video.id, "presigned_url": "https://s3"} for video in videos])
+
+def _count(client, column):
+    with client.application.app_context():
+        return db.session.execute(select(func.count(column))).scalar()
+
+def test_entries_are_committed_in_groups(buffered_client):
+    entry_ids = []
+    for member_id in ("m1", "m2", "m3"):
+        response = buffered_client.post('/entry', json={"location_id": 1, "member_id": member_id})
+        assert response.status_code == 201
+        entry_ids.append(response.json["entry_id"])
+
+    assert write_buffer.wait_for_flush()
+    with buffered_client.application.app_context():
+        entries = db.session.execute(select(Entry).where(Entry.id.in_(entry_ids))).unique().scalars().all()
+        assert len(entries) == 3
+        # the burst joined the first entry's event before any of it was committed
+        assert len({entry.event_id for entry in entries}) == 1
+        assert db.session.get(Event, entries[0].event_id).is_merged
+    assert _count(buffered_client, Video.id) == 3
+    assert _count(buffered_client, ChangeEvent.id) == 3
+
+    # the write-ahead file is emptied once everything in it is committed
+    assert os.path.getsize(write_buffer.get_buffer().path) == 0
+
+def _record(seq, entry_id, event_id):
+    entry_id, event_id = uid(entry_id), uid(event_id)
+    entered_at = "2024-01-01T09:00:00+00:00"
+    return {"seq": seq, "entry_id": entry_id, "merge": None, "rows": [
+        ["Event", {"id": event_id, "location_id": 1, "queued_at": entered_at}],
+        ["Entry", {"id": entry_id, "event_id": event_id, "member_id": "m9", "entered_at": entered_at}],
+        ["Video", {"id": str(uuid4()), "camera_id": 1, "entry_id": entry_id, "status": "CREATED"}],
+    ]}
+
+def test_recovers_entries_of_a_dead_worker(buffered_client):
+    app = buffered_client.application
+    committed_id = "committed-before-crash"
+    with app.app_context():
+        db.session.add(Event(id=uid("e-committed"), location_id=1))
+        db.session.add(Entry(id=uid(committed_id), event_id=uid("e-committed")))
+        db.session.commit()
+
+    lines = [
+        _record(1, "flushed", "e-flushed"),
+        {"flushed": 1},
+        # committed, but the worker died before writing the checkpoint
+        _record(2, committed_id, "e-committed"),
+        _record(3, "lost", "e-lost"),
+    ]
+    path = os.path.join(app.config["ENTRY_BUFFER_DIR"], "entries-1-1.wal")
+    with open(path, "w") as f:
+        f.write("".join(json.dumps(line) + "\n" for line in lines) + '{"seq": 4, "entry_id"')
+
+    with app.app_context():
+        assert write_buffer.recover_buffers(exclude=write_buffer.get_buffer().path) == 1
+        assert db.session.get(Entry, uid("lost")).entered_at is not None
+        assert db.session.get(Entry, uid("flushed")) is None
+        assert db.session.get(Event, uid("e-lost")).location_id == 1
+    assert not os.path.exists(path)
+
+def test_rejected_entries_are_parked(buffered_client):
+    app = buffered_client.application
+    record = _record(5, "duplicate", "e-duplicate")
+    with app.app_context():
+        write_buffer.write_group([record])
+        # the same entry id again, so both attempts fail
+        write_buffer.write_group([dict(record, rows=[["Event", dict(record["rows"][0][1], id=uid("e-other"))]]
+                                                    + record["rows"][1:])])
+        assert db.session.get(Event, uid("e-other")) is None
+
+    path = os.path.join(app.config["ENTRY_BUFFER_DIR"], write_buffer.DEAD_LETTER_FILE)
+    with open(path) as f:
+        assert [json.loads(line)["entry_id"] for line in f] == [uid("duplicate")]
+
+def test_worker_start_recovers_without_traffic(buffered_client):
+    app = buffered_client.application
+    write_buffer.stop_buffer()
+    path = os.path.join(app.config["ENTRY_BUFFER_DIR"], "entries-2-1.wal")
+    with open(path, "w") as f:
+        f.write(json.dumps(_record(1, "at-start", "e-at-start")) + "\n")
+
+    write_buffer.start_buffer(app)
+    deadline = time.monotonic() + 5
+    while os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not os.path.exists(path)
+    with app.app_context():
+        assert db.session.get(Entry, uid("at-start")) is not None
+
+def test_buffer_needs_a_private_directory(buffered_client, tmp_path):
+    app = buffered_client.application
+    directory = app.config["ENTRY_BUFFER_DIR"]
+    try:
+        app.config["ENTRY_BUFFER_DIR"] = None
+        with pytest.raises(RuntimeError):
+            write_buffer.init_write_buffer(app)
+        os.chmod(tmp_path, 0o777)
+        app.config["ENTRY_BUFFER_DIR"] = str(tmp_path)
+        with pytest.raises(PermissionError):
+            write_buffer.init_write_buffer(app)
+    finally:
+        app.config["ENTRY_BUFFER_DIR"] = directory
+
+def test_keyed_entries_store_their_response_at_the_flush(buffered_client):
+    headers = {"Idempotency-Key": "buffered-1"}
+    response = buffered_client.post('/entry', headers=headers, json={"location_id": 1, "member_id": "m7"})
+    assert response.status_code == 201
+
+    assert write_buffer.wait_for_flush()
+    with buffered_client.application.app_context():
+        record = db.session.execute(select(IdempotencyRecord).where(IdempotencyRecord.key == "buffered-1")).scalar_one()
+        assert record.status_code == 201
+        assert json.loads(record.body) == response.json
+
+    idempotency._responses.clear()
+    retry = buffered_client.post('/entry', headers=headers, json={"location_id": 1, "member_id": "m7"})
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json == response.json
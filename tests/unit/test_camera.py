@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from sqlalchemy import event, update
+
+from databases import db, Location, Camera
+from utils.camera import get_camera_fragments, video_message, invalidate_cameras
+
+@pytest.fixture(scope='module')
+def app(test_client):
+    app = test_client.application
+    with app.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Camera(id=1, location_id=1, name="door", x1=0.1, y1=0.2, x2=1, y2=0, x3=1, y3=1, x4=0, y4=1,
+                   nx=0.5, ny=-0.5, threshold=0.75, minimum_time=1.5),
+            Camera(id=2, location_id=1, name="gate"),
+        ])
+        db.session.commit()
+    invalidate_cameras()
+    return app
+
+@pytest.fixture
+def statements(app):
+    executed = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", count)
+        yield executed
+        event.remove(db.engine, "before_cursor_execute", count)
+
+def test_message_matches_json_encoding_of_full_body(app):
+    with app.app_context():
+        fragments = get_camera_fragments([1, 2])
+        cameras = {camera.id: camera for camera in db.session.execute(db.select(Camera)).scalars()}
+
+    for camera_id, camera in cameras.items():
+        body = {
+            "video_id": "video-1",
+            "gate": [(camera.x1, camera.y1), (camera.x2, camera.y2),
+                     (camera.x3, camera.y3), (camera.x4, camera.y4)],
+            "norm": [camera.nx, camera.ny],
+            "threshold": camera.threshold,
+            "minimum_time": camera.minimum_time
+        }
+        assert video_message("video-1", fragments[camera_id]) == json.dumps(body)
+
+def test_fragments_are_cached_until_a_camera_changes(app, statements):
+    with app.app_context():
+        get_camera_fragments([1])
+        statements.clear()
+        cached = get_camera_fragments([1])
+        assert statements == []
+
+        db.session.get(Camera, 1).threshold = 0.9
+        db.session.commit()
+        statements.clear()
+        assert json.loads(get_camera_fragments([1])[1])["threshold"] == 0.9
+        assert len(statements) == 1
+
+        db.session.execute(update(Camera).where(Camera.id == 1).values(threshold=0.8))
+        db.session.commit()
+        assert json.loads(get_camera_fragments([1])[1])["threshold"] == 0.8
+        assert cached != get_camera_fragments([1])[1]
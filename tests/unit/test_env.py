@@ -0,0 +1,42 @@
+import os
+import stat
+
+import pytest
+
+from utils import env
+
+@pytest.fixture
+def ssm(monkeypatch):
+    calls = []
+    def fetch(key):
+        calls.append(key)
+        return f"value-of-{key}"
+    monkeypatch.setattr(env, "_fetch_secret", fetch)
+    monkeypatch.setattr(env, "_secrets", {})
+    return calls
+
+def test_secrets_are_cached_in_memory_by_default(ssm, monkeypatch):
+    monkeypatch.delenv("SECRETS_CACHE_DIR", raising=False)
+    assert env.get_secret("JWT_SECRET_KEY") == "value-of-JWT_SECRET_KEY"
+    assert env.get_secret("JWT_SECRET_KEY") == "value-of-JWT_SECRET_KEY"
+    assert ssm == ["JWT_SECRET_KEY"]
+
+def test_workers_share_secrets_through_a_private_directory(ssm, monkeypatch, tmp_path):
+    directory = tmp_path / "secrets"
+    monkeypatch.setenv("SECRETS_CACHE_DIR", str(directory))
+    env.get_secret("JWT_SECRET_KEY")
+    # another worker, with nothing in memory yet
+    monkeypatch.setattr(env, "_secrets", {})
+    assert env.get_secret("JWT_SECRET_KEY") == "value-of-JWT_SECRET_KEY"
+    assert ssm == ["JWT_SECRET_KEY"]
+
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    for name in ("secrets.json", "secrets.lock"):
+        assert stat.S_IMODE(os.stat(directory / name).st_mode) == 0o600
+
+def test_shared_cache_directory_is_refused(ssm, monkeypatch, tmp_path):
+    os.chmod(tmp_path, 0o777)
+    monkeypatch.setenv("SECRETS_CACHE_DIR", str(tmp_path))
+    with pytest.raises(PermissionError):
+        env.get_secret("JWT_SECRET_KEY")
+    assert ssm == []
@@ -0,0 +1,15 @@
+from sqlalchemy import func, select
+
+from databases import db, User, Event
+from databases.generator import generate_data
+
+def test_generating_twice_adds_to_the_database(test_client):
+    with test_client.application.app_context():
+        for _ in range(2):
+            counts = generate_data(locations_per_user=1, cameras_per_location=1, entries_per_location=20,
+                                   members_per_location=50, user_prefix='gen')
+            assert counts["events"] == 20
+
+        users = db.session.execute(select(User.id).where(User.id.like('gen-%'))).scalars().all()
+        assert len(users) == 2 and 'gen-1-1' in users
+        assert db.session.execute(select(func.count(Event.id))).scalar() >= 40
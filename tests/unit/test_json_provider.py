@@ -0,0 +1,50 @@
+import math
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+
+from utils.json_provider import StdlibJSONProvider, OrjsonProvider, orjson
+from utils.status_codes import VideoStatusCode
+
+PAYLOAD = {
+    "events": [{"id": "b", "entered_at": "2024-03-31T13:59:58.000005", "count": 3, "score": 0.1,
+                "meta": None, "tags": [1, 2.5, True]}],
+    "a": {"z": 1, "y": [], "x": {}},
+    "status": VideoStatusCode.REVIEW_READY,
+    "at": datetime(2024, 3, 31, 13, 59, 58, tzinfo=timezone.utc),
+    "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+    "name": "Zoë Ōtaki \u2028 \x7f 会議室 🚪",
+}
+
+@pytest.fixture
+def app(test_client):
+    return test_client.application
+
+def test_stdlib_provider_encodes_enums(app):
+    assert StdlibJSONProvider(app).dumps({"status": VideoStatusCode.CREATED}) == '{"status": "100"}'
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_response_matches_stdlib(app):
+    with app.app_context():
+        expected = StdlibJSONProvider(app).response(PAYLOAD)
+        actual = OrjsonProvider(app).response(PAYLOAD)
+
+    assert actual.mimetype == expected.mimetype
+    assert actual.get_data() == expected.get_data()
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_escapes_like_stdlib(app):
+    text = "".join(map(chr, range(0x800))) + "\ud7ff\ue000\uffff\U00010000\U0001f6aa\U0010ffff"
+    assert OrjsonProvider(app).dumps({"text": text}) == StdlibJSONProvider(app).dumps({"text": text}, separators=(",", ":"))
+
+    unescaped = OrjsonProvider(app)
+    unescaped.ensure_ascii = False
+    assert unescaped.dumps({"name": "Zoë"}) == '{"name":"Zoë"}'
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_falls_back_to_stdlib(app):
+    provider = OrjsonProvider(app)
+
+    assert provider.loads(provider.dumps({"big": 2 ** 70})) == {"big": 2 ** 70}
+    assert math.isnan(provider.loads(b'{"value": NaN}')["value"])
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+from flask import g
+import pytest
+from sqlalchemy import event
+
+from databases import db, User, Location, Camera, UploadOptionEnum
+from utils.location import get_location_snapshot
+
+ALWAYS_OPEN = {day: [{"start_hour": 0, "start_minute": 0, "duration": 24}]
+               for day in ("mon", "tue", "wed", "thu", "fri", "sat", "sun", "pub")}
+
+@pytest.fixture(scope='module')
+def app(test_client):
+    app = test_client.application
+    with app.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front", operational_hours=ALWAYS_OPEN),
+            Camera(id=1, location_id=1, name="door", stream_url="rtsp://door", offset_amount=2),
+            Location(id=2, user_id="test", name="empty"),
+        ])
+        db.session.commit()
+    return app
+
+def _snapshot(app, location_id):
+    """One simulated request: current_user is loaded fresh, as the JWT loader does."""
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.test_request_context():
+        db.session.expire_all()
+        g._jwt_extended_jwt = {}
+        g._jwt_extended_jwt_user = {"loaded_user": db.session.get(User, "test")}
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            snapshot = get_location_snapshot(location_id)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+    return snapshot, len(statements)
+
+def test_snapshot_is_cached_per_config_version(app):
+    snapshot, queries = _snapshot(app, 1)
+    assert queries == 1
+    assert snapshot.upload_method == UploadOptionEnum.UserUpload
+    assert [(camera.id, camera.stream_url, camera.offset_amount) for camera in snapshot.cameras] == [(1, "rtsp://door", 2)]
+    assert snapshot.schedule.check_operational(datetime.now(timezone.utc), "UTC", False, False)
+
+    cached, queries = _snapshot(app, "1")
+    assert cached is snapshot
+    assert queries == 0
+
+    with app.app_context():
+        db.session.get(Camera, 1).stream_url = "rtsp://new"
+        db.session.commit()
+
+    snapshot, queries = _snapshot(app, 1)
+    assert queries == 1
+    assert snapshot.cameras[0].stream_url == "rtsp://new"
+
+def test_location_without_cameras_or_schedule(app):
+    snapshot, _ = _snapshot(app, 2)
+    assert snapshot.cameras == ()
+    assert snapshot.schedule is None
+
+    missing, _ = _snapshot(app, 99)
+    assert missing is None
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, func, select
+
+from tests.conftest import uid
+from databases import db, Location, Camera, Action, Event, Entry, Video
+from utils.merge import merge_into_open_event, remember_entry, forget_windows, remerge_location
+
+T0 = datetime(2024, 1, 1, 12)
+
+@pytest.fixture(scope='module')
+def app(test_client):
+    app = test_client.application
+    with app.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Location(id=2, user_id="test", name="back"),
+            Camera(id=1, location_id=1, name="door"),
+            Camera(id=2, location_id=2, name="gate"),
+            Action(id=1, user_id="test", name="ok"),
+        ])
+        db.session.commit()
+    forget_windows()
+    return app
+
+def _add_event(event_id, location_id, seconds, **kwargs):
+    entered_at = T0 + timedelta(seconds=seconds)
+    db.session.add(Event(id=uid(event_id), location_id=location_id, queued_at=entered_at, **kwargs))
+    db.session.add(Entry(id=uid(f"entry-{event_id}"), event_id=uid(event_id), member_id="m1", entered_at=entered_at))
+    db.session.add(Video(id=uid(f"video-{event_id}"), camera_id=location_id, entry_id=uid(f"entry-{event_id}")))
+    db.session.commit()
+    return entered_at
+
+def _merge(location_id, seconds, is_high_risk=False):
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        target = merge_into_open_event(location_id, T0 + timedelta(seconds=seconds), is_high_risk)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    db.session.commit()
+    return target and target[0], len(statements)
+
+def test_entries_join_the_open_event(app):
+    with app.app_context():
+        started_at = _add_event("burst", 1, 0)
+        remember_entry(1, started_at, uid("burst"), started_at)
+
+        assert _merge(1, 3, is_high_risk=True) == (uid("burst"), 1)
+        merged = db.session.get(Event, uid("burst"))
+        assert (merged.is_merged, merged.is_high_risk, merged.priority) == (True, True, 3)
+
+        # another worker's event is found in the database
+        forget_windows()
+        assert _merge(1, 4) == (uid("burst"), 2)
+        assert _merge(1, 10)[0] is None
+        assert _merge(1, 61)[0] is None
+
+def test_database_target_can_be_remembered(app):
+    # /entry passes aware UTC times and remembers what the database returned
+    with app.app_context():
+        _add_event("aware", 1, 400)
+        forget_windows()
+        entered_at = (T0 + timedelta(seconds=402)).replace(tzinfo=timezone.utc)
+        event_id, started_at = merge_into_open_event(1, entered_at, False)
+        db.session.commit()
+        remember_entry(1, entered_at, event_id, started_at)
+        assert merge_into_open_event(1, entered_at + timedelta(seconds=2), False)[0] == uid("aware")
+        db.session.commit()
+
+def test_reviewed_events_stay_closed(app):
+    with app.app_context():
+        entered_at = _add_event("reviewed", 1, 200, action_id=1)
+        remember_entry(1, entered_at, uid("reviewed"), entered_at)
+        assert _merge(1, 202)[0] is None
+
+def test_remerge_location(app):
+    with app.app_context():
+        for event_id, seconds in (("h1", 1000), ("h2", 1002), ("h3", 1006), ("h4", 1030), ("h5", 1033)):
+            _add_event(event_id, 2, seconds, is_high_risk=event_id == "h3")
+
+        assert remerge_location(2, dry_run=True) == (2, 3)
+        assert remerge_location(2) == (2, 3)
+
+        events = db.session.execute(select(Event).where(Event.location_id == 2)).unique().scalars().all()
+        names = {uid(name): name for name in ("h1", "h2", "h3", "h4", "h5")}
+        assert sorted((names[e.id], len(e.entries), e.is_high_risk, e.priority) for e in events) == [
+            ("h1", 3, True, 3), ("h4", 2, False, 1)]
+        assert remerge_location(2) == (0, 0)
+
+def test_remerge_keeps_events_that_span_two_bursts(app):
+    with app.app_context():
+        db.session.add_all([Location(id=3, user_id="test", name="side"), Camera(id=3, location_id=3, name="hall")])
+        _add_event("a", 3, 0)
+        # a live-merged event whose entries run past MAX_EVENT_SPAN
+        _add_event("b", 3, 3)
+        for seconds in range(6, 64, 3):
+            db.session.add(Entry(id=uid(f"entry-b-{seconds}"), event_id=uid("b"), member_id="m1",
+                                 entered_at=T0 + timedelta(seconds=seconds)))
+        db.session.commit()
+        _add_event("c", 3, 66)
+
+        assert remerge_location(3, dry_run=True) == (2, 1)
+        assert remerge_location(3) == (2, 1)
+
+        counts = db.session.execute(
+            select(Entry.event_id, func.count()).join(Event).where(Event.location_id == 3).group_by(Entry.event_id)).all()
+        assert sorted(counts) == sorted([(uid("a"), 21), (uid("b"), 2)])
+        assert db.session.get(Event, uid("c")) is None
+        assert db.session.get(Entry, uid("entry-c")).event_id == uid("b")
+        assert remerge_location(3) == (0, 0)
@@ -0,0 +1,14 @@
+from utils.metrics import normalize_statement
+
+def test_normalize_statement_replaces_literals():
+    statement = "SELECT * FROM event WHERE comment = 'it''s' AND location_id = 12"
+    assert normalize_statement(statement) == "SELECT * FROM event WHERE comment = ? AND location_id = ?"
+
+def test_normalize_statement_collapses_in_lists():
+    short = normalize_statement("SELECT id FROM video WHERE id IN (?, ?)")
+    long = normalize_statement("SELECT id FROM video WHERE id IN (%s, %s, %s,\n %s)")
+    assert short == long == "SELECT id FROM video WHERE id IN (...)"
+
+def test_normalize_statement_keeps_identifiers():
+    statement = "SELECT camera.x1, anon_1.id FROM camera"
+    assert normalize_statement(statement) == statement
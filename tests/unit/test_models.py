@@ -0,0 +1,89 @@
+from uuid import UUID
+
+import pytest
+from sqlalchemy import MetaData, String, select, text
+from sqlalchemy.exc import StatementError
+
+from tests.conftest import uid, _create_header_token
+from server import create_app
+from databases import db, Location, Camera, Event, Entry, Video
+from databases.types import normalize_uuid
+from databases.uuid_keys import UUID_COLUMNS, convert_uuid_keys
+
+@pytest.fixture(scope='module')
+def app(test_client):
+    app = test_client.application
+    with app.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front"),
+            Camera(id=1, location_id=1, name="door"),
+            Event(id=uid("event"), location_id=1),
+            Entry(id=uid("entry"), event_id=uid("event"), member_id="m1"),
+            Video(id=uid("video"), camera_id=1, entry_id=uid("entry")),
+        ])
+        db.session.commit()
+    return app
+
+def test_uuid_keys_are_stored_in_16_bytes(app):
+    with app.app_context():
+        stored = db.session.execute(text("SELECT id, entry_id FROM video")).one()
+        assert stored == (UUID(uid("video")).bytes, UUID(uid("entry")).bytes)
+
+        video = db.session.execute(
+            select(Video).join(Entry).join(Event).where(Event.id == uid("event").upper())).unique().scalar_one()
+        assert (video.id, video.entry_id, video.entry.event_id) == (uid("video"), uid("entry"), uid("event"))
+
+def test_uuid_keys_get_distinct_defaults(app):
+    with app.app_context():
+        events = [Event(location_id=1), Event(location_id=1)]
+        db.session.add_all(events)
+        db.session.flush()
+        assert events[0].id != events[1].id
+        assert normalize_uuid(events[0].id) == events[0].id
+        db.session.rollback()
+
+def test_malformed_ids_are_rejected(app, test_client):
+    with app.app_context():
+        with pytest.raises(StatementError):
+            db.session.execute(select(Event).where(Event.id == "event-1")).all()
+        db.session.rollback()
+
+    response = test_client.get('/event/event-1', headers=_create_header_token(test_client))
+    assert response.status_code == 404
+
+def test_normalize_uuid():
+    assert normalize_uuid(uid("event").upper()) == uid("event")
+    assert normalize_uuid("event-1") is None
+    assert normalize_uuid(None) is None
+
+def test_string_keys_are_converted(tmp_path):
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("FLASK_SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'strings.db'}")
+        app = create_app()
+    with app.app_context():
+        # the schema as it was before the keys were BinaryUUID
+        metadata = MetaData()
+        for table in db.metadata.tables.values():
+            table.to_metadata(metadata)
+        for table, columns in UUID_COLUMNS:
+            for column in columns:
+                metadata.tables[table.name].c[column].type = String(36)
+        metadata.create_all(db.engine)
+        with db.engine.begin() as connection:
+            connection.execute(text("INSERT INTO event (id, location_id, is_high_risk, priority) "
+                                    "VALUES (:event, 1, 0, 0)"), {"event": uid("event")})
+            connection.execute(text("INSERT INTO entry (id, event_id, is_high_risk, status) "
+                                    "VALUES (:entry, :event, 0, 'CRE')"), {"entry": uid("entry"), "event": uid("event")})
+            connection.execute(text("INSERT INTO video (id, entry_id, camera_id, status) "
+                                    "VALUES (:video, :entry, 1, 'CRE')"), {"video": uid("video"), "entry": uid("entry")})
+
+        assert len(convert_uuid_keys()) == 5
+        assert convert_uuid_keys() == []
+        row = db.session.execute(
+            select(Video.id, Entry.id)
+            .join(Entry, Video.entry_id == Entry.id)
+            .join(Event, Entry.event_id == Event.id)
+            .where(Event.id == uid("event"))).one()
+        assert tuple(row) == (uid("video"), uid("entry"))
+        assert db.session.execute(text("SELECT length(event_id) FROM entry")).scalar() == 16
+        db.session.remove()
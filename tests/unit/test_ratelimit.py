@@ -0,0 +1,45 @@
+import pytest
+
+from utils.ratelimit import take_token, SLOTS, PROBE
+
+@pytest.fixture
+def app(test_client, tmp_path):
+    app = test_client.application
+    app.config["RATE_LIMIT_DIR"] = str(tmp_path)
+    yield app
+    app.config.pop("RATE_LIMIT_DIR")
+
+def test_bucket_allows_burst_then_refills(app):
+    with app.app_context():
+        assert [take_token("api:a", 2, 3, now=100) for _ in range(3)] == [0, 0, 0]
+        assert take_token("api:a", 2, 3, now=100) == pytest.approx(0.5)
+        # other identities have their own bucket
+        assert take_token("api:b", 2, 3, now=100) == 0
+
+        assert take_token("api:a", 2, 3, now=100.5) == 0
+        assert take_token("api:a", 2, 3, now=100.5) > 0
+        # never refills past the burst
+        assert [take_token("api:a", 2, 3, now=1000) for _ in range(4)][-1] > 0
+
+def test_full_probe_reuses_least_recently_used_slot(app):
+    with app.app_context():
+        keys = [f"web:{i}" for i in range(SLOTS * PROBE)]
+        for now, key in enumerate(keys):
+            take_token(key, 1, 1, now=now)
+        # every slot is taken; the oldest of the probe is reset to a full bucket
+        assert take_token("web:new", 1, 1, now=len(keys)) == 0
+        assert take_token("web:new", 1, 1, now=len(keys)) > 0
+
+def test_store_refuses_links_and_shared_directories(app, tmp_path):
+    with app.app_context():
+        (tmp_path / "buckets.bin").symlink_to(tmp_path / "elsewhere")
+        with pytest.raises(OSError):
+            take_token("api:a", 2, 3)
+        assert not (tmp_path / "elsewhere").exists()
+
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        app.config["RATE_LIMIT_DIR"] = str(shared)
+        with pytest.raises(PermissionError):
+            take_token("api:a", 2, 3)
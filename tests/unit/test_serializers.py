@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+
+from flask import g
+import pytest
+
+from tests.conftest import uid
+from databases import db, User, Location, Camera, Action, Event, Entry, Video, UploadOptionEnum
+from databases.schemas import EventSchema, LocationSchema, EventWithPageInfoSchema
+from databases.serializers import EventSerializer, LocationSerializer, EventWithPageInfoSerializer
+from utils.status_codes import EntryStatusCode, VideoStatusCode
+
+@pytest.fixture(scope='module')
+def app(test_client):
+    app = test_client.application
+    with app.app_context():
+        db.session.add_all([
+            Location(id=1, user_id="test", name="front", operational_hours={
+                "mon": [{"start_hour": 6, "start_minute": 30, "duration": 10}]}),
+            Location(id=2, user_id="test", name="back", upload_method=UploadOptionEnum.RTSP,
+                     custom_upload_method="rtsp://camera", operational_hours={"bad": 1}),
+            Camera(id=1, location_id=1, name="door"),
+            Camera(id=2, location_id=1, name="gate"),
+            Camera(id=3, location_id=2, name="yard"),
+            Action(id=1, user_id="test", name="ok", is_tailgating=False),
+            Event(id=uid("event-1"), location_id=1, action_id=1, comment="checked",
+                  processed_at=datetime(2024, 3, 31, 13, 59, 59, 123456),
+                  reviewed_at=datetime(2024, 4, 6, 14, 0), queued_at=datetime(2024, 3, 31, 13, 59, 57)),
+            Event(id=uid("event-2"), location_id=2, is_saved=True),
+            Entry(id=uid("entry-1"), event_id=uid("event-1"), member_id="m1", member_meta={"name": "a", "tags": [1, 2]},
+                  entered_at=datetime(2024, 3, 31, 13, 59, 58, 5), status=EntryStatusCode.REVIEW_READY),
+            Entry(id=uid("entry-2"), event_id=uid("event-1"), member_id="m2",
+                  entered_at=datetime(2024, 3, 31, 13, 59, 57), status=EntryStatusCode.CREATED),
+            Entry(id=uid("entry-3"), event_id=uid("event-2"), member_id="m1",
+                  entered_at=datetime(2024, 9, 28, 14, 30), status=EntryStatusCode.PROCESS_READY),
+            Video(id=uid("video-1"), camera_id=1, entry_id=uid("entry-1"), status=VideoStatusCode.REVIEW_READY,
+                  uploaded_at=datetime(2024, 3, 31, 14, 0, 1)),
+            Video(id=uid("video-2"), camera_id=2, entry_id=uid("entry-1"), status=VideoStatusCode.UPLOAD_FAILED),
+            Video(id=uid("video-3"), camera_id=1, entry_id=uid("entry-2"), status=VideoStatusCode.CREATED),
+            Video(id=uid("video-4"), camera_id=3, entry_id=uid("entry-3"), status=VideoStatusCode.PROCESS_READY,
+                  uploaded_at=datetime(2024, 9, 28, 14, 30, 5)),
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        for model in (Video, Entry, Event, Action, Camera, Location):
+            db.session.execute(db.delete(model))
+        db.session.commit()
+
+def _dump_both(app, timezone, schema, serializer, load, endpoint=None):
+    with app.test_request_context():
+        user = db.session.get(User, "test")
+        user.timezone = timezone
+        g._jwt_extended_jwt = {}
+        g._jwt_extended_jwt_user = {"loaded_user": user}
+        objects = load()
+        expected = schema.dump(objects)
+        actual = serializer.dump(objects)
+        db.session.rollback()
+    return expected, actual
+
+def _events():
+    return db.session.execute(db.select(Event).order_by(Event.id)).unique().scalars().all()
+
+def _locations():
+    return db.session.execute(db.select(Location).order_by(Location.id)).unique().scalars().all()
+
+@pytest.mark.parametrize("timezone", ["UTC", "Pacific/Auckland", "America/New_York", "Asia/Kolkata"])
+def test_event_serializer_matches_schema(app, timezone):
+    expected, actual = _dump_both(app, timezone, EventSchema(many=True), EventSerializer(many=True), _events)
+
+    assert actual == expected
+    assert json.dumps(actual) == json.dumps(expected)
+
+def test_single_event_serializer_matches_schema(app):
+    expected, actual = _dump_both(app, "Pacific/Auckland", EventSchema(), EventSerializer(),
+                                  lambda: _events()[0])
+
+    assert json.dumps(actual) == json.dumps(expected)
+
+def test_event_page_serializer_matches_schema(app):
+    def load():
+        return {"events": _events(),
+                "page_info": {"total": 2, "page": 1, "pages": 1, "per_page": 10, "iter_pages": [1]}}
+
+    expected, actual = _dump_both(app, "Pacific/Auckland", EventWithPageInfoSchema(),
+                                  EventWithPageInfoSerializer(), load)
+
+    assert json.dumps(actual) == json.dumps(expected)
+
+def test_location_serializer_matches_schema(app):
+    expected, actual = _dump_both(app, "UTC", LocationSchema(many=True), LocationSerializer(many=True),
+                                  _locations)
+
+    assert json.dumps(actual) == json.dumps(expected)
+
+def test_serializer_can_be_disabled_per_endpoint(app):
+    class Probe(EventSerializer):
+        @staticmethod
+        def serialize(event, format_datetime):
+            return "compiled"
+
+    app.config["COMPILED_SERIALIZERS"] = ["event.get_event_with_id"]
+    try:
+        with app.test_request_context(f"/event/{uid('event-1')}"):
+            assert Probe().dump(None) == "compiled"
+        with app.test_request_context("/locations"):
+            user = db.session.get(User, "test")
+            g._jwt_extended_jwt = {}
+            g._jwt_extended_jwt_user = {"loaded_user": user}
+            assert Probe().dump(_events()[0])["id"] == uid("event-1")
+    finally:
+        del app.config["COMPILED_SERIALIZERS"]
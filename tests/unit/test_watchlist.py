@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+from flask import g
+import pytest
+from sqlalchemy import event, update
+
+from databases import db, User, HighRiskMember
+from utils.watchlist import BloomFilter, is_high_risk_member, invalidate_watchlists
+
+@pytest.fixture(scope='module')
+def app(test_client):
+    invalidate_watchlists()
+    return test_client.application
+
+def _add(app, member_id):
+    with app.app_context():
+        db.session.add(HighRiskMember(user_id="test", member_id=member_id,
+                                      created_at=datetime.now(timezone.utc)))
+        db.session.commit()
+
+def _lookup(app, member_id):
+    """One simulated /entry request; returns the match and the number of queries it took."""
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.test_request_context():
+        db.session.expire_all()
+        g._jwt_extended_jwt = {}
+        g._jwt_extended_jwt_user = {"loaded_user": db.session.get(User, "test")}
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            matched = is_high_risk_member(member_id)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+    return matched, len(statements)
+
+def test_index_is_updated_in_place_on_commit(app):
+    _add(app, "m1")
+    assert _lookup(app, "m1") == (True, 1)
+    assert _lookup(app, "m2") == (False, 0)
+
+    _add(app, "m2")
+    assert _lookup(app, "m2") == (True, 0)
+
+    with app.app_context():
+        member = db.session.execute(db.select(HighRiskMember).filter_by(member_id="m1")).scalar_one()
+        member.is_deleted = True
+        db.session.commit()
+    assert _lookup(app, "m1") == (False, 0)
+
+def test_bulk_statements_reload_the_index(app):
+    with app.app_context():
+        db.session.execute(update(HighRiskMember).where(HighRiskMember.member_id == "m1").values(is_deleted=False))
+        db.session.commit()
+    assert _lookup(app, "m1") == (True, 1)
+
+def test_large_watchlists_use_a_bloom_filter(app):
+    app.config["HIGH_RISK_BLOOM_THRESHOLD"] = 0
+    try:
+        invalidate_watchlists()
+        assert _lookup(app, "m2") == (True, 2)
+        _add(app, "m3")
+        assert _lookup(app, "m3") == (True, 1)
+        assert _lookup(app, "unknown")[0] is False
+    finally:
+        del app.config["HIGH_RISK_BLOOM_THRESHOLD"]
+        invalidate_watchlists()
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(10000)
+    for i in range(10000):
+        bloom.add(f"member-{i}")
+    assert all(f"member-{i}" in bloom for i in range(10000))
+    assert sum(f"other-{i}" in bloom for i in range(10000)) < 100
@@ -5,11 +5,13 @@ import traceback
 from passlib.hash import sha256_crypt
 from flask import current_app as app, jsonify
 from flask import request
-from flask_jwt_extended import get_jwt, verify_jwt_in_request, current_user
+from flask_jwt_extended import decode_token, get_jwt, verify_jwt_in_request, current_user
 from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from werkzeug.exceptions import BadRequest
 
 from databases import User, db
+from utils.ratelimit import check_rate_limit, overloaded
     
 def validate_login(id, password):
     user = db.session.execute(
@@ -29,11 +31,32 @@ def get_raw_jwt_from_header():
         return None
     return parts[1]
 
+def get_unverified_identity():
+    """(sub, is_api) of the request's access token, checked but without the user lookup; None without a token."""
+    raw_jwt = get_raw_jwt_from_header() or request.cookies.get(app.config["JWT_ACCESS_COOKIE_NAME"])
+    if not raw_jwt:
+        return None
+    claims = decode_token(raw_jwt)
+    return claims["sub"], claims.get("is_api")
+
 def error_handler(web=True, api=True, admin=False):
     def inner(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            verify_jwt_in_request()
+            # before verify_jwt_in_request, whose user lookup is a query, and
+            # the API key check, which is the most expensive part of authentication
+            if app.config.get("RATE_LIMIT_ENABLED", True):
+                identity = get_unverified_identity()
+                throttled = identity and check_rate_limit(*identity)
+                if throttled:
+                    return throttled
+
+            try:
+                verify_jwt_in_request()
+            except PoolTimeoutError:
+                db.session.rollback()
+                return overloaded("pool_timeout")
+
             claims = get_jwt()
             if web and not api:
                 if claims.get("is_api"):
@@ -64,6 +87,10 @@ def error_handler(web=True, api=True, admin=False):
             except BadRequest as e:
                 db.session.rollback()
                 return jsonify({"msg": "Malformed request"}), 400
+
+            except PoolTimeoutError:
+                db.session.rollback()
+                return overloaded("pool_timeout")
             
             except Exception as e:
                 db.session.rollback()
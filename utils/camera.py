@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+from flask import current_app as app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from databases import db, Camera
+
+# Per-process cache of the camera part of video processing messages, stored
+# already serialized. Commits that touch a camera in this process bump the
+# generation, which drops every cached fragment; edits made by other workers
+# are picked up when the entry expires (CAMERA_CACHE_TTL seconds).
+_lock = threading.Lock()
+_fragments = {}
+_generation = 0
+
+def camera_message_fragment(camera):
+    return json.dumps({
+        "gate": [(camera.x1, camera.y1), (camera.x2, camera.y2),
+                 (camera.x3, camera.y3), (camera.x4, camera.y4)],
+        "norm": [camera.nx, camera.ny],
+        "threshold": camera.threshold,
+        "minimum_time": camera.minimum_time
+    })
+
+def video_message(video_id, fragment):
+    """Same bytes as json.dumps() of the full message body, without encoding the camera again."""
+    return f'{{"video_id": {json.dumps(video_id)}, {fragment[1:]}'
+
+def get_camera_fragments(camera_ids):
+    """Camera id -> serialized fragment, loading the missing ones in one query."""
+    now = time.monotonic()
+    generation = _generation
+    fragments, missing = {}, []
+
+    for camera_id in set(camera_ids):
+        cached = _fragments.get(camera_id)
+        if cached is not None and cached[0] == generation and cached[1] > now:
+            fragments[camera_id] = cached[2]
+        else:
+            missing.append(camera_id)
+
+    if missing:
+        cameras = db.session.execute(select(Camera).where(Camera.id.in_(missing))).scalars().all()
+        expires_at = now + app.config.get("CAMERA_CACHE_TTL", 300)
+        with _lock:
+            for camera in cameras:
+                fragments[camera.id] = camera_message_fragment(camera)
+                _fragments[camera.id] = (generation, expires_at, fragments[camera.id])
+
+    return fragments
+
+def invalidate_cameras():
+    global _generation
+
+    with _lock:
+        _generation += 1
+        _fragments.clear()
+
+@event.listens_for(Session, "before_flush")
+def track_camera_changes(session, flush_context, instances):
+    if any(isinstance(obj, Camera) for obj in session.new | session.dirty | session.deleted):
+        session.info["cameras_changed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def track_camera_statements(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and issubclass(orm_execute_state.bind_mapper.class_, Camera):
+        orm_execute_state.session.info["cameras_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_cameras(session):
+    if session.info.pop("cameras_changed", False):
+        invalidate_cameras()
+
+@event.listens_for(Session, "after_rollback")
+def forget_camera_changes(session):
+    session.info.pop("cameras_changed", None)
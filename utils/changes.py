@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app as app
+from sqlalchemy import event, select, func, delete
+from sqlalchemy.orm import Session
+
+from databases import db, ChangeEvent
+from databases.schemas import ChangeEventSchema
+
+# Waiters in this process are woken as soon as a change is committed here;
+# changes committed by other workers are picked up on the next poll.
+_condition = threading.Condition()
+
+# A sync worker serves one request at a time and gunicorn kills it once a
+# request outlives GUNICORN_TIMEOUT (30 s), so there a long poll or stream
+# gives its worker back after SYNC_MAX_WAIT seconds and the client reconnects.
+SYNC_MAX_WAIT = 10.0
+
+def max_wait(seconds):
+    """`seconds`, or less when each worker can only hold one request."""
+    if os.getenv("GUNICORN_WORKER_CLASS", "sync") == "sync" and int(os.getenv("GUNICORN_THREADS", "1")) <= 1:
+        return min(seconds, app.config.get("CHANGE_FEED_SYNC_MAX_WAIT", SYNC_MAX_WAIT))
+    return seconds
+
+def change_event(kind, user_id, location_id=None, event_id=None, entry_id=None,
+                 video_id=None, action_id=None, status=None):
+    return ChangeEvent(
+        user_id=user_id,
+        kind=kind,
+        location_id=location_id,
+        event_id=event_id,
+        entry_id=entry_id,
+        video_id=video_id,
+        action_id=action_id,
+        status=status.name if status is not None else None
+    )
+
+def record_change(kind, user_id, **fields):
+    """Add a change to the current transaction, so it is only published if the write commits."""
+    db.session.add(change_event(kind, user_id, **fields))
+    db.session.info["has_changes"] = True
+
+def record_video_change(video):
+    parent = video.entry.event
+    record_change("video_status", parent.location.user_id, location_id=parent.location_id, event_id=parent.id,
+                  entry_id=video.entry_id, video_id=video.id, status=video.status)
+
+def record_entry_change(entry):
+    parent = entry.event
+    record_change("entry_status", parent.location.user_id, location_id=parent.location_id, event_id=parent.id,
+                  entry_id=entry.id, status=entry.status)
+
+@event.listens_for(Session, "before_flush")
+def stamp_changes(session, flush_context, instances):
+    # stamped when the sequence number is allocated rather than when the
+    # change was built, so the settle window starts close to the commit
+    now = datetime.now(timezone.utc)
+    for obj in session.new:
+        if isinstance(obj, ChangeEvent):
+            obj.created_at = now
+
+@event.listens_for(Session, "after_commit")
+def notify_waiters(session):
+    if session.info.pop("has_changes", False):
+        with _condition:
+            _condition.notify_all()
+
+@event.listens_for(Session, "after_rollback")
+def discard_changes(session):
+    session.info.pop("has_changes", None)
+
+def latest_sequence(user_id):
+    return db.session.execute(
+        select(func.max(ChangeEvent.id)).where(ChangeEvent.user_id == user_id)).scalar() or 0
+
+def missed_changes(since):
+    """True when changes after `since` may already have been pruned."""
+    oldest = db.session.execute(select(func.min(ChangeEvent.id))).scalar()
+    return oldest is not None and since < oldest - 1
+
+def fetch_changes(user_id, since):
+    # Sequence numbers are allocated at flush but become visible at commit, so
+    # a lower id can appear after a higher one. Only changes older than the
+    # settle window are served, which keeps `since` safe to resume from.
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=app.config.get("CHANGE_FEED_SETTLE_SECONDS", 1.0))
+    changes = db.session.execute(
+        select(ChangeEvent).where(
+            ChangeEvent.user_id == user_id,
+            ChangeEvent.id > since,
+            ChangeEvent.created_at <= settled_before)
+        .order_by(ChangeEvent.id)
+        .limit(app.config.get("CHANGE_FEED_LIMIT", 500))).scalars().all()
+    changes = ChangeEventSchema(many=True).dump(changes)
+    # end the read transaction so the next poll sees rows committed since
+    db.session.rollback()
+
+    return changes
+
+def wait_for_changes(user_id, since, timeout):
+    deadline = time.monotonic() + timeout
+    poll_interval = app.config.get("CHANGE_FEED_POLL_INTERVAL", 1.0)
+
+    while True:
+        changes = fetch_changes(user_id, since)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            return changes
+        with _condition:
+            _condition.wait(min(poll_interval, remaining))
+
+def prune_changes(older_than):
+    res = db.session.execute(delete(ChangeEvent).where(ChangeEvent.created_at < older_than))
+    db.session.commit()
+    return res.rowcount
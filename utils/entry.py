@@ -1,11 +1,18 @@
-import json
+from datetime import timedelta
+from uuid import uuid4
 
 from marshmallow import ValidationError
 from flask import current_app as app
 from flask_jwt_extended import current_user
+from sqlalchemy import select
 
+from databases import Event, Entry, Video
 from databases.schemas import EntryWebhookInputDataSchema
-from utils.hours import WeekSchedule
+from utils.event import event_priority
+from utils.status_codes import VideoStatusCode
+
+DUPLICATE_THRESHOLD = 5.0
+VIDEO_LENGTH = 10.0
 
 def parse_input_data(data):
     try:
@@ -16,13 +23,60 @@ def parse_input_data(data):
         return None
     
 def check_operational(location, current_time):
-    operational_hours = location.operational_hours
-
-    if not operational_hours:
+    if location.schedule is None:
         app.logger.info(f"Operational hours not found for location {location.name}")
         return False
-        
-    week_schedule = WeekSchedule(json.loads(operational_hours))
-    is_operational = week_schedule.check_operational(current_time, current_user.timezone, False, False)
 
-    return is_operational
\ No newline at end of file
+    is_operational = location.schedule.check_operational(current_time, current_user.timezone, False, False)
+
+    return is_operational
+
+def duplicate_entry_query(member_id, entered_at):
+    return select(Entry.id).where(
+        Entry.member_id == member_id,
+        Entry.entered_at <= entered_at,
+        Entry.entered_at >= entered_at - timedelta(seconds=DUPLICATE_THRESHOLD)
+    ).limit(1)
+
+def build_entry(location, data, entered_at, is_high_risk, merged_into):
+    """The rows for an accepted entry: its event, unless it joined an open one, the entry and a video per camera.
+
+    Returns (event or None, entry, videos).
+    """
+    event = None
+    if merged_into:
+        event_id = merged_into[0]
+    else:
+        event = Event(
+            id=str(uuid4()),
+            location_id=location.id,
+            is_high_risk=is_high_risk,
+            priority=event_priority(is_high_risk, False),
+            queued_at=entered_at
+        )
+        event_id = event.id
+
+    entry = Entry(
+        id=str(uuid4()),
+        event_id=event_id,
+        member_id=data["member_id"],
+        member_meta=data.get("person_meta", {}),
+        entered_at=entered_at,
+        is_high_risk=is_high_risk
+    )
+
+    videos = [Video(
+        id=str(uuid4()),
+        camera_id=camera.id,
+        entry_id=entry.id,
+        status=VideoStatusCode.CREATED
+    ) for camera in location.cameras]
+
+    return event, entry, videos
+
+def recording_windows(location, entered_at):
+    """Stream URLs and start/end timestamps of the clips an RTSP location records for an entry."""
+    streams = [camera.stream_url for camera in location.cameras]
+    start_timestamps = [entered_at + timedelta(seconds=camera.offset_amount) for camera in location.cameras]
+    end_timestamps = [start_time + timedelta(seconds=VIDEO_LENGTH) for start_time in start_timestamps]
+    return streams, start_timestamps, end_timestamps
@@ -1,28 +1,125 @@
 import os
-
-import boto3
+import json
+import time
+import fcntl
 
 from dotenv import load_dotenv
 
-def get_secret(key):
-    ssm = boto3.client('ssm')
-    response = ssm.get_parameter(Name=key, WithDecryption=True)
+from clients import get_client
+
+SECRETS_CACHE_TTL = 3600
+
+# Values fetched by this process. With preload_app the master resolves the
+# secrets before forking, so the workers inherit them without asking SSM.
+_secrets = {}
+
+def private_directory(path, setting):
+    """Create `path` with mode 0700, or check that an existing one is ours and private.
+
+    A directory another local user created first, or that others can read or
+    write, raises PermissionError naming `setting`.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f'{setting} {path} must be owned by this user with mode 0700')
+    return path
+
+def _secrets_cache_dir():
+    """SECRETS_CACHE_DIR when it is a directory only this user can read, else None.
+
+    There is no default: without preload_app, workers started together share
+    what one of them fetched through a file there, so it must never be a
+    shared directory like /tmp.
+    """
+    path = os.getenv('SECRETS_CACHE_DIR')
+    if not path:
+        return None
+    return private_directory(path, 'SECRETS_CACHE_DIR')
+
+def _read_secrets_cache(path, ttl):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    now = time.time()
+    return {key: item for key, item in cache.items() if now - item["fetched_at"] < ttl}
+
+def _write_secrets_cache(path, cache):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+def _fetch_secret(key):
+    response = get_client('ssm').get_parameter(Name=key, WithDecryption=True)
     return response['Parameter']['Value']
 
+def get_secret(key):
+    ttl = float(os.getenv('SECRETS_CACHE_TTL', SECRETS_CACHE_TTL))
+    item = _secrets.get(key)
+    if item and time.time() - item["fetched_at"] < ttl:
+        return item["value"]
+
+    directory = _secrets_cache_dir()
+    if directory is None:
+        _secrets[key] = {"value": _fetch_secret(key), "fetched_at": time.time()}
+        return _secrets[key]["value"]
+
+    # Workers started together would otherwise all hit SSM at once, so the
+    # first one fetches under a file lock and the rest read its result.
+    path = os.path.join(directory, 'secrets.json')
+    fd = os.open(os.path.join(directory, 'secrets.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd) as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            cache = _read_secrets_cache(path, ttl)
+            if key not in cache:
+                cache[key] = {"value": _fetch_secret(key), "fetched_at": time.time()}
+                _write_secrets_cache(path, cache)
+            _secrets[key] = cache[key]
+            return cache[key]["value"]
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
 def get_default_db_uri(demo=False):
     if demo:
-        s3 = boto3.client('s3')
         demo_db_bucket = os.getenv('S3_BUCKET_NAME', 'td.bucket')
         demo_db_key = os.getenv('DEMO_DB_KEY', 'demo/demo.db')
         if demo_db_bucket and demo_db_key:
             if not os.path.exists('./instance/demo.db'):
                 os.makedirs('./instance', exist_ok=True)
-                s3.download_file(demo_db_bucket, demo_db_key, './instance/demo.db')
+                get_client('s3').download_file(demo_db_bucket, demo_db_key, './instance/demo.db')
 
         return 'sqlite:///demo.db'
     else:
         return get_secret('SQLALCHEMY_DATABASE_URI')
 
+def get_engine_options(db_uri):
+    # SQLite uses SingletonThreadPool/QueuePool defaults which do not take the
+    # MySQL pool sizing options below.
+    if not db_uri or db_uri.startswith('sqlite'):
+        return {}
+
+    # Every gthread thread holds its own scoped session, so size the pool to
+    # the thread count. Greenlets are far more numerous than connections and
+    # queue on a bounded pool instead.
+    if os.getenv('GUNICORN_WORKER_CLASS', 'sync') in ('gevent', 'eventlet'):
+        pool_size = 10
+    else:
+        pool_size = max(int(os.getenv('GUNICORN_THREADS', '1')), 5)
+
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', str(pool_size))),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),
+        'pool_pre_ping': True,
+    }
+
 def set_env_vars():
     if os.path.exists('./.env'):
         load_dotenv(override=True)
@@ -30,8 +127,11 @@ def set_env_vars():
     os.environ['DEMO_ENVIRONMENT'] = os.getenv('DEMO_ENVIRONMENT', '0')
     demo = os.getenv('DEMO_ENVIRONMENT', '0') == '1'
 
-    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = os.getenv('FLASK_SQLALCHEMY_DATABASE_URI', get_default_db_uri(demo))
-    os.environ['FLASK_JWT_SECRET_KEY'] = os.getenv('FLASK_JWT_SECRET_KEY', get_secret('JWT_SECRET_KEY'))
+    # Only reach out to SSM/S3 for values the environment does not provide.
+    if not os.getenv('FLASK_SQLALCHEMY_DATABASE_URI'):
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = get_default_db_uri(demo)
+    if not os.getenv('FLASK_JWT_SECRET_KEY'):
+        os.environ['FLASK_JWT_SECRET_KEY'] = get_secret('JWT_SECRET_KEY')
     
     os.environ['FLASK_SQLALCHEMY_ECHO'] = os.getenv('FLASK_SQLALCHEMY_ECHO', '0')
     os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.getenv('PROMETHEUS_MULTIPROC_DIR', '/tmp')
@@ -39,4 +139,4 @@ def set_env_vars():
     os.environ['UPDATE_SCHEDULE_QUEUE'] = os.getenv('UPDATE_SCHEDULE_QUEUE', 'update-schedule')
     os.environ['S3_BUCKET_NAME'] = os.getenv('S3_BUCKET_NAME', 'td.bucket')
     os.environ['VIDEO_CREATION_QUEUE'] = os.getenv('VIDEO_CREATION_QUEUE', 'video-creation')
-    os.environ['VIDEO_PROCESSING_QUEUE'] = os.getenv('VIDEO_PROCESSING_QUEUE', 'video-processing')
\ No newline at end of file
+    os.environ['VIDEO_PROCESSING_QUEUE'] = os.getenv('VIDEO_PROCESSING_QUEUE', 'video-processing')
@@ -1,7 +1,18 @@
-from sqlalchemy import select
+import base64
+import heapq
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, union_all, or_, and_
 from flask_jwt_extended import current_user
 
 from databases import db, Location, Event
+from databases.types import normalize_uuid
+
+DEFAULT_LEASE_SECONDS = 300
+
+# Review queue tiers; events in the same tier are served oldest first.
+HIGH_RISK_PRIORITY = 2
+TAILGATING_PRIORITY = 1
 
 def retrieve_event(id):
     event = db.session.execute(
@@ -9,4 +20,203 @@ def retrieve_event(id):
             Event.id==id,
             Location.user_id==current_user.id)).unique().scalars().one_or_none()
 
-    return event
\ No newline at end of file
+    return event
+
+def event_priority(is_high_risk, is_merged):
+    """Precomputed so the queue can be read straight off ix_event_review_queue."""
+    return (HIGH_RISK_PRIORITY if is_high_risk else 0) + (TAILGATING_PRIORITY if is_merged else 0)
+
+def retrieve_review_queue(limit, location_ids=None):
+    """The user's next `limit` unreviewed events across locations, highest priority then oldest first.
+
+    Each location contributes at most `limit` rows from its index range, so
+    the cost depends on the number of locations, not on the backlog.
+    """
+    query = select(Location.id).where(Location.user_id == current_user.id)
+    if location_ids:
+        query = query.where(Location.id.in_(location_ids))
+    location_ids = db.session.execute(query).scalars().all()
+    if not location_ids:
+        return []
+
+    heads = [
+        select(Event.id, Event.priority, Event.queued_at)
+        .where(Event.location_id == location_id,
+               Event.action_id.is_(None),
+               Event.deleted_at.is_(None))
+        .order_by(Event.priority.desc(), Event.queued_at)
+        .limit(limit)
+        .subquery()
+        for location_id in location_ids
+    ]
+    candidates = union_all(*[select(head) for head in heads]).subquery()
+    event_ids = db.session.execute(
+        select(candidates.c.id)
+        .order_by(candidates.c.priority.desc(), candidates.c.queued_at, candidates.c.id)
+        .limit(limit)).scalars().all()
+    if not event_ids:
+        return []
+
+    return retrieve_events_in_order(event_ids)
+
+def retrieve_events_in_order(event_ids):
+    events = db.session.execute(select(Event).where(Event.id.in_(event_ids))).unique().scalars().all()
+    order = {event_id: i for i, event_id in enumerate(event_ids)}
+    return sorted(events, key=lambda event: order[event.id])
+
+def encode_cursor(queued_at, event_id):
+    return base64.urlsafe_b64encode(f"{queued_at.isoformat()}|{event_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    """(queued_at, event id); ValueError when the cursor wasn't made by encode_cursor."""
+    try:
+        queued_at, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        if normalize_uuid(event_id) is None:
+            raise ValueError(event_id)
+        return datetime.fromisoformat(queued_at), event_id
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def retrieve_event_feed(limit, location_ids=None, status="unreviewed", start_time=None, cursor=None):
+    """One newest-first stream of the user's events across locations, `limit` at a time.
+
+    Every location's next `limit + 1` events after the cursor are read from
+    ix_event_feed in one UNION ALL round trip and k-way merged here, which
+    keeps each slice an index range scan instead of sorting the union.
+    Returns the events and the cursor for the next page, or None at the end.
+    """
+    query = select(Location.id).where(Location.user_id == current_user.id)
+    if location_ids:
+        query = query.where(Location.id.in_(location_ids))
+    location_ids = db.session.execute(query).scalars().all()
+    if not location_ids:
+        return [], None
+
+    conditions = [Event.deleted_at.is_(None), Event.queued_at.is_not(None)]
+    if status == "unreviewed":
+        conditions.append(Event.action_id.is_(None))
+    elif status == "history":
+        conditions.append(Event.action_id.is_not(None))
+    elif status == "saved":
+        conditions.append(Event.is_saved == True)
+    if start_time:
+        conditions.append(Event.queued_at >= start_time)
+    if cursor:
+        queued_at, event_id = cursor
+        conditions.append(or_(Event.queued_at < queued_at,
+                              and_(Event.queued_at == queued_at, Event.id < event_id)))
+
+    slices = [
+        select(Event.location_id, Event.queued_at, Event.id)
+        .where(Event.location_id == location_id, *conditions)
+        .order_by(Event.queued_at.desc(), Event.id.desc())
+        .limit(limit + 1)
+        .subquery()
+        for location_id in location_ids
+    ]
+    rows = db.session.execute(union_all(*[select(part) for part in slices])).all()
+
+    per_location = {}
+    for location_id, queued_at, event_id in rows:
+        per_location.setdefault(location_id, []).append((queued_at, event_id))
+    # UNION ALL doesn't promise to keep each slice's order, and the slices are small
+    for events in per_location.values():
+        events.sort(reverse=True)
+    merged = list(heapq.merge(*per_location.values(), reverse=True))
+
+    page = merged[:limit]
+    next_cursor = encode_cursor(*page[-1]) if len(merged) > limit else None
+    return retrieve_events_in_order([event_id for _, event_id in page]), next_cursor
+
+def claimable(reviewer, now):
+    """Unreviewed events nobody else holds a live lease on."""
+    return and_(Event.action_id.is_(None),
+                Event.deleted_at.is_(None),
+                or_(Event.claimed_by.is_(None),
+                    Event.claimed_by == reviewer,
+                    Event.claim_expires_at < now))
+
+def claim_events(location_id, reviewer, limit, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Lease the location's next `limit` events in review queue order to `reviewer`.
+
+    Expired leases count as unclaimed, so abandoned events go back to the
+    pool on their own. The caller checks that the location belongs to the
+    user. Returns the claimed events.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=lease_seconds)
+    # no join, so FOR UPDATE only locks event rows and never the shared location row
+    next_events = (
+        select(Event.id)
+        .where(Event.location_id == location_id,
+               claimable(reviewer, now))
+        .order_by(Event.priority.desc(), Event.queued_at)
+        .limit(limit))
+
+    if db.session.get_bind().dialect.name == "sqlite":
+        # no row locks; a single UPDATE is atomic because SQLite runs one writer at a time
+        db.session.execute(
+            update(Event)
+            .where(Event.id.in_(next_events))
+            .values(claimed_by=reviewer, claim_expires_at=expires_at)
+            .execution_options(synchronize_session=False))
+        event_ids = db.session.execute(
+            select(Event.id).where(Event.claimed_by == reviewer,
+                                   Event.claim_expires_at == expires_at)).scalars().all()
+    else:
+        # rows another reviewer is claiming right now are skipped, not waited on
+        event_ids = db.session.execute(next_events.with_for_update(skip_locked=True)).scalars().all()
+        if event_ids:
+            db.session.execute(
+                update(Event)
+                .where(Event.id.in_(event_ids))
+                .values(claimed_by=reviewer, claim_expires_at=expires_at)
+                .execution_options(synchronize_session=False))
+    db.session.commit()
+
+    if not event_ids:
+        return []
+    events = db.session.execute(
+        select(Event).where(Event.id.in_(event_ids))
+        .order_by(Event.priority.desc(), Event.queued_at)).unique().scalars().all()
+    return events
+
+def release_events(event_ids, reviewer):
+    """Give the reviewer's leases on event_ids back to the pool; returns how many were released."""
+    # an id that isn't a UUID can't name an event
+    event_ids = [event_id for event_id in map(normalize_uuid, event_ids) if event_id]
+    result = db.session.execute(
+        update(Event)
+        .where(Event.id.in_(event_ids),
+               Event.claimed_by == reviewer,
+               Event.location_id.in_(select(Location.id).where(Location.user_id == current_user.id)))
+        .values(claimed_by=None, claim_expires_at=None)
+        .execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
+
+def review_event(event_id, action_id, comment, reviewer):
+    """Apply the action to the event unless it was reviewed or is leased to someone else; False if it was.
+
+    One guarded UPDATE, so of two reviewers racing on an event only one applies theirs.
+    """
+    now = datetime.now(timezone.utc)
+    result = db.session.execute(
+        update(Event)
+        .where(Event.id == event_id, claimable(reviewer, now))
+        .values(action_id=action_id, reviewed_at=now, comment=comment, claimed_by=None, claim_expires_at=None)
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+def get_reviewer(data):
+    """Who is reviewing: the account, plus the review session id its client sends as session_id.
+
+    Leases only keep the sessions of one account from picking the same
+    events. They are advisory: any caller with the account's token can send
+    another session's id. Without a session id, every session of the account
+    is the same reviewer.
+    """
+    session_id = (data or {}).get("session_id")
+    if not session_id:
+        return current_user.id
+    return f"{current_user.id}/{session_id}"[:Event.claimed_by.type.length]
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+from functools import wraps
+
+from flask import current_app as app, request
+from flask_jwt_extended import current_user
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+def config_etag():
+    """ETag of the config endpoints, from the version counter on the user row."""
+    key = f'{current_user.id}:{current_user.timezone}:{app.config.get("ETAG_SALT", "")}'
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return f'{digest}-{current_user.config_version}'
+
+def conditional(etag_func=None):
+    """Answer If-None-Match on GET with a 304.
+
+    With etag_func the ETag is known before the view runs, so an unchanged
+    resource is neither queried nor serialized. Without it the ETag is a hash
+    of the body, which only saves the transfer. ETags are weak because the
+    body may be compressed afterwards.
+    """
+    def inner(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return fn(*args, **kwargs)
+
+            etag = etag_func() if etag_func else None
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                return response
+
+            response = app.make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            if etag is not None:
+                response.set_etag(etag, weak=True)
+                return response
+
+            response.add_etag(weak=True)
+            return response.make_conditional(request)
+        return wrapper
+    return inner
+
+def _choose_encoding():
+    accept_encoding = request.accept_encodings
+    if brotli is not None and accept_encoding["br"]:
+        return "br"
+    if accept_encoding["gzip"]:
+        return "gzip"
+    return None
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=app.config.get("BROTLI_QUALITY", 4))
+    return gzip.compress(data, compresslevel=app.config.get("GZIP_LEVEL", 6), mtime=0)
+
+def init_compression(app):
+    @app.after_request
+    def compress_response(response):
+        if response.status_code < 200 or response.status_code in (204, 206, 304) \
+                or response.direct_passthrough or "Content-Encoding" in response.headers \
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if response.content_length is not None \
+                and response.content_length < app.config.get("COMPRESS_MIN_SIZE", 1024):
+            return response
+
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config.get("COMPRESS_MIN_SIZE", 1024):
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,192 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app as app, g, jsonify, request
+from flask_jwt_extended import current_user
+from sqlalchemy import select, delete, update
+from sqlalchemy.exc import IntegrityError
+
+from databases import db, IdempotencyRecord
+
+MAX_KEY_LENGTH = 64
+IDEMPOTENCY_TTL = 24 * 60 * 60
+# how long a claimed key blocks retries if its worker dies before answering;
+# longer than a request can run
+PENDING_TTL = 60
+CACHE_SIZE = 10000
+
+# (user id, key) -> (monotonic expiry, fingerprint, status code, body). Holds
+# the responses this worker produced or replayed; other workers' responses
+# are found in the idempotency_record table.
+_responses = OrderedDict()
+_lock = threading.Lock()
+
+def _ttl():
+    return app.config.get("IDEMPOTENCY_TTL", IDEMPOTENCY_TTL)
+
+def pending_record(user_id, key, fingerprint, pending_ttl=PENDING_TTL):
+    """The row that claims a key while its request runs; its body is filled in by fill_record."""
+    now = datetime.now(timezone.utc)
+    return IdempotencyRecord(user_id=user_id, key=key, fingerprint=fingerprint, created_at=now,
+                             expires_at=now + timedelta(seconds=pending_ttl))
+
+def fill_record(record_id, status_code, body, ttl=IDEMPOTENCY_TTL):
+    """Statement that stores the response in a claimed row; run it in the transaction that commits the writes."""
+    return update(IdempotencyRecord).where(IdempotencyRecord.id == record_id).values(
+        status_code=status_code, body=body, expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl))
+
+def release_record(record_id):
+    """Statement that frees a key whose request failed before storing a response."""
+    return delete(IdempotencyRecord).where(IdempotencyRecord.id == record_id, IdempotencyRecord.body.is_(None))
+
+def _cached(cache_key):
+    with _lock:
+        cached = _responses.get(cache_key)
+        if cached is None:
+            return None
+        if cached[0] <= time.monotonic():
+            del _responses[cache_key]
+            return None
+        _responses.move_to_end(cache_key)
+        return cached[1:]
+
+def _cache(cache_key, expires_in, fingerprint, status_code, body):
+    with _lock:
+        _responses[cache_key] = (time.monotonic() + expires_in, fingerprint, status_code, body)
+        _responses.move_to_end(cache_key)
+        while len(_responses) > CACHE_SIZE:
+            _responses.popitem(last=False)
+
+def _stored(cache_key):
+    now = datetime.now(timezone.utc)
+    record = db.session.execute(
+        select(IdempotencyRecord).where(
+            IdempotencyRecord.user_id == cache_key[0],
+            IdempotencyRecord.key == cache_key[1])).scalar_one_or_none()
+    if record is None:
+        return None
+
+    expires_at = record.expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= now:
+        # not pruned yet; flushed now so the new request can claim its key
+        db.session.delete(record)
+        db.session.flush()
+        return None
+    if record.body is None:
+        return record.fingerprint, None, None
+
+    _cache(cache_key, (expires_at - now).total_seconds(), record.fingerprint, record.status_code, record.body)
+    return record.fingerprint, record.status_code, record.body
+
+def _claim(cache_key, fingerprint):
+    # committed before the view runs, so a retry on any worker finds the key
+    # taken; None if another request claimed it first
+    record = pending_record(*cache_key, fingerprint, app.config.get("IDEMPOTENCY_PENDING_TTL", PENDING_TTL))
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return record.id
+
+def _release(record_id):
+    db.session.rollback()
+    db.session.execute(release_record(record_id))
+    db.session.commit()
+
+def remember_response(body, status_code):
+    """Store the response of a keyed request in the view's own transaction.
+
+    Call right before the commit that makes the request's writes durable, so
+    the response is stored if and only if they are. No-op without a key.
+    """
+    idempotency = g.get("_idempotency")
+    if idempotency is None:
+        return
+
+    body = app.json.dumps(body)
+    db.session.execute(fill_record(idempotency["record_id"], status_code, body, _ttl()))
+    idempotency["response"] = (status_code, body)
+
+def buffered_response():
+    """[record id, status code, body] of the remembered response, for the write buffer to store at its flush.
+
+    The buffer rolls back the view's transaction, fill_record included, so the
+    key stays claimed and retries get a 409 until the group is written.
+    """
+    idempotency = g.get("_idempotency")
+    if idempotency is None or "response" not in idempotency:
+        return None
+    idempotency["buffered"] = True
+    return [idempotency["record_id"], *idempotency["response"]]
+
+def _replay(status_code, body):
+    response = app.response_class(body, status=status_code, mimetype="application/json")
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def idempotent():
+    """Replay the stored response when a request is retried with the same Idempotency-Key.
+
+    A retry never reaches the view, so it makes no writes, presigned URLs or
+    queue messages. Reusing a key with a different body is a 422 and a retry
+    that arrives while the first attempt is still running is a 409: the key is
+    claimed by a committed row before the view runs, on every worker.
+    """
+    def inner(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if not key:
+                return fn(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"msg": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+            cache_key = (current_user.id, key)
+            fingerprint = hashlib.blake2b(request.get_data(), digest_size=16).hexdigest()
+
+            stored = _cached(cache_key) or _stored(cache_key)
+            record_id = None
+            if stored is None:
+                record_id = _claim(cache_key, fingerprint)
+                if record_id is None:
+                    stored = _stored(cache_key) or (fingerprint, None, None)
+
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    app.logger.info(f'Idempotency-Key {key} reused with a different body | user id: {current_user.id}')
+                    return jsonify({"msg": "Idempotency-Key was already used for a different request"}), 422
+                if stored[2] is None:
+                    return jsonify({"msg": "A request with this Idempotency-Key is in progress"}), 409, \
+                        {"Retry-After": "1"}
+                app.logger.debug(f'Replaying response for Idempotency-Key {key} | user id: {current_user.id}')
+                return _replay(stored[1], stored[2])
+
+            g._idempotency = idempotency = {"cache_key": cache_key, "fingerprint": fingerprint, "record_id": record_id}
+            try:
+                response = fn(*args, **kwargs)
+            except Exception:
+                # a response handed to the write buffer is stored at its flush
+                if not idempotency.get("buffered"):
+                    _release(record_id)
+                raise
+
+            stored = idempotency.get("response")
+            if stored is None:
+                # nothing was written, so a retry may run again
+                _release(record_id)
+            else:
+                _cache(cache_key, _ttl(), fingerprint, *stored)
+            return response
+        return wrapper
+    return inner
+
+def prune_idempotency_records(before):
+    result = db.session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < before))
+    db.session.commit()
+    return result.rowcount
@@ -1,7 +1,15 @@
-from databases import Location, db
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from databases import Location, UploadOptionEnum, db
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 from flask_jwt_extended import current_user
 
+from utils.hours import WeekSchedule
+
 def retrieve_location(location_id):
     location = db.session.execute(
         select(Location).where(
@@ -23,4 +31,95 @@ def retrieve_location_id(user_id, name):
             Location.user_id==user_id,
             Location.name==name)).scalar_one_or_none()
     
-    return location_id
\ No newline at end of file
+    return location_id
+
+@dataclass(frozen=True)
+class CameraSnapshot:
+    id: int
+    stream_url: str
+    offset_amount: int
+
+@dataclass(frozen=True)
+class LocationSnapshot:
+    """What /entry needs from a location, detached from the session and safe to share between threads."""
+    id: int
+    name: str
+    upload_method: UploadOptionEnum
+    operational_hours: dict
+    schedule: WeekSchedule
+    cameras: tuple
+
+# (user id, location id) -> (config version, snapshot or None). Entries are
+# replaced when User.config_version moves, which happens whenever one of the
+# user's locations or cameras is written. Missing locations are cached too.
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+SNAPSHOT_CACHE_SIZE = 1024
+
+def _location_query(user_id, location_id):
+    return (select(Location)
+            .options(joinedload(Location.cameras, innerjoin=False))
+            .where(Location.user_id == user_id, Location.id == location_id))
+
+def _to_snapshot(location):
+    if not location:
+        return None
+
+    operational_hours = location.operational_hours
+    if isinstance(operational_hours, str):
+        operational_hours = json.loads(operational_hours)
+
+    return LocationSnapshot(
+        id=location.id,
+        name=location.name,
+        upload_method=location.upload_method,
+        operational_hours=operational_hours,
+        schedule=WeekSchedule(operational_hours) if operational_hours else None,
+        cameras=tuple(CameraSnapshot(camera.id, camera.stream_url, camera.offset_amount)
+                      for camera in location.cameras)
+    )
+
+def _load_location_snapshot(user_id, location_id):
+    location = db.session.execute(_location_query(user_id, location_id)).unique().scalar_one_or_none()
+    return _to_snapshot(location)
+
+def _cached_snapshot(key, version):
+    """The cache entry for key when it is current, else None."""
+    with _snapshots_lock:
+        cached = _snapshots.get(key)
+        if cached is not None and cached[0] == version:
+            _snapshots.move_to_end(key)
+            return cached
+    return None
+
+def _cache_snapshot(key, version, snapshot):
+    with _snapshots_lock:
+        _snapshots[key] = (version, snapshot)
+        _snapshots.move_to_end(key)
+        while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+            _snapshots.popitem(last=False)
+
+def get_location_snapshot(location_id):
+    key = (current_user.id, int(location_id))
+    version = current_user.config_version
+
+    cached = _cached_snapshot(key, version)
+    if cached is not None:
+        return cached[1]
+
+    snapshot = _load_location_snapshot(*key)
+    _cache_snapshot(key, version, snapshot)
+    return snapshot
+
+async def get_location_snapshot_async(session, user, location_id):
+    """get_location_snapshot for the asyncio ingestion service; shares its cache."""
+    key = (user.id, int(location_id))
+
+    cached = _cached_snapshot(key, user.config_version)
+    if cached is not None:
+        return cached[1]
+
+    result = await session.execute(_location_query(*key))
+    snapshot = _to_snapshot(result.unique().scalar_one_or_none())
+    _cache_snapshot(key, user.config_version, snapshot)
+    return snapshot
@@ -1,14 +1,25 @@
+import csv
+import io
+from datetime import datetime, timezone
+
 from flask_jwt_extended import current_user
-from sqlalchemy import select
+from sqlalchemy import select, update, insert, delete
+from sqlalchemy.dialects import sqlite, postgresql
 
 from databases import db, HighRiskMember
 
+MEMBER_ID_LENGTH = HighRiskMember.member_id.type.length
+# keeps IN lists and multi-row INSERTs under every driver's parameter limit
+IMPORT_CHUNK_SIZE = 5000
+
+def high_risk_member_query(user_id, member_id):
+    return select(HighRiskMember.id).where(
+        HighRiskMember.user_id == user_id,
+        HighRiskMember.member_id == member_id,
+        HighRiskMember.is_deleted==False)
+
 def check_high_risk_member_exists(member_id):
-    member = db.session.execute(
-        select(HighRiskMember).where(
-            HighRiskMember.user_id == current_user.id,
-            HighRiskMember.member_id == member_id,
-            HighRiskMember.is_deleted==False)).scalars().one_or_none()
+    member = db.session.execute(high_risk_member_query(current_user.id, member_id)).scalar_one_or_none()
     
     return member is not None
 
@@ -27,4 +38,130 @@ def retrieve_high_risk_members():
             HighRiskMember.user_id == current_user.id,
             HighRiskMember.is_deleted==False)).scalars().all()
     
-    return members
\ No newline at end of file
+    return members
+
+def retrieve_deleted_high_risk_member(member_id):
+    return db.session.execute(
+        select(HighRiskMember).where(
+            HighRiskMember.user_id == current_user.id,
+            HighRiskMember.member_id == member_id,
+            HighRiskMember.is_deleted==True)).scalars().one_or_none()
+
+def reactivate_high_risk_member(member_id):
+    """Bring back the member's deleted row, if there is one; returns it or None."""
+    deleted_member = retrieve_deleted_high_risk_member(member_id)
+    if deleted_member:
+        deleted_member.is_deleted = False
+        deleted_member.created_at = datetime.now(timezone.utc)
+    return deleted_member
+
+def soft_delete_high_risk_member(member):
+    # the deleted row a member already has gives way to the one being deleted now
+    deleted_member = retrieve_deleted_high_risk_member(member.member_id)
+    if deleted_member:
+        db.session.delete(deleted_member)
+        db.session.flush()
+    member.is_deleted = True
+
+def add_high_risk_member(member_id):
+    """Make member_id an active high-risk member, the way POST /high-risk-member does.
+
+    Members that are already active are left alone and a deleted row is
+    reactivated before a new one is inserted. Returns the member's row.
+    """
+    member = retrieve_high_risk_member(member_id) or reactivate_high_risk_member(member_id)
+    if member is None:
+        member = HighRiskMember(user_id=current_user.id, member_id=member_id, created_at=datetime.now(timezone.utc))
+        db.session.add(member)
+    return member
+
+def parse_member_ids(request):
+    """Member ids from a CSV upload/body (member_id column or first column) or a JSON array."""
+    upload = request.files.get("file")
+    if upload is not None or request.mimetype == "text/csv":
+        text = (upload.read() if upload is not None else request.get_data()).decode("utf-8-sig")
+        rows = [row for row in csv.reader(io.StringIO(text)) if row]
+        column = 0
+        if rows and "member_id" in [cell.strip().lower() for cell in rows[0]]:
+            column = [cell.strip().lower() for cell in rows[0]].index("member_id")
+            rows = rows[1:]
+        return [row[column] if len(row) > column else "" for row in rows]
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("member_ids")
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of member ids or a CSV file")
+    return data
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), IMPORT_CHUNK_SIZE):
+        yield values[start:start + IMPORT_CHUNK_SIZE]
+
+def _insert_ignoring_duplicates():
+    # a concurrent import may insert the same member first
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(HighRiskMember).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(HighRiskMember).on_conflict_do_nothing()
+    return insert(HighRiskMember).prefix_with("IGNORE")
+
+def import_high_risk_members(member_ids, replace=True):
+    """Make the user's high-risk list match member_ids with set-based statements.
+
+    New members are inserted in multi-row INSERTs, previously deleted ones are
+    reactivated and, with replace, members missing from the import are soft
+    deleted. Returns a summary of what changed.
+    """
+    wanted, invalid = {}, []
+    for member_id in member_ids:
+        member_id = str(member_id).strip() if member_id is not None else ""
+        if not member_id or len(member_id) > MEMBER_ID_LENGTH:
+            invalid.append(member_id)
+        else:
+            wanted[member_id] = None
+
+    existing = db.session.execute(
+        select(HighRiskMember.id, HighRiskMember.member_id, HighRiskMember.is_deleted).where(
+            HighRiskMember.user_id == current_user.id)).all()
+    active = {member_id: id for id, member_id, is_deleted in existing if not is_deleted}
+    deleted = {member_id: id for id, member_id, is_deleted in existing if is_deleted}
+
+    to_insert = [member_id for member_id in wanted if member_id not in active and member_id not in deleted]
+    to_reactivate = [deleted[member_id] for member_id in wanted if member_id not in active and member_id in deleted]
+    to_delete = [member_id for member_id in active if member_id not in wanted] if replace else []
+    # the deleted row a member already has gives way to the one being deleted now
+    to_purge = [deleted[member_id] for member_id in to_delete if member_id in deleted]
+    to_delete = [active[member_id] for member_id in to_delete]
+
+    now = datetime.now(timezone.utc)
+    for chunk in _chunks(to_purge):
+        db.session.execute(
+            delete(HighRiskMember).where(HighRiskMember.id.in_(chunk))
+            .execution_options(synchronize_session=False))
+    for chunk in _chunks(to_delete):
+        db.session.execute(
+            update(HighRiskMember).where(HighRiskMember.id.in_(chunk)).values(is_deleted=True)
+            .execution_options(synchronize_session=False))
+    for chunk in _chunks(to_reactivate):
+        db.session.execute(
+            update(HighRiskMember).where(HighRiskMember.id.in_(chunk)).values(is_deleted=False, created_at=now)
+            .execution_options(synchronize_session=False))
+    for chunk in _chunks(to_insert):
+        db.session.execute(_insert_ignoring_duplicates().values([
+            {"user_id": current_user.id, "member_id": member_id, "is_deleted": False, "created_at": now}
+            for member_id in chunk]))
+    db.session.commit()
+
+    return {
+        "received": len(member_ids),
+        "inserted": len(to_insert),
+        "reactivated": len(to_reactivate),
+        "deleted": len(to_delete),
+        "unchanged": sum(1 for member_id in wanted if member_id in active),
+        "invalid": len(invalid),
+        "invalid_member_ids": invalid[:100],
+        "mode": "replace" if replace else "merge"
+    }
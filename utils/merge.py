@@ -0,0 +1,178 @@
+import threading
+from collections import Counter, deque
+from datetime import timedelta
+
+from flask import current_app as app
+from sqlalchemy import select, update, delete, func, or_, case, literal
+
+from databases import db, Event, Entry
+from utils.event import HIGH_RISK_PRIORITY, TAILGATING_PRIORITY
+
+# Entries at the same location within PRECEDE_THRESHOLD seconds of the
+# previous one join its event, as long as the event has not been reviewed and
+# spans no more than MAX_EVENT_SPAN seconds, so a steady queue of people
+# doesn't chain into one endless event.
+PRECEDE_THRESHOLD = 5.0
+MAX_EVENT_SPAN = 60.0
+WINDOW_SIZE = 64
+
+# location id -> recent (entered_at, event id, event started at) seen by this
+# worker, newest last. Misses fall back to the database, which also sees the
+# events other workers created.
+_windows = {}
+_lock = threading.Lock()
+
+def _thresholds():
+    return (timedelta(seconds=app.config.get("PRECEDE_THRESHOLD", PRECEDE_THRESHOLD)),
+            timedelta(seconds=app.config.get("MAX_EVENT_SPAN", MAX_EVENT_SPAN)))
+
+def _in_window(location_id, entered_at):
+    precede, span = _thresholds()
+    with _lock:
+        window = _windows.get(location_id, ())
+        for previous, event_id, started_at in reversed(window):
+            if previous <= entered_at and entered_at - previous <= precede and entered_at - started_at <= span:
+                return event_id, started_at
+    return None
+
+def _open_event_query(location_id, entered_at):
+    precede, span = _thresholds()
+    last_entered_at = func.max(Entry.entered_at)
+    return (
+        select(Event.id, Event.queued_at)
+        .join(Entry, Entry.event_id == Event.id)
+        .where(Event.location_id == location_id,
+               Event.deleted_at.is_(None),
+               Event.action_id.is_(None),
+               Event.queued_at >= entered_at - span,
+               Event.queued_at <= entered_at)
+        .group_by(Event.id, Event.queued_at)
+        .having(last_entered_at >= entered_at - precede)
+        .order_by(last_entered_at.desc())
+        .limit(1))
+
+def _target(row, entered_at):
+    if row is None:
+        return None
+    # the database hands back naive UTC; the window compares it with entered_at
+    return row[0], row[1].replace(tzinfo=entered_at.tzinfo)
+
+def _in_database(location_id, entered_at):
+    return _target(db.session.execute(_open_event_query(location_id, entered_at)).first(), entered_at)
+
+def remember_entry(location_id, entered_at, event_id, started_at):
+    """Call once the entry is committed."""
+    with _lock:
+        window = _windows.get(location_id)
+        if window is None:
+            window = _windows[location_id] = deque(maxlen=WINDOW_SIZE)
+        window.append((entered_at, event_id, started_at))
+
+def forget_windows():
+    with _lock:
+        _windows.clear()
+
+def merge_into_open_event(location_id, entered_at, is_high_risk, deferred=False):
+    """Attach an entry arriving at `entered_at` to the location's open event, if there is one.
+
+    Returns (event id, event started at) of the event it joined, or None
+    when the entry needs an event of its own. With `deferred` the event isn't
+    updated here; the write buffer does that when it commits the entry.
+    """
+    target = _in_window(location_id, entered_at) or _in_database(location_id, entered_at)
+    if target is None or deferred:
+        return target
+
+    return target if mark_merged(target[0], is_high_risk) else None
+
+def _mark_merged_statement(event_id, is_high_risk):
+    # the event may have been reviewed or deleted since it was seen
+    high_risk = or_(Event.is_high_risk, literal(is_high_risk))
+    return (
+        update(Event)
+        .where(Event.id == event_id, Event.action_id.is_(None), Event.deleted_at.is_(None))
+        .values(is_merged=True, is_high_risk=high_risk,
+                priority=TAILGATING_PRIORITY + case((high_risk, HIGH_RISK_PRIORITY), else_=0))
+        .execution_options(synchronize_session=False))
+
+def mark_merged(event_id, is_high_risk):
+    return db.session.execute(_mark_merged_statement(event_id, is_high_risk)).rowcount == 1
+
+async def merge_into_open_event_async(session, location_id, entered_at, is_high_risk):
+    """merge_into_open_event for the asyncio ingestion service."""
+    target = _in_window(location_id, entered_at)
+    if target is None:
+        target = _target((await session.execute(_open_event_query(location_id, entered_at))).first(), entered_at)
+    if target is None:
+        return None
+
+    result = await session.execute(_mark_merged_statement(target[0], is_high_risk))
+    return target if result.rowcount == 1 else None
+
+def remerge_location(location_id, since=None, dry_run=False):
+    """Merge the location's historical unreviewed entries the way /entry merges new ones.
+
+    Entries move to the first event of their burst and the emptied events are
+    deleted. Returns (bursts merged, events removed).
+    """
+    precede, span = _thresholds()
+    query = (
+        select(Entry.id, Entry.entered_at, Entry.is_high_risk, Event.id, Event.is_saved,
+               Event.is_high_risk.label("event_is_high_risk"))
+        .join(Event, Entry.event_id == Event.id)
+        .where(Event.location_id == location_id,
+               Event.deleted_at.is_(None),
+               Event.action_id.is_(None),
+               Entry.entered_at.is_not(None))
+        .order_by(Entry.entered_at, Entry.id))
+    if since is not None:
+        query = query.where(Event.queued_at >= since)
+
+    bursts, burst = [], []
+    for row in db.session.execute(query.execution_options(yield_per=10000)):
+        if burst and (row.entered_at - burst[-1].entered_at > precede
+                      or row.entered_at - burst[0].entered_at > span):
+            bursts.append(burst)
+            burst = []
+        burst.append(row)
+    bursts.append(burst)
+
+    # entries move by id: an event can have entries in more than one burst,
+    # and only the ones in the burst being merged go to its target
+    remaining = Counter(row[3] for burst in bursts for row in burst)
+    merged, removed = 0, set()
+    for burst in bursts:
+        event_ids = list(dict.fromkeys(row[3] for row in burst))
+        target = event_ids[0] if event_ids else None
+        if len(event_ids) < 2 or target in removed:
+            continue
+        moving = [row[0] for row in burst if row[3] != target]
+        for row in burst:
+            if row[3] != target:
+                remaining[row[3]] -= 1
+        emptied = [event_id for event_id in event_ids[1:] if remaining[event_id] == 0]
+        removed.update(emptied)
+        merged += 1
+        if dry_run:
+            continue
+
+        is_high_risk = any(row.is_high_risk or row.event_is_high_risk for row in burst)
+        db.session.execute(
+            update(Entry).where(Entry.id.in_(moving)).values(event_id=target)
+            .execution_options(synchronize_session=False))
+        db.session.execute(
+            update(Event).where(Event.id == target)
+            .values(is_merged=True, is_high_risk=is_high_risk,
+                    is_saved=any(row.is_saved for row in burst),
+                    priority=TAILGATING_PRIORITY + (HIGH_RISK_PRIORITY if is_high_risk else 0),
+                    queued_at=burst[0].entered_at)
+            .execution_options(synchronize_session=False))
+        # entries outside the query (no entered_at) keep their event alive
+        db.session.execute(
+            delete(Event).where(Event.id.in_(emptied),
+                                ~select(Entry.id).where(Entry.event_id == Event.id).exists())
+            .execution_options(synchronize_session=False))
+
+    if not dry_run:
+        db.session.commit()
+    return merged, len(removed)
@@ -1,29 +1,137 @@
-from functools import wraps
-
-from prometheus_client import Summary, Counter
-from flask import current_app as app
-
-from utils.misc import extract_status_code
-
-REQUEST_TIME = Summary('flask_request_processing_seconds', 'Time spent processing request', ['method'])
-FAILED_REQUEST = Counter('flask_failed_request_counter', 'Number of failed requests', ['method'])
-
-def timeit(method):
-    @wraps(method)
-    def wrapper(*args, **kwargs):
-        metric = REQUEST_TIME.labels(method.__name__)
-        with metric.time():
-            result = method(*args, **kwargs)
-        return result
-    return wrapper
-
-def fail_counter(method):
-    @wraps(method)
-    def wrapper(*args, **kwargs):
-        metric = FAILED_REQUEST.labels(method.__name__)
-        result = method(*args, **kwargs)
-        status_code = extract_status_code(result)
-        if not status_code.startswith('2'):
-            metric.inc(1)
-        return result
-    return wrapper
\ No newline at end of file
+import re
+import time
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import Histogram, Counter
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram('flask_request_duration_seconds', 'Time spent processing request',
+                            ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+REQUEST_DB_TIME = Histogram('flask_request_db_seconds', 'Time spent in database calls per request',
+                            ['endpoint'], buckets=LATENCY_BUCKETS)
+REQUEST_EXTERNAL_TIME = Histogram('flask_request_external_seconds', 'Time spent in AWS calls per request',
+                                  ['endpoint'], buckets=LATENCY_BUCKETS)
+REQUEST_DB_QUERIES = Histogram('flask_request_db_queries', 'Number of database queries per request',
+                               ['endpoint'], buckets=(1, 2, 3, 5, 8, 13, 21, 50, 100))
+SLOW_QUERIES = Counter('flask_slow_queries', 'Number of queries slower than SLOW_QUERY_THRESHOLD', ['endpoint'])
+
+slow_query_logger = logging.getLogger('slow_query')
+settings = {
+    "slow_query_threshold": 0.5,
+    "server_timing": False,
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+@dataclass
+class RequestTimings:
+    started_at: float
+    db: float = 0.0
+    external: float = 0.0
+    external_calls: int = 0
+    queries: int = 0
+    endpoint: str = 'unknown'
+    recorded: bool = False
+
+# A context variable rather than flask.g: the database and botocore hooks run
+# on every call and also outside of requests (CLI commands, startup).
+_request_timings = ContextVar('request_timings', default=None)
+
+def current_timings():
+    return _request_timings.get()
+
+def normalize_statement(statement):
+    """Collapse literals and IN lists so the same query always logs the same way."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.db += elapsed
+        timings.queries += 1
+
+    if elapsed >= settings["slow_query_threshold"]:
+        endpoint = timings.endpoint if timings is not None else 'none'
+        SLOW_QUERIES.labels(endpoint).inc()
+        slow_query_logger.warning(f'{elapsed * 1000:.1f}ms | endpoint: {endpoint} | {normalize_statement(statement)}')
+
+def _before_aws_call(context, **kwargs):
+    context['metrics_started_at'] = time.perf_counter()
+
+def _after_aws_call(context, **kwargs):
+    started_at = context.pop('metrics_started_at', None)
+    timings = _request_timings.get()
+    if timings is not None and started_at is not None:
+        timings.external += time.perf_counter() - started_at
+        timings.external_calls += 1
+
+def instrument_aws_session(botocore_session):
+    botocore_session.register('before-call', _before_aws_call)
+    botocore_session.register('after-call', _after_aws_call)
+    botocore_session.register('after-call-error', _after_aws_call)
+
+def _record(timings, status):
+    timings.recorded = True
+    endpoint = timings.endpoint
+    REQUEST_LATENCY.labels(endpoint, request.method, status).observe(time.perf_counter() - timings.started_at)
+    REQUEST_DB_TIME.labels(endpoint).observe(timings.db)
+    REQUEST_DB_QUERIES.labels(endpoint).observe(timings.queries)
+    if timings.external_calls:
+        REQUEST_EXTERNAL_TIME.labels(endpoint).observe(timings.external)
+
+def server_timing_header(timings):
+    total = time.perf_counter() - timings.started_at
+    parts = [f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"']
+    if timings.external_calls:
+        parts.append(f'aws;dur={timings.external * 1000:.1f};desc="{timings.external_calls} calls"')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+def init_metrics(app):
+    settings["slow_query_threshold"] = float(app.config.get("SLOW_QUERY_THRESHOLD", settings["slow_query_threshold"]))
+    settings["server_timing"] = bool(app.config.get("SERVER_TIMING", settings["server_timing"]))
+
+    @app.before_request
+    def start_request_timer():
+        _request_timings.set(RequestTimings(started_at=time.perf_counter(),
+                                            endpoint=request.endpoint or 'unknown'))
+
+    # error_handler turns exceptions into responses, so the status seen here
+    # is the one the client gets.
+    @app.after_request
+    def record_request_metrics(response):
+        timings = _request_timings.get()
+        if timings is not None:
+            if settings["server_timing"]:
+                response.headers["Server-Timing"] = server_timing_header(timings)
+            _record(timings, str(response.status_code))
+        return response
+
+    # Flask runs after_request for the 500 it renders for an unhandled
+    # exception too. It doesn't when the exception propagates instead
+    # (PROPAGATE_EXCEPTIONS, on in debug and testing) or when an after_request
+    # function raises first; those requests are recorded as 500 here.
+    @app.teardown_request
+    def finish_request_timer(exc):
+        timings = _request_timings.get()
+        if timings is not None and not timings.recorded:
+            _record(timings, '500')
+        _request_timings.set(None)
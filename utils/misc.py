@@ -3,7 +3,6 @@ import logging.config
 import os
 
 import yaml
-from flask import current_app as app
 
 def configure_logging(config_path='logging.yaml', default_level=logging.INFO):
     path = config_path
@@ -27,11 +26,3 @@ def configure_logging(config_path='logging.yaml', default_level=logging.INFO):
 
 def has_all_keys(data, keys):
     return all([key in data for key in keys])
-    
-def extract_status_code(result):
-    if isinstance(result, app.response_class):
-        return result.status
-    elif isinstance(result, tuple):
-        return str(result[1])
-    else:
-        raise Exception(f"Unknown response type {type(result)}")
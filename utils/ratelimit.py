@@ -0,0 +1,135 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from flask import current_app as app, jsonify, request
+from prometheus_client import Counter
+from sqlalchemy.pool import QueuePool
+
+from databases import db
+from utils.env import private_directory
+
+RATE_LIMIT_FILE = 'buckets.bin'
+# tokens per second and bucket size, per identity
+DEFAULT_LIMITS = {
+    "api": (20.0, 40.0),
+    "web": (50.0, 100.0),
+}
+SHED_EXEMPT_ENDPOINTS = {"get_metrics", "auth.healthz"}
+
+# The buckets live in a small memory-mapped file so every gunicorn worker on
+# the host draws from the same ones. Each slot is (key hash, tokens, last
+# refill time); keys are hashed into SLOTS slots with a short linear probe,
+# and when the probe is full the slot refilled longest ago is reused.
+SLOTS = 4096
+PROBE = 8
+_SLOT = struct.Struct("<Qdd")
+
+RATE_LIMITED = Counter('flask_rate_limited', 'Requests rejected by the per-identity rate limit', ['kind'])
+SHED = Counter('flask_shed', 'Requests rejected because the database pool was exhausted', ['reason'])
+
+_lock = threading.Lock()
+_store = {}
+
+def rate_limit_dir():
+    # a private directory of this user's, so no one else on the host can
+    # swap the file for a link or fill the buckets
+    default = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"td_ratelimit-{os.getuid()}")
+    return app.config.get("RATE_LIMIT_DIR", default)
+
+def _open_store():
+    # opened per process, after the fork, so every worker has its own descriptor for flock
+    directory = rate_limit_dir()
+    store = _store.get(os.getpid())
+    if store is not None and store[0] == directory:
+        return store[1], store[2]
+
+    path = os.path.join(private_directory(directory, "RATE_LIMIT_DIR"), RATE_LIMIT_FILE)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    info = os.fstat(fd)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        os.close(fd)
+        raise PermissionError(f'{path} must be owned by this user with mode 0600')
+    size = SLOTS * _SLOT.size
+    if info.st_size < size:
+        os.ftruncate(fd, size)
+    buckets = mmap.mmap(fd, size)
+    _store.clear()
+    _store[os.getpid()] = (directory, fd, buckets)
+    return fd, buckets
+
+def take_token(key, rate, burst, now=None):
+    """Take one token from key's bucket; returns seconds to wait, 0 when allowed."""
+    now = time.time() if now is None else now
+    key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+    start = key_hash % SLOTS
+
+    with _lock:
+        fd, buckets = _open_store()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            slot, oldest = None, None
+            for i in range(PROBE):
+                index = (start + i) % SLOTS
+                stored_hash, tokens, updated_at = _SLOT.unpack_from(buckets, index * _SLOT.size)
+                if stored_hash == key_hash:
+                    slot = index
+                    break
+                if oldest is None or updated_at < oldest[1]:
+                    oldest = (index, updated_at)
+
+            if slot is None:
+                slot, tokens, updated_at = oldest[0], burst, now
+
+            tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            _SLOT.pack_into(buckets, slot * _SLOT.size, key_hash, tokens, now)
+            return wait
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+def check_rate_limit(identity, is_api):
+    """None when the request may go ahead, else the 429 response."""
+    if not app.config.get("RATE_LIMIT_ENABLED", True):
+        return None
+
+    kind = "api" if is_api else "web"
+    default_rate, default_burst = DEFAULT_LIMITS[kind]
+    rate = float(app.config.get(f"RATE_LIMIT_{kind.upper()}_RATE", default_rate))
+    burst = float(app.config.get(f"RATE_LIMIT_{kind.upper()}_BURST", default_burst))
+
+    wait = take_token(f"{kind}:{identity}", rate, burst)
+    if not wait:
+        return None
+
+    RATE_LIMITED.labels(kind).inc()
+    app.logger.info(f'Rate limited {kind} requests of {identity}')
+    return jsonify({"msg": "Too many requests"}), 429, {"Retry-After": str(max(1, round(wait)))}
+
+def pool_exhausted():
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return False
+    return pool.checkedout() >= pool.size() + pool._max_overflow
+
+def overloaded(reason):
+    SHED.labels(reason).inc()
+    app.logger.warning(f'Shedding {request.method} {request.path}: {reason}')
+    return jsonify({"msg": "Service is overloaded, retry shortly"}), 503, {"Retry-After": "1"}
+
+def init_load_shedding(app):
+    # Answer at once when every connection is busy instead of queueing for
+    # pool_timeout seconds; the JWT user lookup would be the first to wait.
+    @app.before_request
+    def shed_when_pool_exhausted():
+        if request.endpoint not in SHED_EXEMPT_ENDPOINTS and pool_exhausted():
+            return overloaded("pool_exhausted")
@@ -1,19 +1,25 @@
 import os
 import json
 
-from clients import s3_client, sqs_client
+from clients import get_s3_client, get_sqs_client
 
 def generate_presigned_url(video_id):
-    return s3_client.generate_presigned_url_post(Bucket=os.getenv('S3_BUCKET_NAME'),
-                                                    Key=f'/videos/{video_id}.mp4',
-                                                    ExpiresIn=600)
+    return get_s3_client().generate_presigned_post(Bucket=os.getenv('S3_BUCKET_NAME'),
+                                                   Key=f'/videos/{video_id}.mp4',
+                                                   ExpiresIn=600)
 
 def user_upload(videos):
-    presigned_urls = [{"presigned_url": generate_presigned_url(video.id), "video_id": video.id} for video in videos]
+    # a presigned POST: the video is uploaded as a form to presigned_url with
+    # the signed fields next to the file
+    presigned_urls = []
+    for video in videos:
+        post = generate_presigned_url(video.id)
+        presigned_urls.append({"presigned_url": post["url"], "fields": post["fields"], "video_id": video.id})
     
     return presigned_urls
 
 def rtsp_upload(videos, streams, start_timestamps, end_timestamps):
+    sqs_client = get_sqs_client()
     queue_url = sqs_client.get_queue_url(QueueName=os.getenv('VIDEO_CREATION_QUEUE'))['QueueUrl']
     for video, stream, start_timestamp, end_timestamp in zip(videos,
                                                                 streams,
@@ -1,30 +1,127 @@
 import os
-import json
+from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import select, update, func, case
 
-from databases import db, Video
-from clients import sqs_client
+from databases import db, Video, Entry, Event, Location
+from databases.types import normalize_uuid
+from clients import get_sqs_client
+from utils.status_codes import VideoStatusCode, EntryStatusCode
+from utils.changes import record_change
+from utils.camera import get_camera_fragments, video_message
+
+# SQS accepts at most 10 messages per SendMessageBatch call
+SQS_BATCH_SIZE = 10
 
 def get_video(id):
     video = db.session.execute(
         select(Video).where(Video.id==id)).unique().scalar_one_or_none()
     return video
 
-def send_video_to_queue(video, camera):
-    body = {
-        "video_id": video.id,
-        "gate": [(camera.x1, camera.y1), (camera.x2, camera.y2),
-                 (camera.x3, camera.y3), (camera.x4, camera.y4)],
-        "norm": [camera.nx, camera.ny],
-        "threshold": camera.threshold,
-        "minimum_time": camera.minimum_time
-    }
+def send_video_to_queue(video_id, camera_id):
+    fragment = get_camera_fragments([camera_id])[camera_id]
 
+    sqs_client = get_sqs_client()
     queue_url = sqs_client.get_queue_url(QueueName=os.getenv('VIDEO_PROCESSING_QUEUE'))['QueueUrl']
     res = sqs_client.send_message(
         QueueUrl=queue_url,
-        MessageBody=json.dumps(body)
+        MessageBody=video_message(video_id, fragment)
     )
 
-    return res
\ No newline at end of file
+    return res
+
+def send_videos_to_queue(messages):
+    """Send (video id, message body) pairs in batches of ten. Returns the video ids that failed."""
+    if not messages:
+        return []
+
+    sqs_client = get_sqs_client()
+    queue_url = sqs_client.get_queue_url(QueueName=os.getenv('VIDEO_PROCESSING_QUEUE'))['QueueUrl']
+
+    failed = []
+    for start in range(0, len(messages), SQS_BATCH_SIZE):
+        batch = messages[start:start + SQS_BATCH_SIZE]
+        res = sqs_client.send_message_batch(
+            QueueUrl=queue_url,
+            Entries=[{"Id": str(i), "MessageBody": body} for i, (_, body) in enumerate(batch)]
+        )
+        failed.extend(batch[int(failure["Id"])][0] for failure in res.get("Failed", []))
+
+    return failed
+
+def retrieve_video_owners(video_ids):
+    """Video id -> (video, event id, location id, user id), in one query."""
+    # an id that isn't a UUID can't name a video
+    video_ids = [video_id for video_id in video_ids if normalize_uuid(video_id)]
+    rows = db.session.execute(
+        select(Video.id, Video.status, Video.entry_id, Video.camera_id,
+               Event.id, Event.location_id, Location.user_id)
+        .join(Entry, Video.entry_id == Entry.id)
+        .join(Event, Entry.event_id == Event.id)
+        .join(Location, Event.location_id == Location.id)
+        .where(Video.id.in_(video_ids))).all()
+
+    return {row[0]: row for row in rows}
+
+def set_video_statuses(statuses):
+    """Apply {video id: VideoStatusCode} with one UPDATE per distinct status.
+
+    Returns the rows as they were before the update and the ids that don't exist.
+    """
+    videos = retrieve_video_owners(list(statuses))
+    now = datetime.now(timezone.utc)
+
+    ids_by_status = {}
+    for video_id in videos:
+        ids_by_status.setdefault(statuses[video_id], []).append(video_id)
+
+    for status, video_ids in ids_by_status.items():
+        values = {"status": status}
+        if status == VideoStatusCode.PROCESS_READY:
+            values["uploaded_at"] = now
+        db.session.execute(
+            update(Video).where(Video.id.in_(video_ids)).values(**values)
+            .execution_options(synchronize_session=False))
+
+    for video_id, _, entry_id, _, event_id, location_id, user_id in videos.values():
+        record_change("video_status", user_id, location_id=location_id, event_id=event_id,
+                      entry_id=entry_id, video_id=video_id, status=statuses[video_id])
+
+    return videos, [video_id for video_id in statuses if video_id not in videos]
+
+def mark_ready_entries(entry_ids, owners):
+    """Mark entries whose videos are all PROCESS_READY, found with one aggregate query."""
+    if not entry_ids:
+        return []
+
+    not_ready = func.sum(case((Video.status != VideoStatusCode.PROCESS_READY, 1), else_=0))
+    ready_entry_ids = db.session.execute(
+        select(Video.entry_id)
+        .where(Video.entry_id.in_(entry_ids))
+        .group_by(Video.entry_id)
+        .having(not_ready == 0)).scalars().all()
+
+    if ready_entry_ids:
+        db.session.execute(
+            update(Entry).where(Entry.id.in_(ready_entry_ids)).values(status=EntryStatusCode.PROCESS_READY)
+            .execution_options(synchronize_session=False))
+
+    for entry_id in ready_entry_ids:
+        event_id, location_id, user_id = owners[entry_id]
+        record_change("entry_status", user_id, location_id=location_id, event_id=event_id,
+                      entry_id=entry_id, status=EntryStatusCode.PROCESS_READY)
+
+    return ready_entry_ids
+
+def confirm_uploads(video_ids):
+    """Bulk version of /confirm-upload; returns (videos, missing ids, ready entry ids, messages)."""
+    videos, missing = set_video_statuses({video_id: VideoStatusCode.PROCESS_READY for video_id in video_ids})
+
+    owners = {entry_id: (event_id, location_id, user_id)
+              for _, _, entry_id, _, event_id, location_id, user_id in videos.values()}
+    ready_entry_ids = mark_ready_entries(list(owners), owners)
+
+    fragments = get_camera_fragments(video[3] for video in videos.values())
+    messages = [(video_id, video_message(video_id, fragments[video[3]])) for video_id, video in videos.items()]
+
+    return videos, missing, ready_entry_ids, messages
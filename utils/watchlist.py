@@ -0,0 +1,184 @@
+import hashlib
+import math
+import threading
+
+from flask import current_app as app, g, has_request_context
+from flask_jwt_extended import current_user
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from databases import db, HighRiskMember
+from utils.member import check_high_risk_member_exists
+
+# Per-process index of each user's active high-risk member ids, checked by
+# /entry for every incoming entry. It carries the User.config_version it was
+# built at, so a lookup only needs the already loaded current_user to know it
+# is current. Members added or deleted through the ORM in this process are
+# applied to the index on commit; bulk statements and writes from other
+# workers make it reload on the next lookup.
+_watchlists = {}
+_lock = threading.Lock()
+
+# Above this many members a Bloom filter is kept instead of the set of ids, and
+# positive matches are confirmed with one indexed query.
+BLOOM_THRESHOLD = 500000
+BLOOM_ERROR_RATE = 0.001
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class Watchlist:
+    def __init__(self, version, member_ids):
+        self.version = version
+        if len(member_ids) > app.config.get("HIGH_RISK_BLOOM_THRESHOLD", BLOOM_THRESHOLD):
+            # room for the members added before the next reload
+            self.members, self.bloom = None, BloomFilter(2 * len(member_ids))
+            for member_id in member_ids:
+                self.bloom.add(member_id)
+        else:
+            self.members, self.bloom = set(member_ids), None
+
+    def apply(self, added, removed):
+        """False when the change can't be applied in place and the index needs a reload."""
+        if self.members is not None:
+            self.members.difference_update(removed)
+            self.members.update(added)
+            return True
+        # deleted members stay in the filter until the next reload; the
+        # confirming query filters them out
+        if self.bloom.count + len(added) > self.bloom.capacity:
+            return False
+        for member_id in added:
+            self.bloom.add(member_id)
+        return True
+
+    def __contains__(self, member_id):
+        if self.members is not None:
+            return member_id in self.members
+        return member_id in self.bloom and check_high_risk_member_exists(member_id)
+
+def _load_watchlist(user_id, version):
+    member_ids = db.session.execute(
+        select(HighRiskMember.member_id).where(
+            HighRiskMember.user_id == user_id,
+            HighRiskMember.is_deleted == False)).scalars().all()
+
+    return Watchlist(version, member_ids)
+
+def get_watchlist():
+    version = current_user.config_version
+    watchlist = _watchlists.get(current_user.id)
+    if watchlist is not None and watchlist.version == version:
+        return watchlist
+
+    watchlist = _load_watchlist(current_user.id, version)
+    with _lock:
+        _watchlists[current_user.id] = watchlist
+    return watchlist
+
+def is_high_risk_member(member_id):
+    return member_id in get_watchlist()
+
+def invalidate_watchlists():
+    with _lock:
+        _watchlists.clear()
+
+def _remember_bases(session):
+    # the index each bumped user had when this transaction first bumped it;
+    # only that exact index can be advanced on commit
+    bases = session.info.setdefault("watchlist_bases", {})
+    for user_id in session.info.get("config_bumps", ()):
+        if user_id not in bases:
+            watchlist = _watchlists.get(user_id)
+            bases[user_id] = (watchlist, watchlist.version if watchlist is not None else None)
+
+def _record(session, user_id, added=(), removed=()):
+    changes = session.info.setdefault("watchlist_changes", {}).setdefault(user_id, (set(), set()))
+    changes[0].difference_update(removed)
+    changes[1].difference_update(added)
+    changes[0].update(added)
+    changes[1].update(removed)
+
+@event.listens_for(Session, "before_flush")
+def track_member_changes(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, HighRiskMember) and not obj.is_deleted:
+            _record(session, obj.user_id, added=[obj.member_id])
+
+    for obj in session.deleted:
+        if isinstance(obj, HighRiskMember) and not obj.is_deleted:
+            _record(session, obj.user_id, removed=[obj.member_id])
+
+    for obj in session.dirty:
+        if not isinstance(obj, HighRiskMember):
+            continue
+        attrs = inspect(obj).attrs
+        if not (attrs.is_deleted.history.has_changes() or attrs.member_id.history.has_changes()):
+            continue
+        was_deleted = (attrs.is_deleted.history.deleted or [obj.is_deleted])[0]
+        old_member_id = (attrs.member_id.history.deleted or [obj.member_id])[0]
+        removed = [old_member_id] if not was_deleted else []
+        added = [obj.member_id] if not obj.is_deleted else []
+        _record(session, obj.user_id, added=added, removed=removed)
+
+    _remember_bases(session)
+
+@event.listens_for(Session, "do_orm_execute")
+def track_member_statements(orm_execute_state):
+    session = orm_execute_state.session
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is not None \
+            and issubclass(orm_execute_state.bind_mapper.class_, HighRiskMember):
+        # which members a bulk statement touched isn't known; reload
+        user = g._jwt_extended_jwt_user["loaded_user"] \
+            if has_request_context() and g.get("_jwt_extended_jwt_user") else None
+        session.info.setdefault("watchlist_reload", set()).add(user.id if user is not None else None)
+
+    _remember_bases(session)
+
+@event.listens_for(Session, "after_commit")
+def apply_member_changes(session):
+    bumps = session.info.get("config_bumps", {})
+    bases = session.info.pop("watchlist_bases", {})
+    changes = session.info.pop("watchlist_changes", {})
+    reload = session.info.pop("watchlist_reload", set())
+
+    with _lock:
+        if None in reload:
+            _watchlists.clear()
+            return
+
+        for user_id, count in bumps.items():
+            watchlist = _watchlists.get(user_id)
+            if watchlist is None:
+                continue
+            base, version = bases.get(user_id, (None, None))
+            added, removed = changes.get(user_id, ((), ()))
+            if user_id in reload or watchlist is not base or watchlist.version != version \
+                    or not watchlist.apply(added, removed):
+                del _watchlists[user_id]
+            else:
+                watchlist.version += count
+
+@event.listens_for(Session, "after_rollback")
+def forget_member_changes(session):
+    for key in ("watchlist_bases", "watchlist_changes", "watchlist_reload"):
+        session.info.pop(key, None)
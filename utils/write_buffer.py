@@ -0,0 +1,372 @@
+import atexit
+import enum
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import DateTime, Enum, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from databases import db, Entry, ChangeEvent
+from utils.env import private_directory
+from utils.idempotency import IDEMPOTENCY_TTL, buffered_response, fill_record
+from utils.merge import mark_merged
+from utils.metrics import LATENCY_BUCKETS
+
+# Opt-in group commit for /entry (ENTRY_WRITE_BUFFER). Instead of committing
+# its rows, a request appends them to this worker's write-ahead file and is
+# acknowledged once the append is on disk. A flusher thread then inserts
+# everything buffered in one transaction every FLUSH_INTERVAL seconds, or as
+# soon as FLUSH_SIZE entries are waiting, and checkpoints the file. Files left
+# behind by a worker that died are replayed by the next worker that starts.
+# An acknowledged entry the database rejects is parked in DEAD_LETTER_FILE
+# next to the write-ahead files rather than dropped. The files live in
+# ENTRY_BUFFER_DIR, which has no default: it must survive a restart of the
+# host or container, so /tmp won't do.
+DEAD_LETTER_FILE = 'dead-letter.jsonl'
+FLUSH_INTERVAL = 0.005
+FLUSH_SIZE = 200
+MAX_PENDING = 10000
+RETRY_INTERVAL = 1.0
+
+BUFFER_DEPTH = Gauge('flask_entry_buffer_depth', 'Entries acknowledged but not yet committed',
+                     multiprocess_mode='livesum')
+FLUSH_LATENCY = Histogram('flask_entry_buffer_flush_seconds', 'Time spent committing one group of buffered entries',
+                          buckets=LATENCY_BUCKETS)
+FLUSH_SIZE_HISTOGRAM = Histogram('flask_entry_buffer_flush_entries', 'Entries committed per group',
+                                 buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+DEAD_LETTERS = Counter('flask_entry_buffer_dead_letters', 'Acknowledged entries the database rejected, '
+                       'parked in the dead-letter file')
+
+_condition = threading.Condition()
+_pending = []
+_buffer = None
+
+def enabled():
+    return bool(current_app.config.get("ENTRY_WRITE_BUFFER", False))
+
+def buffer_dir(app=None):
+    """ENTRY_BUFFER_DIR, created private to this user; refuses to run without one."""
+    path = (app or current_app).config.get("ENTRY_BUFFER_DIR")
+    if not path:
+        raise RuntimeError("ENTRY_WRITE_BUFFER needs ENTRY_BUFFER_DIR, a durable directory for acknowledged entries")
+    return private_directory(path, "ENTRY_BUFFER_DIR")
+
+def init_write_buffer(app):
+    # fail at startup rather than on the first buffered /entry
+    if app.config.get("ENTRY_WRITE_BUFFER", False):
+        buffer_dir(app)
+
+def accepting():
+    """True when the next entry can be buffered; past MAX_PENDING entries /entry commits directly."""
+    return len(_pending) < current_app.config.get("ENTRY_BUFFER_MAX_PENDING", MAX_PENDING)
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+def _decode(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Enum) and column.type.enum_class is not None:
+        return column.type.enum_class[value]
+    return value
+
+_models = {}
+
+def _model(name):
+    # model name -> (model, position in foreign key order), built once
+    if not _models:
+        tables = db.metadata.sorted_tables
+        for mapper in db.Model.registry.mappers:
+            _models[mapper.class_.__name__] = (mapper.class_, tables.index(mapper.local_table))
+    return _models[name]
+
+def _rows(session):
+    rows = []
+    for obj in session.new:
+        mapper = inspect(obj).mapper
+        values = {}
+        for prop in mapper.column_attrs:
+            value = getattr(obj, prop.key)
+            # unset columns get their defaults when the group is inserted
+            if value is not None:
+                values[prop.key] = _encode(value)
+        rows.append((mapper.class_.__name__, values))
+
+    rows.sort(key=lambda row: _model(row[0])[1])
+    return rows
+
+class WriteBuffer:
+    def __init__(self, app):
+        self.app = app
+        self.directory = buffer_dir(app)
+        # unique per start, so a recycled pid never reopens a dead worker's file
+        self.path = os.path.join(self.directory, f"entries-{os.getpid()}-{time.time_ns()}.wal")
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        # held until the worker exits; an unlocked file belongs to a dead worker
+        fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self.pid = os.getpid()
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.fsync = app.config.get("ENTRY_BUFFER_FSYNC", True)
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="entry-write-buffer", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def append(self, record):
+        size = self.app.config.get("ENTRY_BUFFER_FLUSH_SIZE", FLUSH_SIZE)
+        with self.lock:
+            self.sequence += 1
+            record["seq"] = self.sequence
+            os.write(self.fd, (json.dumps(record, separators=(",", ":")) + "\n").encode())
+            with _condition:
+                _pending.append(record)
+                BUFFER_DEPTH.inc()
+                # wake the flusher when it is idle or the group is full
+                if len(_pending) == 1 or len(_pending) >= size:
+                    _condition.notify_all()
+        # one fsync covers every append before it
+        if self.fsync:
+            os.fsync(self.fd)
+
+    def committed(self, group):
+        with self.lock:
+            with _condition:
+                del _pending[:len(group)]
+                BUFFER_DEPTH.dec(len(group))
+                empty = not _pending
+                _condition.notify_all()
+            if empty:
+                os.ftruncate(self.fd, 0)
+            else:
+                os.write(self.fd, (json.dumps({"flushed": group[-1]["seq"]}) + "\n").encode())
+
+    def run(self):
+        with self.app.app_context():
+            recover_buffers(exclude=self.path)
+
+        interval = self.app.config.get("ENTRY_BUFFER_FLUSH_INTERVAL", FLUSH_INTERVAL)
+        size = self.app.config.get("ENTRY_BUFFER_FLUSH_SIZE", FLUSH_SIZE)
+        while True:
+            with _condition:
+                while not _pending and not self.stopping:
+                    _condition.wait()
+                if not _pending:
+                    return
+                # let the group fill up unless it already has
+                if len(_pending) < size and not self.stopping:
+                    _condition.wait(interval)
+                group = _pending[:size]
+
+            try:
+                with self.app.app_context():
+                    write_group(group)
+            except Exception:
+                self.app.logger.exception(f'Committing {len(group)} buffered entries failed, retrying')
+                time.sleep(RETRY_INTERVAL)
+                continue
+
+            self.committed(group)
+
+    def stop(self, timeout=10.0):
+        """Commit what is still buffered, for graceful worker shutdown."""
+        with _condition:
+            if self.stopping:
+                return
+            self.stopping = True
+            _condition.notify_all()
+        self.thread.join(timeout)
+        with self.lock:
+            # anything left is replayed by the next worker
+            if not _pending:
+                os.unlink(self.path)
+
+def get_buffer():
+    global _buffer
+    # started lazily so the thread and the file belong to the forked worker
+    if _buffer is None or _buffer.pid != os.getpid():
+        with _condition:
+            if _buffer is None or _buffer.pid != os.getpid():
+                _pending.clear()
+                _buffer = WriteBuffer(current_app._get_current_object())
+    return _buffer
+
+def start_buffer(app):
+    """Start the worker's buffer, which first replays what dead workers left behind.
+
+    Called from gunicorn's post_worker_init, so recovery doesn't wait for the
+    worker's first buffered /entry.
+    """
+    with app.app_context():
+        if enabled():
+            get_buffer()
+
+def stop_buffer():
+    global _buffer
+    if _buffer is not None and _buffer.pid == os.getpid():
+        _buffer.stop()
+    _buffer = None
+
+def buffer_entry(entry_id, merge=None):
+    """Buffer the rows added to the session instead of committing them.
+
+    `merge` is the (event id, is high risk) of the open event the entry joined;
+    that event is updated when the group is written, and so is the request's
+    Idempotency-Key record.
+    """
+    record = {"entry_id": entry_id, "rows": _rows(db.session), "merge": merge, "response": buffered_response()}
+    db.session.rollback()
+    get_buffer().append(record)
+
+def pending_duplicate(member_id, start, end):
+    """Whether member_id has a buffered entry between start and end, which the database can't show yet."""
+    start, end = start.isoformat(), end.isoformat()
+    with _condition:
+        for record in _pending:
+            for model, values in record["rows"]:
+                if model == "Entry" and values.get("member_id") == member_id \
+                        and values.get("entered_at") and start <= values["entered_at"] <= end:
+                    return True
+    return False
+
+def wait_for_flush(timeout=5.0):
+    deadline = time.monotonic() + timeout
+    with _condition:
+        while _pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _condition.wait(remaining)
+    return True
+
+def _insert(records):
+    now = datetime.now(timezone.utc)
+    tables = {}
+    for record in records:
+        for model, values in record["rows"]:
+            tables.setdefault(model, []).append(values)
+
+    for name in sorted(tables, key=lambda name: _model(name)[1]):
+        model = _model(name)[0]
+        columns = {prop.key: prop.columns[0] for prop in inspect(model).column_attrs}
+        rows = [{key: _decode(columns[key], value) for key, value in values.items()} for values in tables[name]]
+        if model is ChangeEvent:
+            # stamped at commit so the change feed's settle window covers it
+            for row in rows:
+                row["created_at"] = now
+            db.session.info["has_changes"] = True
+        db.session.execute(insert(model), rows)
+
+    for record in records:
+        if not record["merge"]:
+            continue
+        event_id, is_high_risk = record["merge"]
+        if not mark_merged(event_id, is_high_risk):
+            current_app.logger.warning(f'Event {event_id} was reviewed before entry {record["entry_id"]} joined it')
+
+    ttl = current_app.config.get("IDEMPOTENCY_TTL", IDEMPOTENCY_TTL)
+    for record in records:
+        if record.get("response"):
+            db.session.execute(fill_record(*record["response"], ttl))
+
+def _insert_alone(record):
+    # files written before keys were claimed up front carry the key's record
+    # as a row; one another worker stored first only costs the replay, not
+    # the entry
+    without_key = dict(record, rows=[row for row in record["rows"] if row[0] != "IdempotencyRecord"])
+    for attempt in (record, without_key):
+        try:
+            _insert([attempt])
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+    _dead_letter(record)
+    return False
+
+def _dead_letter(record):
+    path = os.path.join(buffer_dir(), DEAD_LETTER_FILE)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, (json.dumps(record, separators=(",", ":")) + "\n").encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    DEAD_LETTERS.inc()
+    current_app.logger.error(f'Buffered entry {record["entry_id"]} was rejected by the database, '
+                             f'parked in {path}')
+
+def write_group(records):
+    started_at = time.perf_counter()
+    try:
+        _insert(records)
+        db.session.commit()
+    except IntegrityError:
+        # one bad record must not hold back the rest of the group
+        db.session.rollback()
+        for record in records:
+            _insert_alone(record)
+    FLUSH_LATENCY.observe(time.perf_counter() - started_at)
+    FLUSH_SIZE_HISTOGRAM.observe(len(records))
+
+def _read(path):
+    records, flushed = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # torn write of an entry that was never acknowledged
+                break
+            if "flushed" in record:
+                flushed = record["flushed"]
+            else:
+                records.append(record)
+    return [record for record in records if record["seq"] > flushed]
+
+def recover_buffers(exclude=None):
+    """Commit the entries of write-ahead files left behind by workers that died.
+
+    Returns the number of entries recovered. Entries already in the database
+    (committed just before the crash, ahead of the checkpoint) are skipped.
+    """
+    directory = buffer_dir()
+    recovered = 0
+    for path in sorted(glob.glob(os.path.join(directory, "*.wal"))):
+        if path == exclude:
+            continue
+        fd = os.open(path, os.O_RDWR)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # a live worker's buffer
+                continue
+
+            records = _read(path)
+            if records:
+                existing = set(db.session.execute(
+                    select(Entry.id).where(Entry.id.in_([record["entry_id"] for record in records]))).scalars())
+                records = [record for record in records if record["entry_id"] not in existing]
+            size = current_app.config.get("ENTRY_BUFFER_FLUSH_SIZE", FLUSH_SIZE)
+            for start in range(0, len(records), size):
+                write_group(records[start:start + size])
+            recovered += len(records)
+            current_app.logger.info(f'Recovered {len(records)} buffered entries from {path}')
+            os.unlink(path)
+        finally:
+            os.close(fd)
+    return recovered